@@ -0,0 +1,261 @@
+import argparse
+import os
+import random
+import sys
+from services import ReadService, MarkovModel, GenerateService, CacheService, ProfileService
+from services.markov_model import BACKENDS
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Builds the parser of the command line arguments"""
+
+    parser = argparse.ArgumentParser(
+        prog="text_generator", description="Train Markov chains and generate text without the UI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("stories", help="list the bundled stories")
+
+    train_parser = commands.add_parser("train", help="train a model and save it")
+    add_source_arguments(train_parser)
+    train_parser.add_argument("--max-degree", type=int,
+                              help="the degree the model is built at, defaults to the degree")
+    train_parser.add_argument("--output", required=True, help="the path of the model file")
+    add_pruning_arguments(train_parser)
+    train_parser.set_defaults(backend="trie")
+
+    generate_parser = commands.add_parser("generate", help="generate texts")
+    source = add_source_arguments(generate_parser)
+    source.add_argument("--model", help="a model file saved with train")
+    generate_parser.add_argument("--max-degree", type=int,
+                                 help="the degree a story or file is built at")
+    add_text_arguments(generate_parser)
+    generate_parser.add_argument("--no-cache", action="store_true",
+                                 help="build the model of a story or file from scratch")
+    generate_parser.add_argument("--backend", choices=BACKENDS, default="trie",
+                                 help="the data structure to generate from, defaults to trie; "
+                                 "a suffix_array is always built from scratch")
+    add_pruning_arguments(generate_parser)
+    return parser
+
+
+def add_source_arguments(parser: argparse.ArgumentParser):
+    """Adds the arguments that choose the source text and the degree
+
+    Args:
+        parser (ArgumentParser): The parser of the command
+
+    Returns:
+        argparse._MutuallyExclusiveGroup: The group of the source arguments
+    """
+
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--story", help="the title of a bundled story")
+    source.add_argument("--file", help="the path of a Project Gutenberg text file")
+    parser.add_argument("--degree", type=int, help="the degree of the Markov chain")
+    return source
+
+
+def add_text_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the arguments that shape the generated texts and where they go
+
+    Args:
+        parser (ArgumentParser): The parser of the command
+    """
+
+    parser.add_argument("--count", type=int, default=1,
+                        help="the number of texts, defaults to 1")
+    parser.add_argument("--limit", type=int, default=100,
+                        help="the number of words per text, defaults to 100")
+    parser.add_argument("--seed", type=int, help="the seed of the random generator")
+    parser.add_argument("--start", default="", help="the words the texts start with")
+    parser.add_argument("--output-dir",
+                        help="write every text into its own file instead of stdout")
+
+
+def add_pruning_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the arguments that bound the size of a built model
+
+    Args:
+        parser (ArgumentParser): The parser of the command
+    """
+
+    parser.add_argument("--min-count", type=int, default=1,
+                        help="drop the sequences seen fewer times, defaults to 1")
+    parser.add_argument("--max-children", type=int,
+                        help="keep only the most frequent next words of every state")
+    parser.add_argument("--max-vocabulary", type=int,
+                        help="replace all but the most frequent words with <unk>")
+
+
+def is_pruned(args: argparse.Namespace) -> bool:
+    """Returns whether the arguments bound the size of the model
+
+    Args:
+        args (Namespace): The parsed arguments
+    """
+
+    return args.min_count > 1 or args.max_children is not None or \
+        args.max_vocabulary is not None
+
+
+def build_model(args: argparse.Namespace) -> MarkovModel:
+    """Builds the model of a story or file from scratch
+
+    Prints the report of the pruning when the size is bounded.
+
+    Args:
+        args (Namespace): The parsed arguments
+    """
+
+    markov_model = MarkovModel.from_file(
+        source_path(args), args.degree, args.max_degree, backend=args.backend,
+        min_count=args.min_count, max_children=args.max_children,
+        max_vocabulary=args.max_vocabulary)
+    if markov_model.pruned:
+        print("Pruned " + ", ".join(f"{count} {reason.replace('_', ' ')}"
+                                    for reason, count in markov_model.pruned.items()),
+              file=sys.stderr)
+    return markov_model
+
+
+def source_path(args: argparse.Namespace) -> str:
+    """Returns the path of the source text
+
+    Args:
+        args (Namespace): The parsed arguments
+    """
+
+    if args.story is not None:
+        read_service = ReadService()
+        if args.story not in read_service.available_stories.values():
+            raise ValueError(f"unknown story '{args.story}'")
+        return read_service.file_path(args.story)
+    return args.file
+
+
+def train(args: argparse.Namespace) -> None:
+    """Trains a model and saves it
+
+    Args:
+        args (Namespace): The parsed arguments
+    """
+
+    markov_model = build_model(args)
+    markov_model.freeze()
+    markov_model.save(args.output)
+    print(f"Saved a model of degree {markov_model.max_degree} into {args.output}",
+          file=sys.stderr)
+
+
+def load_model(args: argparse.Namespace) -> MarkovModel:
+    """Loads or builds the model to generate with
+
+    Model files are memory-mapped, and the models of the stories and files
+    are taken from the cache unless asked otherwise. The loaded models are
+    moved onto the chosen backend. A suffix array and a model with a
+    bounded size are built from the text.
+
+    Args:
+        args (Namespace): The parsed arguments
+    """
+
+    if args.model is not None:
+        if is_pruned(args):
+            raise ValueError("a saved model cannot be pruned, prune it when training")
+        markov_model = MarkovModel.load(args.model)
+        if args.degree is not None:
+            markov_model.degree = args.degree
+        markov_model.use_backend(args.backend)
+        return markov_model
+    if args.no_cache or args.backend == "suffix_array" or is_pruned(args):
+        markov_model = build_model(args)
+        markov_model.freeze()
+        return markov_model
+    return CacheService().get_model(source_path(args), args.degree, args.max_degree,
+                                    backend=args.backend)
+
+
+def generate(args: argparse.Namespace) -> int:
+    """Generates the texts into stdout or into files
+
+    Args:
+        args (Namespace): The parsed arguments
+
+    Returns:
+        int: The exit status
+    """
+
+    markov_model = load_model(args)
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+    start = args.start.lower().split()
+    for number in range(1, args.count + 1):
+        sequence = markov_model.form_the_starting_sequence(start)
+        if not sequence:
+            print(f"The start '{args.start}' is not in the model", file=sys.stderr)
+            return 1
+        generate_service = GenerateService(sequence, markov_model, markov_model.degree,
+                                           args.limit, markov_model.vocabulary, lazy=True,
+                                           backoff=True)
+        if args.output_dir is None:
+            generate_service.write(sys.stdout)
+            sys.stdout.write("\n")
+            continue
+        path = os.path.join(args.output_dir, f"text_{number}.txt")
+        with open(path, "w", encoding="utf-8") as file:
+            generate_service.write(file)
+            file.write("\n")
+    return 0
+
+
+def validate(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Exits with a usage error if the arguments are missing or out of range
+
+    Args:
+        parser (ArgumentParser): The parser of the command line arguments
+        args (Namespace): The parsed arguments
+    """
+
+    if args.command == "train" and args.degree is None:
+        parser.error("train requires --degree")
+    if args.command == "generate" and args.model is None and args.degree is None:
+        parser.error("generating from a story or file requires --degree")
+    if args.degree is not None and args.degree < 1:
+        parser.error("--degree must be at least 1")
+    if args.max_degree is not None and args.max_degree < 1:
+        parser.error("--max-degree must be at least 1")
+    if args.command == "generate" and (args.count < 0 or args.limit < 0):
+        parser.error("--count and --limit must not be negative")
+
+
+def main(argv=None) -> int:
+    """Runs the command line interface
+
+    Args:
+        argv (list, optional): The arguments. Defaults to sys.argv.
+
+    Returns:
+        int: The exit status
+    """
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    ProfileService.from_environment()
+    if args.command == "stories":
+        print("\n".join(ReadService().available_stories.values()))
+        return 0
+    validate(parser, args)
+    try:
+        if args.command == "train":
+            train(args)
+            return 0
+        return generate(args)
+    except (OSError, ValueError) as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
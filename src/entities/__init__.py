@@ -1,2 +1,10 @@
 from .trie import Trie
 from .trie_node import TrieNode
+from .frozen_trie import FrozenTrie, FrozenTrieNode
+from .vocabulary import Vocabulary
+from .sampling_table import SamplingTable
+from .prefix_index import PrefixIndex
+from .lru_cache import LRUCache
+from .suffix_array import SuffixArray, SuffixArrayNode
+from .ngram_table import NGramTable, NGramTableNode
+from .model_backend import ModelBackend
@@ -0,0 +1,528 @@
+from array import array
+from bisect import bisect_left
+import numpy as np
+from .lru_cache import LRUCache
+from .sampling_table import SamplingTable
+
+
+# The number of sampling tables kept, so a long run over a large model
+# does not end up holding a table for every context it has visited.
+SAMPLING_TABLE_CACHE_SIZE = 1 << 16
+
+
+def describe_level(depth: int, branching) -> dict:
+    """Summarizes the branching factors of the nodes on one level of a Trie
+
+    Args:
+        depth (int): The depth of the level, 0 for the root
+        branching (array): The number of children of every node on the level
+
+    Returns:
+        dict: The node and edge counts and the branching factor distribution
+    """
+
+    branching = np.asarray(branching)
+    return {
+        "depth": depth,
+        "nodes": len(branching),
+        "edges": int(branching.sum()),
+        "leaves": int((branching == 0).sum()),
+        "mean_branching": float(branching.mean()),
+        "median_branching": float(np.median(branching)),
+        "max_branching": int(branching.max()),
+    }
+
+
+class FrozenTrieNode:
+    """ Read-only view of a node in the FrozenTrie.
+
+    Mirrors the TrieNode interface so that the services can use
+    a frozen Trie in place of a regular one.
+    """
+
+    __slots__ = ("__trie", "__index")
+
+    def __init__(self, trie, index: int) -> None:
+        """Initializes the view
+
+        Args:
+            trie (FrozenTrie): The FrozenTrie the node belongs to.
+            index (int): The index of the node in the flat arrays.
+        """
+
+        self.__trie = trie
+        self.__index = index
+
+    @property
+    def frequency(self) -> int:
+        """Returns the frequency of the node"""
+
+        return self.__trie.frequencies[self.__index]
+
+    @property
+    def children(self) -> dict:
+        """Returns the children of the node"""
+
+        return self.__trie.children_of(self.__index)
+
+
+class FrozenTrie:
+    """ Represents a read-only, array-backed Trie.
+
+    The nodes are stored in breadth-first order in flat arrays, so that
+    the children of a node occupy a contiguous block sorted by token id
+    (CSR layout). The children of node i are the nodes
+    offsets[i]..offsets[i + 1] - 1.
+
+    Attributes:
+        offsets (array): The index of the first child of every node.
+        tokens (array): The token id of the edge leading to every node.
+        frequencies (array): The frequency of every node.
+    """
+
+    def __init__(self, offsets, tokens, frequencies) -> None:
+        """Initializes the FrozenTrie
+
+        Args:
+            offsets (array): The index of the first child of every node.
+            tokens (array): The token id of the edge leading to every node.
+            frequencies (array): The frequency of every node.
+        """
+
+        self.offsets = offsets
+        self.tokens = tokens
+        self.frequencies = frequencies
+        self.__sampling_tables = LRUCache(SAMPLING_TABLE_CACHE_SIZE)
+
+    @classmethod
+    def merge(cls, tries: list, mappings: list = None):
+        """Merges FrozenTries into one, adding up the frequencies.
+
+        The Tries are merged one level at a time with NumPy. The children on
+        a level are keyed by the merged index of their parent and their token,
+        and sorting the unique keys gives the breadth-first order of the
+        merged Trie directly. The Tries can be counted with vocabularies of
+        their own, in which case their token ids are mapped into the shared
+        vocabulary first.
+
+        Args:
+            tries (list): The FrozenTries to be merged.
+            mappings (list, optional): For every Trie, the shared token id of
+                each of its token ids. Defaults to the ids being shared already.
+
+        Returns:
+            FrozenTrie: The merged FrozenTrie, an empty one if there are no Tries.
+        """
+
+        if not tries:
+            return cls.__build(0, [])
+        arrays = [(np.asarray(trie.offsets, dtype=np.int64),
+                   np.asarray(trie.tokens, dtype=np.int64),
+                   np.asarray(trie.frequencies, dtype=np.int64)) for trie in tries]
+        if mappings is not None:
+            arrays = [(trie_offsets, np.concatenate(
+                ([0], np.asarray(mapping, dtype=np.int64)[trie_tokens[1:]])), trie_frequencies)
+                for (trie_offsets, trie_tokens, trie_frequencies), mapping in
+                zip(arrays, mappings)]
+        return cls.__build(sum(int(trie_frequencies[0]) for _, _, trie_frequencies in arrays),
+                           cls.__merged_levels(arrays))
+
+    @staticmethod
+    def __merged_levels(arrays: list):
+        """Merges the levels of the Tries one at a time
+
+        Args:
+            arrays (list): The offsets, tokens and frequencies of every Trie.
+
+        Yields:
+            tuple: The number of children of every node on the previous level,
+                and the tokens and the summed frequencies of the merged level.
+        """
+
+        base = 1 + max((int(tokens.max()) for _, tokens, _ in arrays if tokens.size),
+                       default=0)
+        levels = [(0, 1, np.zeros(1, dtype=np.int64)) for _ in arrays]
+        parent_start = 0
+        parent_end = 1
+        while parent_start < parent_end:
+            keys, counts = FrozenTrie.__level_keys(arrays, levels, base)
+            unique, inverse = np.unique(keys, return_inverse=True)
+            summed = np.zeros(len(unique), dtype=np.int64)
+            np.add.at(summed, inverse, counts)
+            yield (np.bincount(unique // base - parent_start, minlength=parent_end - parent_start),
+                   unique % base, summed)
+            levels = FrozenTrie.__next_levels(arrays, levels, parent_end + inverse)
+            parent_start, parent_end = parent_end, parent_end + len(unique)
+
+    @staticmethod
+    def __level_keys(arrays: list, levels: list, base: int) -> tuple:
+        """Keys the children of the current levels by their merged parent and token
+
+        Args:
+            arrays (list): The offsets, tokens and frequencies of every Trie.
+            levels (list): The first and the last node of the current level of
+                every Trie, and the merged index of each of its nodes.
+            base (int): The number of distinct tokens, the multiplier of the parent.
+
+        Returns:
+            tuple: The keys and the frequencies of the children, in the order of the Tries.
+        """
+
+        keys = []
+        counts = []
+        for (trie_offsets, trie_tokens, trie_frequencies), (start, end, mapping) in \
+                zip(arrays, levels):
+            child_start = trie_offsets[start]
+            child_end = trie_offsets[end]
+            parents = np.repeat(mapping, np.diff(trie_offsets[start:end + 1]))
+            keys.append(parents * base + trie_tokens[child_start:child_end])
+            counts.append(trie_frequencies[child_start:child_end])
+        return np.concatenate(keys), np.concatenate(counts)
+
+    @staticmethod
+    def __next_levels(arrays: list, levels: list, merged: np.ndarray) -> list:
+        """Moves every Trie one level down
+
+        Args:
+            arrays (list): The offsets, tokens and frequencies of every Trie.
+            levels (list): The first and the last node of the current level of
+                every Trie, and the merged index of each of its nodes.
+            merged (ndarray): The merged index of the children of the current
+                levels, in the order of the Tries.
+
+        Returns:
+            list: The levels of the children.
+        """
+
+        children = []
+        position = 0
+        for (trie_offsets, _, _), (start, end, _) in zip(arrays, levels):
+            child_start = int(trie_offsets[start])
+            child_end = int(trie_offsets[end])
+            children.append((child_start, child_end,
+                             merged[position:position + child_end - child_start]))
+            position += child_end - child_start
+        return children
+
+    @classmethod
+    def from_tokens(cls, tokens, order: int):
+        """Counts the sequences of a text straight into a FrozenTrie.
+
+        Every position of the text starts a window of order tokens, padded
+        past the end of the text with a sentinel, so the windows near the end
+        are cut short as in Trie.insert. The windows are sorted once with
+        lexsort. The nodes at depth d are then the runs of windows sharing
+        their first d tokens, and their frequencies are the lengths of the
+        runs. As the runs are in lexicographic order, every level comes out
+        in the breadth-first order of the FrozenTrie with the children
+        sorted by token id.
+
+        Args:
+            tokens (array): The token ids of the text.
+            order (int): The length of the sequences, max degree + 1.
+
+        Returns:
+            FrozenTrie: The counts of the text, equal to inserting every
+                window into a Trie and freezing it.
+        """
+
+        values = np.asarray(tokens, dtype=np.int64)
+        if values.size == 0:
+            return cls.__build(0, [])
+        sentinel = int(values.max()) + 1
+        padded = np.concatenate((values, np.full(order - 1, sentinel, dtype=np.int64)))
+        windows = np.lib.stride_tricks.sliding_window_view(padded, order)[:len(values)]
+        return cls.__build(0, cls.__window_levels(windows[np.lexsort(windows.T[::-1])],
+                                                  sentinel))
+
+    @staticmethod
+    def __window_levels(windows: np.ndarray, sentinel: int):
+        """Counts the levels of the sorted windows one depth at a time
+
+        Args:
+            windows (ndarray): The windows of the text in lexicographic order.
+            sentinel (int): The token the windows are padded with.
+
+        Yields:
+            tuple: The number of children of every node on the previous level,
+                and the tokens and the frequencies of the nodes at the depth.
+        """
+
+        changed = np.zeros(len(windows) - 1, dtype=bool)
+        groups = np.zeros(len(windows), dtype=np.int64)
+        parent_count = 1
+        for depth in range(windows.shape[1]):
+            changed |= windows[1:, depth] != windows[:-1, depth]
+            starts = np.flatnonzero(np.concatenate(([True], changed)))
+            runs = np.diff(np.append(starts, len(windows)))
+            valid = windows[starts, depth] != sentinel
+            starts = starts[valid]
+            yield (np.bincount(groups[starts], minlength=parent_count),
+                   windows[starts, depth], runs[valid])
+            marks = np.zeros(len(windows), dtype=np.int64)
+            marks[starts] = 1
+            groups = np.cumsum(marks) - 1
+            parent_count = len(starts)
+
+    @classmethod
+    def __build(cls, root_frequency: int, levels):
+        """Lays the levels of a Trie out in the breadth-first arrays
+
+        Args:
+            root_frequency (int): The frequency of the root.
+            levels (iterable): The levels below the root, top down, as the
+                number of children of every node on the previous level and
+                the tokens and the frequencies of the nodes on the level.
+
+        Returns:
+            FrozenTrie: The Trie
+        """
+
+        offsets = []
+        tokens = [np.zeros(1, dtype=np.int64)]
+        frequencies = [np.array([root_frequency], dtype=np.int64)]
+        node_count = 1
+        for children, level_tokens, level_frequencies in levels:
+            offsets.append(node_count + np.cumsum(children) - children)
+            tokens.append(level_tokens)
+            frequencies.append(level_frequencies)
+            node_count += len(level_tokens)
+        offsets.append(np.full(len(tokens[-1]) + 1, node_count, dtype=np.int64))
+        return cls(array("I", np.concatenate(offsets).astype(np.uint32).tobytes()),
+                   array("I", np.concatenate(tokens).astype(np.uint32).tobytes()),
+                   array("I", np.concatenate(frequencies).astype(np.uint32).tobytes()))
+
+    def prune(self, min_count: int = 1, max_children: int = None) -> tuple:
+        """Removes the rare sequences, see Trie.prune.
+
+        The nodes to keep are marked with NumPy: the children below the
+        first level are ranked within their block by frequency, and a node
+        below the first level is kept if it passes both limits and its
+        parent is kept. Dropping the other nodes keeps the breadth-first
+        order, so the offsets of a kept node are the number of kept nodes
+        before its first child.
+
+        Args:
+            min_count (int, optional): The lowest frequency kept. Defaults to 1.
+            max_children (int, optional): The largest number of children kept
+                per node. Defaults to no limit.
+
+        Returns:
+            tuple: The pruned FrozenTrie, and a dict of the number of nodes
+                removed for the min count and for the max children.
+        """
+
+        offsets = np.frombuffer(self.offsets, dtype=np.uint32).astype(np.int64)
+        tokens = np.frombuffer(self.tokens, dtype=np.uint32).astype(np.int64)
+        frequencies = np.frombuffer(self.frequencies, dtype=np.uint32).astype(np.int64)
+        size = len(frequencies)
+        parents = np.concatenate(([0], np.repeat(np.arange(size), np.diff(offsets))))
+        frequent = frequencies >= min_count
+        frequent[:offsets[1]] = True
+        ranked = np.ones(size, dtype=bool)
+        if max_children is not None and size > 1:
+            ranks = self.__rank_children(offsets, tokens, frequencies, parents, frequent)
+            ranked[1:] = (ranks[1:] < max_children) | (parents[1:] == 0)
+        kept_frequent = self.__keep_subtrees(offsets, frequent)
+        kept = self.__keep_subtrees(offsets, frequent & ranked)
+        before = np.concatenate(([0], np.cumsum(kept)))
+        pruned = FrozenTrie(
+            array("I", np.append(before[offsets[:-1][kept]], before[-1])
+                  .astype(np.uint32).tobytes()),
+            array("I", tokens[kept].astype(np.uint32).tobytes()),
+            array("I", frequencies[kept].astype(np.uint32).tobytes()))
+        return pruned, {"min_count": int(size - kept_frequent.sum()),
+                        "max_children": int(kept_frequent.sum() - kept.sum())}
+
+    @staticmethod
+    def __rank_children(offsets: np.ndarray, tokens: np.ndarray, frequencies: np.ndarray,
+                        parents: np.ndarray, frequent: np.ndarray) -> np.ndarray:
+        """Ranks the children of every node, the frequent ones by frequency and the rare ones last
+
+        Args:
+            offsets (ndarray): The offsets of the Trie
+            tokens (ndarray): The tokens of the Trie
+            frequencies (ndarray): The frequencies of the Trie
+            parents (ndarray): The parent of every node
+            frequent (ndarray): Whether every node passes the min count
+
+        Returns:
+            ndarray: The rank of every node among its siblings, from 0
+        """
+
+        size = len(frequencies)
+        order = np.lexsort((tokens[1:], -frequencies[1:], ~frequent[1:], parents[1:])) + 1
+        ranks = np.zeros(size, dtype=np.int64)
+        ranks[order] = np.arange(1, size) - offsets[parents[order]]
+        return ranks
+
+    @staticmethod
+    def __keep_subtrees(offsets: np.ndarray, passing: np.ndarray) -> np.ndarray:
+        """Marks the nodes that pass and whose ancestors all pass
+
+        Args:
+            offsets (ndarray): The offsets of the Trie
+            passing (ndarray): Whether every node passes on its own
+
+        Returns:
+            ndarray: Whether every node is kept
+        """
+
+        kept = passing.copy()
+        start, end = 0, 1
+        while start < end:
+            child_start, child_end = int(offsets[start]), int(offsets[end])
+            kept[child_start:child_end] &= np.repeat(kept[start:end],
+                                                     np.diff(offsets[start:end + 1]))
+            start, end = child_start, child_end
+        return kept
+
+    @property
+    def root(self) -> FrozenTrieNode:
+        """Returns the root node of the Trie"""
+
+        return FrozenTrieNode(self, 0)
+
+    @property
+    def node_count(self) -> int:
+        """Returns the number of nodes in the Trie"""
+
+        return len(self.frequencies)
+
+    @property
+    def nbytes(self) -> int:
+        """Returns the size of the arrays in bytes"""
+
+        return sum(memoryview(values).nbytes
+                   for values in (self.offsets, self.tokens, self.frequencies))
+
+    def stats(self) -> dict:
+        """Returns the size and the shape of the Trie.
+
+        The levels are walked one at a time with NumPy, as the nodes
+        of a level are contiguous in the breadth-first layout.
+
+        Returns:
+            dict: The node and edge counts, the estimated size in bytes and
+                the branching factor distribution of every depth.
+        """
+
+        offsets = np.frombuffer(self.offsets, dtype=np.uint32).astype(np.int64)
+        depths = []
+        start, end = 0, 1
+        while start < end:
+            depths.append(describe_level(len(depths), np.diff(offsets[start:end + 1])))
+            start, end = int(offsets[start]), int(offsets[end])
+        return {
+            "nodes": self.node_count,
+            "edges": self.node_count - 1,
+            "bytes": self.nbytes,
+            "depths": depths,
+        }
+
+    def children_of(self, index: int) -> dict:
+        """Returns the children of a node.
+
+        Args:
+            index (int): The index of the node.
+
+        Returns:
+            dict: The children nodes keyed by token id.
+        """
+
+        return {self.tokens[i]: FrozenTrieNode(self, i)
+                for i in range(self.offsets[index], self.offsets[index + 1])}
+
+    def find(self, sequence) -> int:
+        """Returns the index of the node reached by a sequence.
+
+        Args:
+            sequence (list): The token id sequence to follow.
+
+        Returns:
+            int: The index of the node, None if the sequence is not in the Trie.
+        """
+
+        index = 0
+        for token in sequence:
+            start = self.offsets[index]
+            end = self.offsets[index + 1]
+            index = bisect_left(self.tokens, token, start, end)
+            if index == end or self.tokens[index] != token:
+                return None
+        return index
+
+    def get_node(self, sequence: list) -> FrozenTrieNode:
+        """Returns the node reached by a sequence.
+
+        Args:
+            sequence (list): The sequence to follow.
+
+        Returns:
+            FrozenTrieNode: The node, None if the sequence is not in the Trie.
+        """
+
+        index = self.find(sequence)
+        if index is None:
+            return None
+        return FrozenTrieNode(self, index)
+
+    def next_tokens(self, sequence: list) -> tuple:
+        """Returns the tokens that follow a sequence and their counts.
+
+        Args:
+            sequence (list): The sequence to look up.
+
+        Returns:
+            tuple: The lists of the next token ids in ascending order and
+                their counts, None if the sequence is not in the Trie.
+        """
+
+        index = self.find(sequence)
+        if index is None:
+            return None
+        start = self.offsets[index]
+        end = self.offsets[index + 1]
+        return self.tokens[start:end].tolist(), self.frequencies[start:end].tolist()
+
+    def get_children(self, sequence: list) -> dict:
+        """Returns the children of a sequence.
+
+        Args:
+            sequence (list): The sequence to get the children of.
+
+        Returns:
+            dict: The children nodes of the sequence.
+        """
+
+        index = self.find(sequence)
+        if index is None:
+            return None
+        return self.children_of(index)
+
+    def get_sampling_table(self, sequence: list) -> SamplingTable:
+        """Returns the next token distribution of a sequence.
+
+        The table is built on first use and kept in an LRUCache of the
+        SAMPLING_TABLE_CACHE_SIZE most recently used tables.
+
+        Args:
+            sequence (list): The sequence to get the distribution of.
+
+        Returns:
+            SamplingTable: The distribution, None if the sequence has no children.
+        """
+
+        index = self.find(sequence)
+        if index is None:
+            return None
+        table = self.__sampling_tables.get(index)
+        if table is None:
+            start = self.offsets[index]
+            end = self.offsets[index + 1]
+            if start == end:
+                return None
+            table = SamplingTable(
+                self.tokens[start:end], self.frequencies[start:end])
+            self.__sampling_tables.put(index, table)
+        return table
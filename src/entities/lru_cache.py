@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """ Represents a bounded cache with least recently used eviction.
+
+    Attributes:
+        size (int): The maximum number of entries.
+        hits (int): The number of lookups that found an entry.
+        misses (int): The number of lookups that did not find an entry.
+    """
+
+    def __init__(self, size: int) -> None:
+        """Initializes the LRUCache
+
+        Args:
+            size (int): The maximum number of entries.
+        """
+
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, key):
+        """Returns the value of a key and marks it as recently used.
+
+        Args:
+            key: The key to look up.
+
+        Returns:
+            The value, None if the key is not in the cache.
+        """
+
+        value = self.__entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__entries.move_to_end(key)
+        return value
+
+    def put(self, key, value) -> None:
+        """Adds a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key: The key of the value.
+            value: The value to be cached, not None.
+        """
+
+        self.__entries[key] = value
+        self.__entries.move_to_end(key)
+        if len(self.__entries) > self.size:
+            self.__entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Removes all the entries."""
+
+        self.__entries.clear()
@@ -0,0 +1,32 @@
+from typing import Protocol, runtime_checkable
+from .sampling_table import SamplingTable
+
+
+@runtime_checkable
+class ModelBackend(Protocol):
+    """ The interface of the data structures a MarkovModel is built on.
+
+    A backend maps a context, a sequence of token ids, to the tokens that
+    follow it in the text and their counts. GenerateService and
+    AutocompleteService only query the model through this interface, so the
+    Trie, the FrozenTrie, the SuffixArray, the NGramTable and a MarkovModel
+    built on any of them can be used interchangeably. The node views of the
+    backends are not a part of the interface.
+    """
+
+    def next_tokens(self, sequence: list) -> tuple:
+        """Returns the tokens that follow a context and their counts.
+
+        Args:
+            sequence (list): The token ids of the context.
+
+        Returns:
+            tuple: The next token ids in ascending order and their counts,
+                None if the context is not in the text.
+        """
+
+    def get_sampling_table(self, sequence: list) -> SamplingTable:
+        """Returns the next token distribution, None if there is none."""
+
+    def stats(self) -> dict:
+        """Returns the size and the shape of the backend."""
@@ -0,0 +1,315 @@
+import sys
+from array import array
+from bisect import bisect_left
+import numpy as np
+from .frozen_trie import FrozenTrie, SAMPLING_TABLE_CACHE_SIZE
+from .lru_cache import LRUCache
+from .sampling_table import SamplingTable
+
+
+class NGramTableNode:
+    """ Read-only view of a context in the NGramTable.
+
+    Mirrors the TrieNode interface so that the services can use
+    the table in place of a Trie.
+    """
+
+    __slots__ = ("__table", "__sequence", "__frequency")
+
+    def __init__(self, table, sequence: tuple, frequency: int) -> None:
+        """Initializes the view
+
+        Args:
+            table (NGramTable): The NGramTable the context belongs to.
+            sequence (tuple): The token ids of the context.
+            frequency (int): The number of occurrences of the context.
+        """
+
+        self.__table = table
+        self.__sequence = sequence
+        self.__frequency = frequency
+
+    @property
+    def frequency(self) -> int:
+        """Returns the number of occurrences of the context"""
+
+        return self.__frequency
+
+    @property
+    def children(self) -> dict:
+        """Returns the contexts one token longer, keyed by the token id"""
+
+        return self.__table.children_of(self.__sequence)
+
+
+class NGramTable:
+    """ Represents the counts as a flat hash table of contexts.
+
+    Every context that is followed by at least one token is a row of the
+    table. The token ids of the context are packed into a bytes key, and a
+    dict maps the key to the row. The next tokens of the row and their
+    counts are a contiguous block of two flat arrays, sorted by token id.
+    A lookup hashes the whole context at once instead of walking it one
+    token at a time, so its cost barely grows with the degree.
+
+    The rows are laid out in the breadth-first order of the equivalent
+    FrozenTrie, which the table is built from and can be turned back into.
+
+    Attributes:
+        offsets (array): The index of the first next token of every row.
+        tokens (array): The next token ids of the rows.
+        counts (array): The counts of the next tokens.
+        frequencies (array): The number of occurrences of the context of every row.
+        nodes (array): The FrozenTrie node of every row.
+    """
+
+    def __init__(self, offsets, tokens, counts, frequencies, nodes, keys: list) -> None:
+        """Initializes the NGramTable
+
+        Args:
+            offsets (array): The index of the first next token of every row,
+                followed by the number of next tokens.
+            tokens (array): The next token ids of the rows.
+            counts (array): The counts of the next tokens.
+            frequencies (array): The number of occurrences of the context of every row.
+            nodes (array): The FrozenTrie node of every row.
+            keys (list): The packed context of every row.
+        """
+
+        self.offsets = offsets
+        self.tokens = tokens
+        self.counts = counts
+        self.frequencies = frequencies
+        self.nodes = nodes
+        self.__rows = dict(zip(keys, range(len(keys))))
+        self.__sampling_tables = LRUCache(SAMPLING_TABLE_CACHE_SIZE)
+
+    @classmethod
+    def from_frozen_trie(cls, trie: FrozenTrie):
+        """Builds the table from the nodes of a FrozenTrie.
+
+        The children of all the nodes already form one contiguous block in
+        the breadth-first layout, so the next tokens and their counts are the
+        node arrays without the root. The contexts of every level are built
+        with NumPy from the contexts of the previous level, and packed into
+        keys by viewing every row of a level as a single bytes value.
+
+        Args:
+            trie (FrozenTrie): The counts to index.
+
+        Returns:
+            NGramTable: The table.
+        """
+
+        offsets = np.frombuffer(trie.offsets, dtype=np.uint32).astype(np.int64)
+        node_tokens = np.frombuffer(trie.tokens, dtype=np.uint32)
+        branching = np.diff(offsets)
+        keys = []
+        contexts = np.zeros((1, 0), dtype=np.uint32)
+        start, end = 0, 1
+        while start < end:
+            internal = np.flatnonzero(branching[start:end])
+            keys.extend(np.ascontiguousarray(contexts[internal]).view(
+                np.dtype((np.void, 4 * contexts.shape[1]))).reshape(-1).tolist()
+                        if contexts.shape[1] else [b""] * len(internal))
+            child_start, child_end = int(offsets[start]), int(offsets[end])
+            contexts = np.column_stack((np.repeat(contexts, branching[start:end], axis=0),
+                                        node_tokens[child_start:child_end]))
+            start, end = child_start, child_end
+        rows = np.flatnonzero(branching)
+        return cls(array("I", np.append(offsets[rows] - 1, len(trie.tokens) - 1)
+                         .astype(np.uint32).tobytes()),
+                   trie.tokens[1:], trie.frequencies[1:],
+                   array("I", np.frombuffer(trie.frequencies, dtype=np.uint32)[rows].tobytes()),
+                   array("I", rows.astype(np.uint32).tobytes()), keys)
+
+    @classmethod
+    def from_tokens(cls, tokens, order: int):
+        """Counts the sequences of a text straight into a table.
+
+        Args:
+            tokens (array): The token ids of the text.
+            order (int): The length of the sequences, max degree + 1.
+
+        Returns:
+            NGramTable: The counts of the text, see FrozenTrie.from_tokens.
+        """
+
+        return cls.from_frozen_trie(FrozenTrie.from_tokens(tokens, order))
+
+    @property
+    def row_count(self) -> int:
+        """Returns the number of contexts followed by a token"""
+
+        return len(self.frequencies)
+
+    @property
+    def nbytes(self) -> int:
+        """Returns the estimated size of the arrays and the hash index in bytes"""
+
+        size = sum(memoryview(values).nbytes for values in
+                   (self.offsets, self.tokens, self.counts, self.frequencies, self.nodes))
+        return size + sys.getsizeof(self.__rows) + \
+            sum(sys.getsizeof(key) for key in self.__rows)
+
+    @staticmethod
+    def pack(sequence) -> bytes:
+        """Packs a context into the key of its row
+
+        Args:
+            sequence (list): The token ids of the context.
+
+        Returns:
+            bytes: The key.
+        """
+
+        return array("I", sequence).tobytes()
+
+    def find(self, sequence) -> int:
+        """Returns the row of a context.
+
+        Args:
+            sequence (list): The token ids of the context.
+
+        Returns:
+            int: The row, None if the context is not followed by any token.
+        """
+
+        return self.__rows.get(self.pack(sequence))
+
+    def next_tokens(self, sequence: list) -> tuple:
+        """Returns the tokens that follow a context and their counts.
+
+        Args:
+            sequence (list): The token ids of the context.
+
+        Returns:
+            tuple: The lists of the next token ids in ascending order and
+                their counts, None if the context is not in the text.
+        """
+
+        row = self.find(sequence)
+        if row is None:
+            return None if self.get_node(sequence) is None else ([], [])
+        start = self.offsets[row]
+        end = self.offsets[row + 1]
+        return self.tokens[start:end].tolist(), self.counts[start:end].tolist()
+
+    def children_of(self, sequence: tuple) -> dict:
+        """Returns the contexts one token longer than a context.
+
+        Args:
+            sequence (tuple): The token ids of the context.
+
+        Returns:
+            dict: The child nodes keyed by token id.
+        """
+
+        row = self.find(sequence)
+        if row is None:
+            return {}
+        return {self.tokens[i]: NGramTableNode(self, sequence + (self.tokens[i],),
+                                               self.counts[i])
+                for i in range(self.offsets[row], self.offsets[row + 1])}
+
+    def get_node(self, sequence: list) -> NGramTableNode:
+        """Returns the node of a context.
+
+        The contexts that are not followed by any token have no row, so
+        they are looked up in the row of their prefix instead.
+
+        Args:
+            sequence (list): The token ids of the context.
+
+        Returns:
+            NGramTableNode: The node, None if the context is not in the text.
+        """
+
+        sequence = tuple(sequence)
+        row = self.find(sequence)
+        if row is not None:
+            return NGramTableNode(self, sequence, self.frequencies[row])
+        if not sequence:
+            return NGramTableNode(self, sequence, 0)
+        row = self.find(sequence[:-1])
+        if row is None:
+            return None
+        start = self.offsets[row]
+        end = self.offsets[row + 1]
+        index = bisect_left(self.tokens, sequence[-1], start, end)
+        if index == end or self.tokens[index] != sequence[-1]:
+            return None
+        return NGramTableNode(self, sequence, self.counts[index])
+
+    def get_children(self, sequence: list) -> dict:
+        """Returns the children of a context.
+
+        Args:
+            sequence (list): The token ids of the context.
+
+        Returns:
+            dict: The children nodes of the context.
+        """
+
+        node = self.get_node(sequence)
+        if node is None:
+            return None
+        return node.children
+
+    def get_sampling_table(self, sequence: list) -> SamplingTable:
+        """Returns the next token distribution of a context.
+
+        The table is built on first use and kept in an LRUCache of the
+        SAMPLING_TABLE_CACHE_SIZE most recently used tables.
+
+        Args:
+            sequence (list): The token ids of the context.
+
+        Returns:
+            SamplingTable: The distribution, None if the context has no children.
+        """
+
+        row = self.find(sequence)
+        if row is None:
+            return None
+        table = self.__sampling_tables.get(row)
+        if table is None:
+            start = self.offsets[row]
+            end = self.offsets[row + 1]
+            table = SamplingTable(self.tokens[start:end], self.counts[start:end])
+            self.__sampling_tables.put(row, table)
+        return table
+
+    def freeze(self):
+        """Turns the table back into the FrozenTrie it was built from.
+
+        The node of every row gives the first child of the node, and the
+        leaves in between point at the first child of the next row.
+
+        Returns:
+            FrozenTrie: The counts as a FrozenTrie.
+        """
+
+        size = len(self.tokens) + 1
+        firsts = np.full(size + 1, size, dtype=np.int64)
+        firsts[np.frombuffer(self.nodes, dtype=np.uint32)] = \
+            np.frombuffer(self.offsets, dtype=np.uint32)[:-1].astype(np.int64) + 1
+        offsets = np.minimum.accumulate(firsts[::-1])[::-1]
+        root = self.frequencies[0] if self.row_count else 0
+        return FrozenTrie(array("I", offsets.astype(np.uint32).tobytes()),
+                          array("I", [0]) + array("I", self.tokens),
+                          array("I", [root]) + array("I", self.counts))
+
+    def stats(self) -> dict:
+        """Returns the size and the shape of the table.
+
+        Returns:
+            dict: The node and edge counts of the equivalent Trie, the number
+                of rows, the estimated size in bytes and the branching factor
+                distribution of every depth.
+        """
+
+        stats = self.freeze().stats()
+        stats["rows"] = self.row_count
+        stats["bytes"] = self.nbytes
+        return stats
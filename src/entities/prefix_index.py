@@ -0,0 +1,67 @@
+from bisect import bisect_left
+from heapq import nlargest
+
+# The number of words kept per prefix bucket
+TOP_K = 10
+# The longest prefix with a bucket of its own
+BUCKET_LENGTH = 2
+
+
+class PrefixIndex:
+    """ Ranked index of the words that can follow a context.
+
+    The words are kept sorted alphabetically, so the words starting with
+    a prefix form one range found with a binary search, and sorted by
+    frequency, so the most frequent words are a plain slice.
+
+    The short prefixes match the most words, so the TOP_K most frequent
+    words of every prefix up to BUCKET_LENGTH characters are ranked up
+    front, and completing one is a slice of its bucket. A longer prefix, or
+    a k above TOP_K, ranks the m words of its range with a heap, in
+    O(log n + m log k) time, where m shrinks with every typed character.
+
+    Attributes:
+        words (list): The words in alphabetical order.
+        frequencies (list): The frequencies of the words.
+        ranked (list): The words in descending order of frequency.
+        buckets (dict): The TOP_K most frequent words of the short prefixes.
+    """
+
+    def __init__(self, words, frequencies) -> None:
+        """Initializes the PrefixIndex
+
+        Args:
+            words (list): The words that can follow the context.
+            frequencies (list): The frequencies of the words.
+        """
+
+        pairs = sorted(zip(words, frequencies))
+        self.words = [word for word, _ in pairs]
+        self.frequencies = [frequency for _, frequency in pairs]
+        self.ranked = [word for word, _ in sorted(pairs, key=lambda pair: -pair[1])]
+        self.buckets = {}
+        for word in self.ranked:
+            for length in range(1, min(len(word), BUCKET_LENGTH) + 1):
+                bucket = self.buckets.setdefault(word[:length], [])
+                if len(bucket) < TOP_K:
+                    bucket.append(word)
+
+    def complete(self, prefix: str = "", k: int = 10) -> list:
+        """Returns the most frequent words starting with a prefix.
+
+        Args:
+            prefix (str, optional): The partially typed word. Defaults to "".
+            k (int, optional): The maximum number of words. Defaults to 10.
+
+        Returns:
+            list: The words, most frequent first.
+        """
+
+        if not prefix:
+            return self.ranked[:k]
+        if len(prefix) <= BUCKET_LENGTH and k <= TOP_K:
+            return self.buckets.get(prefix, [])[:k]
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + chr(0x10ffff), start)
+        indexes = nlargest(k, range(start, end), key=self.frequencies.__getitem__)
+        return [self.words[index] for index in indexes]
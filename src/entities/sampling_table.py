@@ -0,0 +1,73 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+
+class SamplingTable:
+    """ Represents the next token distribution of a context.
+
+    Holds the cumulative frequencies of the children of a context node,
+    so that a weighted random choice is a binary search instead of
+    recalculating the probabilities on every step.
+
+    Attributes:
+        tokens (tuple): The possible next tokens.
+        cumulative (list): The cumulative frequencies of the tokens.
+        total (int): The sum of the frequencies.
+    """
+
+    __slots__ = ("tokens", "cumulative", "total", "__excluded")
+
+    def __init__(self, tokens, frequencies) -> None:
+        """Initializes the SamplingTable
+
+        Args:
+            tokens (list): The possible next tokens.
+            frequencies (list): The frequencies of the tokens.
+        """
+
+        self.tokens = tuple(tokens)
+        self.cumulative = list(accumulate(frequencies))
+        self.total = self.cumulative[-1] if self.cumulative else 0
+        self.__excluded = None
+
+    def sample(self, value: float):
+        """Picks the token that a uniform random value falls on.
+
+        Args:
+            value (float): A random value in the range [0, 1).
+
+        Returns:
+            The picked token.
+        """
+
+        index = bisect_right(self.cumulative, value * self.total)
+        if index == len(self.tokens):
+            index -= 1
+        return self.tokens[index]
+
+    def excluding(self, token):
+        """Returns the distribution without a token.
+
+        The frequencies of the other tokens are kept, so the distribution
+        is renormalized over them. The result is kept for the next call,
+        so a cached table is only filtered once.
+
+        Args:
+            token: The token to leave out.
+
+        Returns:
+            SamplingTable: The distribution, the table itself if the token is
+                not in it, None if it is the only token.
+        """
+
+        if self.__excluded is None or self.__excluded[0] != token:
+            kept = None
+            if token in self.tokens:
+                frequencies = [high - low for low, high in
+                               zip([0] + self.cumulative, self.cumulative)]
+                pairs = [(other, frequency) for other, frequency in
+                         zip(self.tokens, frequencies) if other != token]
+                kept = SamplingTable(*zip(*pairs)) if pairs else False
+            self.__excluded = (token, kept)
+        kept = self.__excluded[1]
+        return self if kept is None else kept or None
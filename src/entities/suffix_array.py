@@ -0,0 +1,341 @@
+from array import array
+from bisect import bisect_left, bisect_right
+import numpy as np
+from .frozen_trie import describe_level
+from .sampling_table import SamplingTable
+
+
+class SuffixArrayNode:
+    """ Read-only view of a context in the SuffixArray.
+
+    A context is the range of the suffixes that start with it, so the
+    node mirrors the TrieNode interface without storing any nodes.
+    """
+
+    __slots__ = ("__index", "__depth", "__start", "__end")
+
+    def __init__(self, index, depth: int, start: int, end: int) -> None:
+        """Initializes the view
+
+        Args:
+            index (SuffixArray): The SuffixArray the context belongs to.
+            depth (int): The length of the context.
+            start (int): The first suffix starting with the context.
+            end (int): The suffix after the last one starting with the context.
+        """
+
+        self.__index = index
+        self.__depth = depth
+        self.__start = start
+        self.__end = end
+
+    @property
+    def frequency(self) -> int:
+        """Returns the number of occurrences of the context"""
+
+        return self.__end - self.__start
+
+    @property
+    def children(self) -> dict:
+        """Returns the contexts one token longer, keyed by the token id"""
+
+        return self.__index.children_of(self.__depth, self.__start, self.__end)
+
+
+class SuffixArray:
+    """ Represents a variable-order index over the whole token stream.
+
+    The suffixes of the text are sorted once, so the occurrences of any
+    context form a contiguous range of the suffix array, which is found with
+    a binary search. The next tokens of the context are the tokens that
+    follow the suffixes in the range, and as the range is sorted, the
+    suffixes followed by the same token are contiguous as well. The index
+    answers queries of any length without being rebuilt, and its size does
+    not depend on the degree.
+
+    The LCP array, the length of the common prefix of every suffix with the
+    previous one, is built on first use to describe the shape of the index.
+    The arrays are indexed with NumPy through views of their own memory, so
+    the index holds a single copy of the text and of the suffixes.
+
+    Attributes:
+        tokens (array): The token ids of the text.
+        suffixes (array): The start positions of the suffixes in sorted order.
+        lcp (array): The longest common prefixes of the adjacent suffixes.
+    """
+
+    def __init__(self, tokens) -> None:
+        """Initializes the SuffixArray
+
+        Args:
+            tokens (iterable): The token ids of the text.
+        """
+
+        self.tokens = array("I", tokens)
+        self.__values = np.frombuffer(self.tokens, dtype=np.uint32)
+        self.suffixes = array("I", self.__sort_suffixes(self.__values)
+                              .astype(np.uint32).tobytes())
+        self.__suffixes = np.frombuffer(self.suffixes, dtype=np.uint32)
+        self.__lcp = None
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    @property
+    def root(self) -> SuffixArrayNode:
+        """Returns the empty context"""
+
+        return SuffixArrayNode(self, 0, 0, len(self.tokens))
+
+    @property
+    def lcp(self) -> array:
+        """Returns the longest common prefixes of the adjacent suffixes"""
+
+        if self.__lcp is None:
+            self.__lcp = self.__build_lcp()
+        return self.__lcp
+
+    @property
+    def nbytes(self) -> int:
+        """Returns the size of the arrays in bytes"""
+
+        size = memoryview(self.tokens).nbytes + memoryview(self.suffixes).nbytes
+        if self.__lcp is not None:
+            size += memoryview(self.__lcp).nbytes
+        return size
+
+    def find(self, sequence) -> tuple:
+        """Returns the range of the suffixes starting with a sequence.
+
+        Args:
+            sequence (list): The token id sequence to look up.
+
+        Returns:
+            tuple: The first suffix and the suffix after the last one,
+                None if the sequence is not in the text.
+        """
+
+        target = array("I", sequence)
+        length = len(target)
+        if not length:
+            return (0, len(self.tokens))
+        tokens = self.tokens
+
+        def prefix(position: int) -> array:
+            return tokens[position:position + length]
+
+        start = bisect_left(self.suffixes, target, key=prefix)
+        end = bisect_right(self.suffixes, target, start, key=prefix)
+        if start == end:
+            return None
+        return (start, end)
+
+    def children_of(self, depth: int, start: int, end: int) -> dict:
+        """Returns the contexts one token longer than a context.
+
+        Args:
+            depth (int): The length of the context.
+            start (int): The first suffix starting with the context.
+            end (int): The suffix after the last one starting with the context.
+
+        Returns:
+            dict: The child nodes keyed by token id.
+        """
+
+        first, tokens, starts, ends = self.__next_tokens(depth, start, end)
+        return {int(token): SuffixArrayNode(self, depth + 1, first + child_start, first + child_end)
+                for token, child_start, child_end in zip(tokens, starts, ends)}
+
+    def get_node(self, sequence: list) -> SuffixArrayNode:
+        """Returns the node of a sequence.
+
+        Args:
+            sequence (list): The sequence to look up.
+
+        Returns:
+            SuffixArrayNode: The node, None if the sequence is not in the text.
+        """
+
+        bounds = self.find(sequence)
+        if bounds is None:
+            return None
+        return SuffixArrayNode(self, len(sequence), *bounds)
+
+    def next_tokens(self, sequence: list) -> tuple:
+        """Returns the tokens that follow a sequence and their counts.
+
+        Args:
+            sequence (list): The sequence to look up.
+
+        Returns:
+            tuple: The lists of the next token ids in ascending order and
+                their counts, None if the sequence is not in the text.
+        """
+
+        bounds = self.find(sequence)
+        if bounds is None:
+            return None
+        _, tokens, starts, ends = self.__next_tokens(len(sequence), *bounds)
+        return tokens.tolist(), (ends - starts).tolist()
+
+    def get_children(self, sequence: list) -> dict:
+        """Returns the children of a sequence.
+
+        Args:
+            sequence (list): The sequence to get the children of.
+
+        Returns:
+            dict: The children nodes of the sequence.
+        """
+
+        bounds = self.find(sequence)
+        if bounds is None:
+            return None
+        return self.children_of(len(sequence), *bounds)
+
+    def get_sampling_table(self, sequence: list) -> SamplingTable:
+        """Returns the next token distribution of a sequence.
+
+        Args:
+            sequence (list): The sequence to get the distribution of.
+
+        Returns:
+            SamplingTable: The distribution, None if the sequence has no children.
+        """
+
+        bounds = self.find(sequence)
+        if bounds is None:
+            return None
+        _, tokens, starts, ends = self.__next_tokens(len(sequence), *bounds)
+        if tokens.size == 0:
+            return None
+        return SamplingTable(tokens.tolist(), (ends - starts).tolist())
+
+    def stats(self, max_depth: int = 5) -> dict:
+        """Returns the size and the shape of the index.
+
+        The contexts of a depth start where the LCP with the previous suffix
+        is shorter than the depth, so the levels of the equivalent Trie are
+        counted without building it.
+
+        Args:
+            max_depth (int, optional): The deepest level described. Defaults to 5.
+
+        Returns:
+            dict: The node and edge counts of the equivalent Trie down to the
+                max depth, the size of the arrays in bytes and the branching
+                factor distribution of every depth.
+        """
+
+        lcp = np.frombuffer(self.lcp, dtype=np.uint32).astype(np.int64)
+        lengths = len(self.tokens) - self.__suffixes
+        starts = [None] + [(lengths >= depth) & (lcp < depth)
+                           for depth in range(1, max_depth + 2)]
+        depths = [describe_level(0, [int(starts[1].sum())])]
+        for depth in range(1, max_depth + 1):
+            groups = np.cumsum(starts[depth]) - 1
+            branching = np.bincount(groups[starts[depth + 1]],
+                                    minlength=int(starts[depth].sum()))
+            if branching.size == 0:
+                break
+            depths.append(describe_level(depth, branching))
+        nodes = sum(level["nodes"] for level in depths)
+        return {
+            "nodes": nodes,
+            "edges": nodes - 1,
+            "bytes": self.nbytes,
+            "tokens": len(self.tokens),
+            "depths": depths,
+        }
+
+    def __next_tokens(self, depth: int, start: int, end: int) -> tuple:
+        """Groups the suffixes of a context by the token that follows it
+
+        Args:
+            depth (int): The length of the context.
+            start (int): The first suffix starting with the context.
+            end (int): The suffix after the last one starting with the context.
+
+        Returns:
+            tuple: The first suffix followed by a token, the next tokens, and
+                the start and end of their ranges relative to the first suffix.
+        """
+
+        positions = self.__suffixes[start:end] + depth
+        # Only the suffix that ends right after the context has no next token,
+        # and it sorts first in the range.
+        first = start + int(positions[0] >= len(self.tokens)) if positions.size else start
+        following = self.__values[positions[first - start:]]
+        boundaries = np.flatnonzero(following[1:] != following[:-1]) + 1
+        if following.size == 0:
+            return first, following, boundaries, boundaries
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [following.size]))
+        return first, following[starts], starts, ends
+
+    @staticmethod
+    def __sort_suffixes(values: np.ndarray) -> np.ndarray:
+        """Sorts the suffixes by prefix doubling
+
+        Every round sorts the suffixes by the ranks of their first k tokens
+        and of the k tokens after those, which gives the ranks of their first
+        2k tokens, until every suffix has a rank of its own.
+
+        The ranks are kept as int64 while sorting, as the second rank of
+        the suffixes near the end of the text is -1.
+
+        Args:
+            values (ndarray): The token ids of the text.
+
+        Returns:
+            ndarray: The start positions of the suffixes in sorted order.
+        """
+
+        size = len(values)
+        if size == 0:
+            return np.zeros(0, dtype=np.int64)
+        rank = np.unique(values, return_inverse=True)[1].astype(np.int64).reshape(-1)
+        order = np.argsort(rank, kind="stable")
+        length = 1
+        while length < size:
+            second = np.full(size, -1, dtype=np.int64)
+            second[:size - length] = rank[length:]
+            order = np.lexsort((second, rank))
+            changed = (rank[order][1:] != rank[order][:-1]) | \
+                (second[order][1:] != second[order][:-1])
+            rank = np.empty(size, dtype=np.int64)
+            rank[order] = np.concatenate(([0], np.cumsum(changed)))
+            if rank[order[-1]] == size - 1:
+                break
+            length *= 2
+        return order
+
+    def __build_lcp(self) -> array:
+        """Builds the LCP array with Kasai's algorithm in linear time
+
+        Returns:
+            array: The length of the common prefix of every suffix with the
+                previous suffix in sorted order, 0 for the first one.
+        """
+
+        tokens = self.tokens.tolist()
+        suffixes = self.suffixes.tolist()
+        size = len(tokens)
+        rank = [0] * size
+        for index, position in enumerate(suffixes):
+            rank[position] = index
+        lcp = [0] * size
+        common = 0
+        for position in range(size):
+            index = rank[position]
+            if index == 0:
+                common = 0
+                continue
+            previous = suffixes[index - 1]
+            while position + common < size and previous + common < size and \
+                    tokens[position + common] == tokens[previous + common]:
+                common += 1
+            lcp[index] = common
+            if common:
+                common -= 1
+        return array("I", lcp)
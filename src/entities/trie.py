@@ -1,36 +1,233 @@
+import sys
+from array import array
+from collections import deque
 from .trie_node import TrieNode
+from .frozen_trie import FrozenTrie, describe_level
+from .sampling_table import SamplingTable
 
 
 class Trie:
     """ Represents a Trie data structure.
 
-    The Trie is used to store sequences of words and their frequencies.
+    The Trie is used to store sequences of tokens and their frequencies.
+    The MarkovModel keys the Trie by integer token ids.
 
     Attributes:
         root (TrieNode): The root node of the Trie.
+        minimized (bool): Whether the identical subtrees share their nodes.
     """
 
     def __init__(self) -> None:
         """Initializes the Trie"""
 
         self.root = TrieNode()
+        self.__minimized = False
 
-    def insert(self, sequence) -> None:
+    @property
+    def minimized(self) -> bool:
+        """Returns whether the identical subtrees share their nodes"""
+
+        return self.__minimized
+
+    def insert(self, sequence, start: int = 0) -> None:
         """Inserts a sequence into the Trie.
 
-        Existing sequences will have their frequency increased.
+        Every node along the path has its frequency increased, so each
+        node counts the occurrences of the prefix it represents, and the
+        Trie can answer queries for every prefix length. The sampling
+        tables of the nodes whose children change are invalidated.
 
         Args:
-            sequence (list): The word sequence to be inserted.
+            sequence (list): The token sequence to be inserted.
+            start (int, optional): The length of the prefix that has already
+                been counted and is only followed. Defaults to 0.
+
+        Raises:
+            ValueError: If the Trie has been minimized.
         """
 
+        if self.__minimized:
+            raise ValueError("a minimized Trie cannot be changed")
         node = self.root
-        for word in sequence:
-            if word not in node.children:
-                node.children[word] = TrieNode()
-            node = node.children[word]
+        for token in sequence:
+            child = node.children.get(token)
+            if child is None:
+                child = node.children[token] = TrieNode()
+            if start:
+                start -= 1
+            else:
+                child.frequency += 1
+                node.sampling_table = None
+            node = child
         node.is_sequence = True
-        node.frequency += 1
+
+    def merge(self, other) -> None:
+        """Adds the frequencies of another Trie into this one.
+
+        Args:
+            other (Trie): The Trie to be merged, either a Trie or a FrozenTrie.
+
+        Raises:
+            ValueError: If this Trie has been minimized.
+        """
+
+        if self.__minimized:
+            raise ValueError("a minimized Trie cannot be changed")
+        if isinstance(other, FrozenTrie):
+            self.__merge_frozen(other)
+            return
+        stack = [(self.root, other.root)]
+        while stack:
+            node, other_node = stack.pop()
+            for token, other_child in other_node.children.items():
+                child = node.children.get(token)
+                if child is None:
+                    child = node.children[token] = TrieNode()
+                child.frequency += other_child.frequency
+                stack.append((child, other_child))
+
+    def minimize(self) -> int:
+        """Merges the identical subtrees into shared nodes.
+
+        At high degrees, most of the branches below the first levels are
+        chains of nodes that occur once. The nodes are visited children
+        first, and a node whose frequency and children, already shared
+        themselves, match an earlier node is replaced with the earlier one,
+        as in a DAWG. The queries walk the same paths as before, but the
+        Trie can no longer be changed, as a change would leak into every
+        path sharing the node.
+
+        Returns:
+            int: The number of nodes removed.
+        """
+
+        registry = {}
+        removed = 0
+        stack = [(self.root, None, None, False)]
+        while stack:
+            node, parent, token, visited = stack.pop()
+            if not visited:
+                stack.append((node, parent, token, True))
+                stack.extend((child, node, child_token, False)
+                             for child_token, child in node.children.items())
+                continue
+            key = (node.frequency, node.is_sequence,
+                   tuple(sorted((child_token, id(child))
+                                for child_token, child in node.children.items())))
+            shared = registry.setdefault(key, node)
+            if shared is not node:
+                parent.children[token] = shared
+                removed += 1
+        self.__minimized = True
+        return removed
+
+    def prune(self, min_count: int = 1, max_children: int = None) -> dict:
+        """Removes the rare sequences from the Trie.
+
+        A child counted fewer than min count times is removed with its
+        subtree, and of the remaining children of a node only the max
+        children most frequent are kept, the ties going to the lower token
+        ids. The children of the root are the vocabulary, so they are left
+        alone, which keeps every word a valid state and the root a full
+        distribution to back off to. As the frequency of a node is at most
+        that of its parent, the kept nodes still count every occurrence of
+        their prefix.
+
+        Args:
+            min_count (int, optional): The lowest frequency kept. Defaults to 1.
+            max_children (int, optional): The largest number of children kept
+                per node. Defaults to no limit.
+
+        Returns:
+            dict: The number of nodes removed for the min count and for the
+                max children.
+
+        Raises:
+            ValueError: If the Trie has been minimized.
+        """
+
+        if self.__minimized:
+            raise ValueError("a minimized Trie cannot be changed")
+        removed = {"min_count": 0, "max_children": 0}
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            children = node.children
+            if node is self.root:
+                stack.extend(children.values())
+                continue
+            dropped = [token for token, child in children.items() if child.frequency < min_count]
+            if max_children is not None and len(children) - len(dropped) > max_children:
+                ranked = sorted((item for item in children.items()
+                                 if item[1].frequency >= min_count),
+                                key=lambda item: (-item[1].frequency, item[0]))
+                dropped.extend(token for token, _ in ranked[max_children:])
+            for token in dropped:
+                self.__count_removed(children.pop(token), min_count, removed)
+            if dropped:
+                node.sampling_table = None
+            stack.extend(children.values())
+        return removed
+
+    @staticmethod
+    def __count_removed(node: TrieNode, min_count: int, removed: dict) -> None:
+        """Counts the nodes of a removed subtree by the limit that removes them.
+
+        As the frequencies only decrease along a path, the nodes under the
+        min count are exactly the ones the min count alone would remove.
+
+        Args:
+            node (TrieNode): The root of the subtree.
+            min_count (int): The lowest frequency kept.
+            removed (dict): The counts to add to.
+        """
+
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            removed["min_count" if node.frequency < min_count else "max_children"] += 1
+            stack.extend(node.children.values())
+
+    def __merge_frozen(self, other: FrozenTrie) -> None:
+        """Adds the frequencies of a FrozenTrie by walking its arrays.
+
+        The nodes of the FrozenTrie are visited in breadth-first order,
+        which is also the order of its arrays.
+
+        Args:
+            other (FrozenTrie): The FrozenTrie to be merged.
+        """
+
+        offsets = other.offsets
+        tokens = other.tokens
+        frequencies = other.frequencies
+        nodes = [self.root]
+        for index in range(len(frequencies)):
+            children = nodes[index].children
+            for child_index in range(offsets[index], offsets[index + 1]):
+                token = tokens[child_index]
+                child = children.get(token)
+                if child is None:
+                    child = children[token] = TrieNode()
+                child.frequency += frequencies[child_index]
+                nodes.append(child)
+
+    def next_tokens(self, sequence: list) -> tuple:
+        """Returns the tokens that follow a sequence and their counts.
+
+        Args:
+            sequence (list): The sequence to look up.
+
+        Returns:
+            tuple: The lists of the next token ids in ascending order and
+                their counts, None if the sequence is not in the Trie.
+        """
+
+        node = self.get_node(sequence)
+        if node is None:
+            return None
+        children = sorted(node.children.items())
+        return [token for token, _ in children], [child.frequency for _, child in children]
 
     def get_children(self, sequence: list) -> dict:
         """Returns the children of a sequence.
@@ -42,11 +239,128 @@ class Trie:
             dict: The children nodes of the sequence.
         """
 
+        node = self.get_node(sequence)
+        if node is None:
+            return None
+        return node.children
+
+    def get_node(self, sequence: list) -> TrieNode:
+        """Returns the node reached by a sequence.
+
+        Args:
+            sequence (list): The sequence to follow.
+
+        Returns:
+            TrieNode: The node, None if the sequence is not in the Trie.
+        """
+
         node = self.root
-        if not sequence:
-            return node.children
-        for word in sequence:
-            if word not in node.children:
+        for token in sequence:
+            node = node.children.get(token)
+            if node is None:
                 return None
-            node = node.children[word]
-        return node.children
+        return node
+
+    def get_sampling_table(self, sequence: list) -> SamplingTable:
+        """Returns the next token distribution of a sequence.
+
+        The table is built on first use and kept on the node.
+
+        Args:
+            sequence (list): The sequence to get the distribution of.
+
+        Returns:
+            SamplingTable: The distribution, None if the sequence has no children.
+        """
+
+        node = self.get_node(sequence)
+        if node is None or not node.children:
+            return None
+        if node.sampling_table is None:
+            node.sampling_table = SamplingTable(
+                node.children.keys(), [child.frequency for child in node.children.values()])
+        return node.sampling_table
+
+    def stats(self) -> dict:
+        """Returns the size and the shape of the Trie.
+
+        The size is estimated from the Python objects of the nodes and
+        their children dicts, so it leaves out the shared small ints. In a
+        minimized Trie, every shared node is counted once, on the first
+        level it is reached on.
+
+        Returns:
+            dict: The node and edge counts, the estimated size in bytes and
+                the branching factor distribution of every depth.
+        """
+
+        nodes = 0
+        edges = 0
+        size = 0
+        depths = []
+        seen = set()
+        level = [self.root]
+        while level:
+            branching = array("I")
+            next_level = []
+            for node in level:
+                size += sys.getsizeof(node) + sys.getsizeof(node.__dict__) \
+                    + sys.getsizeof(node.children)
+                branching.append(len(node.children))
+                next_level.extend(node.children.values())
+            nodes += len(level)
+            edges += sum(branching)
+            depths.append(describe_level(len(depths), branching))
+            level = self.__unseen(next_level, seen) if self.__minimized else next_level
+        return {
+            "nodes": nodes,
+            "edges": edges,
+            "bytes": size,
+            "minimized": self.__minimized,
+            "depths": depths,
+        }
+
+    @staticmethod
+    def __unseen(nodes: list, seen: set) -> list:
+        """Returns the nodes not seen before and marks them as seen.
+
+        Args:
+            nodes (list): The nodes.
+            seen (set): The ids of the nodes seen so far.
+
+        Returns:
+            list: The first occurrence of every node not seen before.
+        """
+
+        unseen = []
+        for node in nodes:
+            if id(node) not in seen:
+                seen.add(id(node))
+                unseen.append(node)
+        return unseen
+
+    def freeze(self) -> FrozenTrie:
+        """Packs the Trie into a read-only, array-backed FrozenTrie.
+
+        The nodes are laid out breadth-first, so the children of every node
+        end up in one contiguous block sorted by token id. The Trie must
+        be keyed by integer token ids.
+
+        Returns:
+            FrozenTrie: The frozen copy of the Trie.
+        """
+
+        offsets = array("I")
+        tokens = array("I", [0])
+        frequencies = array("I", [self.root.frequency])
+        queue = deque([self.root])
+        while queue:
+            node = queue.popleft()
+            offsets.append(len(frequencies))
+            for token in sorted(node.children):
+                child = node.children[token]
+                tokens.append(token)
+                frequencies.append(child.frequency)
+                queue.append(child)
+        offsets.append(len(frequencies))
+        return FrozenTrie(offsets, tokens, frequencies)
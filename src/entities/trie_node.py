@@ -5,3 +5,4 @@ class TrieNode:
         self.children = {}
         self.is_sequence = False
         self.frequency = 0
+        self.sampling_table = None
@@ -0,0 +1,118 @@
+import sys
+from array import array
+
+
+class Vocabulary:
+    """ Maps tokens to dense integer ids and back.
+
+    The ids are handed out in the order the tokens are first seen,
+    so they always run from 0 to len(vocabulary) - 1.
+
+    Attributes:
+        tokens (list): The tokens, indexed by their id.
+    """
+
+    def __init__(self, tokens=None) -> None:
+        """Initializes the Vocabulary
+
+        Args:
+            tokens (list, optional): The tokens to start with. Defaults to None.
+        """
+
+        self.__ids = {}
+        self.__tokens = []
+        for token in tokens or []:
+            self.add(token)
+
+    def __len__(self) -> int:
+        return len(self.__tokens)
+
+    def __contains__(self, token) -> bool:
+        return token in self.__ids
+
+    @property
+    def tokens(self) -> list:
+        """Returns the tokens, indexed by their id"""
+
+        return self.__tokens
+
+    @property
+    def nbytes(self) -> int:
+        """Returns the estimated size of the vocabulary in bytes"""
+
+        return sys.getsizeof(self.__ids) + sys.getsizeof(self.__tokens) \
+            + sum(sys.getsizeof(token) for token in self.__tokens)
+
+    def add(self, token: str) -> int:
+        """Adds a token to the vocabulary.
+
+        Args:
+            token (str): The token to be added.
+
+        Returns:
+            int: The id of the token.
+        """
+
+        token_id = self.__ids.get(token)
+        if token_id is None:
+            token_id = len(self.__tokens)
+            self.__ids[token] = token_id
+            self.__tokens.append(token)
+        return token_id
+
+    def id_of(self, token: str) -> int:
+        """Returns the id of a token, None if the token is unknown.
+
+        Args:
+            token (str): The token to look up.
+        """
+
+        return self.__ids.get(token)
+
+    def token_of(self, token_id: int) -> str:
+        """Returns the token behind an id.
+
+        Args:
+            token_id (int): The id to look up.
+        """
+
+        return self.__tokens[token_id]
+
+    def encode(self, tokens) -> array:
+        """Encodes tokens into ids, adding the unknown tokens.
+
+        Args:
+            tokens (list): The tokens to encode.
+
+        Returns:
+            array: The ids of the tokens.
+        """
+
+        return array("I", map(self.add, tokens))
+
+    def lookup(self, tokens) -> list:
+        """Encodes tokens into ids without adding new tokens.
+
+        Args:
+            tokens (list): The tokens to encode.
+
+        Returns:
+            list: The ids of the tokens, None if any of the tokens is unknown.
+        """
+
+        ids = [self.__ids.get(token) for token in tokens]
+        if None in ids:
+            return None
+        return ids
+
+    def decode(self, ids) -> list:
+        """Decodes ids back into tokens.
+
+        Args:
+            ids (list): The ids to decode.
+
+        Returns:
+            list: The tokens behind the ids.
+        """
+
+        return [self.__tokens[token_id] for token_id in ids]
@@ -1,14 +1,18 @@
 from tkinter import Tk
 from ui import UI
+from services import ProfileService
 
 
 def main():
     """Start app.
 
     Intializes the Tk instance, starts the UI, and
-    handles the mainloop.
+    handles the mainloop. Profiles the app when the
+    TEXT_GENERATOR_PROFILE environment variable is set.
     """
 
+    ProfileService.from_environment()
+
     window = Tk()
     window.title('Text Generator')
 
@@ -0,0 +1,432 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from urllib.parse import urlsplit, parse_qs, urlencode
+from services import ModelPoolService
+from services.model_pool_service import generate_texts
+
+
+# The largest number of words a text can be requested with, which bounds the
+# batch matrix a worker allocates
+MAX_LIMIT = 10000
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error"}
+
+
+class GenerateServer:
+    """Serves generated text over HTTP on localhost
+
+    GET /generate?story=...&degree=...&limit=...&start=... returns the text
+    as JSON. The concurrent requests for the same story, degree and limit are
+    collected into one batch, which is generated with BatchGenerateService in
+    a worker process. The event loop only parses the requests and hands the
+    batches over, so it never blocks on the generation.
+
+    Attributes:
+        model_pool (ModelPoolService): The resident models
+        batch_size (int): The largest number of requests in a batch
+        batch_window (float): The time in seconds a batch waits for more requests
+        batches (int): The number of batches generated
+        requests (int): The number of texts generated
+    """
+
+    def __init__(self, model_pool: ModelPoolService, executor=None, batch_size: int = 64,
+                 batch_window: float = 0.002) -> None:
+        """Initializes the server
+
+        Args:
+            model_pool (ModelPoolService): The resident models
+            executor (Executor, optional): The pool the batches run in.
+                Defaults to the default executor of the event loop.
+            batch_size (int, optional): The largest batch. Defaults to 64.
+            batch_window (float, optional): The time a batch waits for more
+                requests. Defaults to 2 ms.
+        """
+
+        self.__model_pool = model_pool
+        self.__executor = executor
+        self.__batch_size = batch_size
+        self.__batch_window = batch_window
+        self.__pending = defaultdict(list)
+        self.__timers = {}
+        self.__paths = {}
+        self.__counts = Counter()
+
+    @property
+    def batches(self) -> int:
+        """Returns the number of batches generated"""
+
+        return self.__counts["batches"]
+
+    @property
+    def requests(self) -> int:
+        """Returns the number of texts generated"""
+
+        return self.__counts["requests"]
+
+    async def generate(self, story: str, degree: int, limit: int, start: list) -> str:
+        """Generates one text as a part of a batch
+
+        Args:
+            story (str): The title of the story
+            degree (int): The degree to generate at
+            limit (int): The number of words
+            start (list): The words the text starts with
+
+        Returns:
+            str: The generated text
+        """
+
+        model_path = await self.__model_path(story, degree)
+        key = (model_path, degree, limit)
+        future = asyncio.get_running_loop().create_future()
+        pending = self.__pending[key]
+        pending.append((start, future))
+        if len(pending) == 1:
+            self.__timers[key] = asyncio.get_running_loop().call_later(
+                self.__batch_window, lambda: asyncio.ensure_future(self.__flush(key)))
+        elif len(pending) >= self.__batch_size:
+            await self.__flush(key)
+        return await future
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves the requests of one connection, keeping it alive
+
+        Args:
+            reader (StreamReader): The request stream
+            writer (StreamWriter): The response stream
+        """
+
+        try:
+            await self.__serve(reader, writer)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def __serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answers the requests of a connection until it is closed
+
+        Args:
+            reader (StreamReader): The request stream
+            writer (StreamWriter): The response stream
+        """
+
+        while (request := await self.__read_request(reader)) is not None:
+            request_line, headers = request
+            status, body = await self.__answer(request_line.split())
+            keep_alive = headers.get("connection") != "close"
+            await self.__write_response(writer, status, body, keep_alive)
+            if not keep_alive:
+                break
+
+    @staticmethod
+    async def __read_request(reader: asyncio.StreamReader) -> tuple:
+        """Reads the request line and the headers of the next request
+
+        Args:
+            reader (StreamReader): The request stream
+
+        Returns:
+            tuple: The request line and the headers, None if the connection is closed
+        """
+
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+        return request_line.decode("latin-1"), headers
+
+    @staticmethod
+    async def __write_response(writer: asyncio.StreamWriter, status: int, body: dict,
+                               keep_alive: bool) -> None:
+        """Writes a JSON response
+
+        Args:
+            writer (StreamWriter): The response stream
+            status (int): The status code
+            body (dict): The body
+            keep_alive (bool): Whether the connection stays open
+        """
+
+        payload = json.dumps(body).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            .encode("latin-1") + payload)
+        await writer.drain()
+
+    async def __answer(self, request: list) -> tuple:
+        """Answers one request, turning an unexpected error into a 500 response
+
+        A crashed worker process, for example, must not take the connection
+        down with it.
+
+        Args:
+            request (list): The method, target and version of the request
+
+        Returns:
+            tuple: The status code and the body
+        """
+
+        try:
+            return await self.__respond(request)
+        except Exception as error:  # pylint: disable=broad-except
+            return 500, {"error": f"{type(error).__name__}: {error}"}
+
+    async def __respond(self, request: list) -> tuple:
+        """Answers one request
+
+        Args:
+            request (list): The method, target and version of the request
+
+        Returns:
+            tuple: The status code and the body
+        """
+
+        if len(request) != 3 or request[0] != "GET":
+            return 405, {"error": "only GET is supported"}
+        url = urlsplit(request[1])
+        if url.path == "/stories":
+            return 200, {"stories": self.__model_pool.stories}
+        if url.path != "/generate":
+            return 404, {"error": f"no such path {url.path}"}
+        return await self.__respond_generate(url.query)
+
+    async def __respond_generate(self, query_string: str) -> tuple:
+        """Answers a request for a generated text
+
+        Args:
+            query_string (str): The query of the request
+
+        Returns:
+            tuple: The status code and the body
+        """
+
+        query = {name: values[-1] for name, values in parse_qs(query_string).items()}
+        try:
+            story = query["story"]
+            degree = int(query.get("degree", 2))
+            limit = int(query.get("limit", 100))
+        except KeyError as error:
+            return 400, {"error": f"missing parameter {error}"}
+        except ValueError as error:
+            return 400, {"error": str(error)}
+        if not 1 <= limit <= MAX_LIMIT:
+            return 400, {"error": f"limit must be between 1 and {MAX_LIMIT}"}
+        try:
+            text = await self.generate(story, degree, limit, query.get("start", "").lower().split())
+        except KeyError as error:
+            return 400, {"error": f"unknown word {error}"}
+        except ValueError as error:
+            return 400, {"error": str(error)}
+        return 200, {"story": story, "degree": degree, "text": text}
+
+    async def __model_path(self, story: str, degree: int) -> str:
+        """Returns the path of the model file, building the model only once
+
+        The model is looked up in a thread, as a cache miss builds it. A
+        failed lookup is not cached, so the next request tries again.
+
+        Args:
+            story (str): The title of the story
+            degree (int): The degree to generate at
+        """
+
+        key = (story, degree)
+        future = self.__paths.get(key)
+        if future is None:
+            future = self.__paths[key] = asyncio.get_running_loop().run_in_executor(
+                None, self.__model_pool.model_path, story, degree)
+        try:
+            return await future
+        except Exception:
+            if self.__paths.get(key) is future:
+                del self.__paths[key]
+            raise
+
+    async def __flush(self, key: tuple) -> None:
+        """Generates the pending batch of a key in the executor
+
+        Args:
+            key (tuple): The model path, degree and limit of the batch
+        """
+
+        timer = self.__timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self.__pending.pop(key, None)
+        if not pending:
+            return
+        model_path, degree, limit = key
+        starts = [start for start, _ in pending]
+        self.__counts["batches"] += 1
+        self.__counts["requests"] += len(pending)
+        try:
+            texts = await asyncio.get_running_loop().run_in_executor(
+                self.__executor, generate_texts, model_path, degree, len(starts), limit, starts)
+        except Exception as error:  # pylint: disable=broad-except
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), text in zip(pending, texts):
+            if not future.done():
+                future.set_result(text)
+
+
+async def serve(args: argparse.Namespace) -> None:
+    """Runs the server until interrupted
+
+    Args:
+        args (Namespace): The parsed arguments
+    """
+
+    model_pool = ModelPoolService(max_degree=args.max_degree)
+    for story in args.preload:
+        model_pool.get_model(story)
+    with ProcessPoolExecutor(args.workers) as executor:
+        server = GenerateServer(model_pool, executor, args.batch_size, args.batch_window / 1000)
+        tcp_server = await asyncio.start_server(server.handle, args.host, args.port)
+        print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers",
+              file=sys.stderr)
+        async with tcp_server:
+            await tcp_server.serve_forever()
+
+
+async def timed_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                        request: bytes) -> tuple:
+    """Sends one request and reads the whole response
+
+    Args:
+        reader (StreamReader): The response stream
+        writer (StreamWriter): The request stream
+        request (bytes): The request
+
+    Returns:
+        tuple: The status code as bytes and the latency in seconds
+    """
+
+    start = perf_counter()
+    writer.write(request)
+    status = (await reader.readline()).split()[1]
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    await reader.readexactly(length)
+    return status, perf_counter() - start
+
+
+async def bench(args: argparse.Namespace) -> dict:
+    """Measures the requests per second and the latency under concurrent load
+
+    Every client keeps one connection alive and sends its requests one
+    after another.
+
+    Args:
+        args (Namespace): The parsed arguments
+
+    Returns:
+        dict: The results
+    """
+
+    query = urlencode({"story": args.story, "degree": args.degree, "limit": args.limit})
+    request = (f"GET /generate?{query} HTTP/1.1\r\nHost: {args.host}\r\n\r\n").encode("latin-1")
+    latencies = []
+    errors = 0
+    remaining = args.requests
+
+    async def client() -> None:
+        nonlocal errors, remaining
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+        while remaining > 0:
+            remaining -= 1
+            status, latency = await timed_request(reader, writer, request)
+            latencies.append(latency)
+            errors += status != b"200"
+        writer.close()
+
+    start = perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = perf_counter() - start
+    ordered = sorted(latencies)
+    quantiles = statistics.quantiles(ordered, n=100) if len(ordered) > 1 else ordered * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50": quantiles[49],
+        "p95": quantiles[94],
+        "p99": quantiles[98],
+        "max": ordered[-1],
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Returns the parser of the command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Serve generated text on localhost.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run the server")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    serve_parser.add_argument("--max-degree", type=int, default=5)
+    serve_parser.add_argument("--batch-size", type=int, default=64)
+    serve_parser.add_argument("--batch-window", type=float, default=2.0,
+                              help="the time a batch waits for more requests in ms")
+    serve_parser.add_argument("--preload", nargs="*", default=[],
+                              help="the stories to load before serving")
+
+    bench_parser = commands.add_parser("bench", help="load test a running server")
+    bench_parser.add_argument("--host", default="127.0.0.1")
+    bench_parser.add_argument("--port", type=int, default=8765)
+    bench_parser.add_argument("--story", default="Alice in Wonderland")
+    bench_parser.add_argument("--degree", type=int, default=2)
+    bench_parser.add_argument("--limit", type=int, default=100)
+    bench_parser.add_argument("--requests", type=int, default=2000)
+    bench_parser.add_argument("--concurrency", type=int, default=50)
+    return parser
+
+
+def main(argv=None) -> int:
+    """Runs the server or the benchmark client
+
+    Args:
+        argv (list, optional): The arguments. Defaults to sys.argv.
+
+    Returns:
+        int: The exit status
+    """
+
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    results = asyncio.run(bench(args))
+    print(f"{results['requests']} requests, {results['errors']} errors "
+          f"in {results['seconds']:.2f} s: {results['requests_per_second']:.0f} requests/s")
+    print("latency " + "  ".join(f"{name} {results[name] * 1000:.1f} ms"
+                                 for name in ("p50", "p95", "p99", "max")))
+    return 1 if results["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
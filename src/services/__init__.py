@@ -2,3 +2,9 @@ from .read_service import ReadService
 from .clean_service import CleanService
 from .markov_model import MarkovModel
 from .generate_service import GenerateService
+from .cache_service import CacheService
+from .batch_generate_service import BatchGenerateService
+from .autocomplete_service import AutocompleteService
+from .profile_service import ProfileService
+from .model_pool_service import ModelPoolService
+from .build_service import BuildService
@@ -0,0 +1,81 @@
+from entities import PrefixIndex, LRUCache
+from .clean_service import UNKNOWN_TOKEN
+
+
+class AutocompleteService:
+    """Completes a partially typed sequence from the model
+
+    Returns the most frequent words that can follow the current state of the
+    sequence and start with the partially typed word. The UNKNOWN_TOKEN of a
+    model with a capped vocabulary is never suggested. A PrefixIndex is built
+    for a state the first time it is completed and kept in an LRUCache, which
+    is cleared when the revision of the model changes, so an updated or pruned
+    model is never completed from stale indexes.
+
+    Attributes:
+        markov_model (MarkovModel): The model to complete from
+        indexes (LRUCache): The prefix indexes of the recently completed states
+    """
+
+    def __init__(self, markov_model, cache_size: int = 256) -> None:
+        """Inits AutocompleteService with the model
+
+        Args:
+            markov_model (MarkovModel): The model to complete from
+            cache_size (int, optional): The number of prefix indexes kept.
+                                    Defaults to 256.
+        """
+
+        self.__markov_model = markov_model
+        self.__indexes = LRUCache(cache_size)
+        self.__revision = markov_model.revision
+
+    def complete(self, sequence: list, partial: str = "", k: int = 10) -> list:
+        """Completes a sequence
+
+        Args:
+            sequence (list): The fully typed words
+            partial (str, optional): The partially typed word. Defaults to "".
+            k (int, optional): The maximum number of completions. Defaults to 10.
+
+        Returns:
+            list: The completed sequences as strings, most frequent first
+        """
+
+        index = self.__get_index(sequence[-self.__markov_model.degree:])
+        if index is None:
+            return []
+        prefix = " ".join(sequence) + " " if sequence else ""
+        return [prefix + word for word in index.complete(partial, k)]
+
+    def __get_index(self, state: list) -> PrefixIndex:
+        """Returns the prefix index of a state
+
+        Args:
+            state (list): The words of the state
+
+        Returns:
+            PrefixIndex: The index, None if the state has no children
+        """
+
+        if self.__revision != self.__markov_model.revision:
+            self.__indexes.clear()
+            self.__revision = self.__markov_model.revision
+        key = tuple(state)
+        index = self.__indexes.get(key)
+        if index is None:
+            vocabulary = self.__markov_model.vocabulary
+            token_ids = vocabulary.lookup(state)
+            next_tokens = None
+            if token_ids is not None:
+                next_tokens = self.__markov_model.next_tokens(token_ids)
+            if not next_tokens:
+                return None
+            completions = [(word, count) for word, count in
+                           zip(vocabulary.decode(next_tokens[0]), next_tokens[1])
+                           if word != UNKNOWN_TOKEN]
+            if not completions:
+                return None
+            index = PrefixIndex(*zip(*completions))
+            self.__indexes.put(key, index)
+        return index
@@ -0,0 +1,236 @@
+import numpy as np
+from entities import FrozenTrie, SuffixArray
+from .clean_service import UNKNOWN_TOKEN
+
+
+class BatchGenerateService:
+    """Generates many texts at once based on the model
+
+    All the chains advance in lockstep, and every step is a handful of
+    NumPy operations over the whole batch instead of a Python loop per text.
+    The model is viewed as flat arrays: the children of every node are keyed
+    by (parent index, token id), which is sorted in the breadth-first layout
+    of the FrozenTrie, so a child is found with searchsorted. The next token
+    is drawn with searchsorted on the cumulative frequencies of the nodes,
+    in which the UNKNOWN_TOKEN of a capped vocabulary counts as zero.
+
+    Like GenerateService, a chain whose state is not in the model or has no
+    children backs off to ever shorter states, dropping the oldest token
+    first, so the chains only stop short if even the empty state has none.
+
+    Attributes:
+        model (FrozenTrie): The model to be used for generating text
+        degree (int): The degree the texts are generated at by default
+        vocabulary (Vocabulary): The vocabulary of the model
+        rng (Generator): The random number generator
+    """
+
+    def __init__(self, model: object, degree: int, vocabulary, seed: int = None) -> None:
+        """Inits BatchGenerateService with the model
+
+        Args:
+            model (object): The model, a Trie or an NGramTable is frozen first
+            degree (int): The degree the texts are generated at by default,
+                                    at most the degree the model is built at
+            vocabulary (Vocabulary): The vocabulary of the model
+            seed (int, optional): The seed of the random number generator.
+                                    Defaults to None.
+
+        Raises:
+            ValueError: If the model is a SuffixArray, which has no counts
+                to lay out as arrays
+        """
+
+        if isinstance(model, SuffixArray):
+            raise ValueError("batch generation needs the counts of a Trie, not a suffix array")
+        if not isinstance(model, FrozenTrie):
+            model = model.freeze()
+        self.__degree = degree
+        self.__vocabulary = vocabulary
+        self.__rng = np.random.default_rng(seed)
+        # views of the arrays of the model, so the pages of a loaded model stay shared
+        self.__offsets = np.asarray(model.offsets, dtype=np.uint32)
+        self.__tokens = np.asarray(model.tokens, dtype=np.uint32)
+        frequencies = np.array(model.frequencies, dtype=np.int64)
+        unknown = vocabulary.id_of(UNKNOWN_TOKEN)
+        if unknown is not None:
+            frequencies[1:][self.__tokens[1:] == unknown] = 0
+        self.__cumulative = np.cumsum(frequencies)
+        self.__base = int(self.__tokens.max()) + 1
+        parents = np.repeat(np.arange(len(self.__offsets) - 1),
+                            np.diff(self.__offsets))
+        self.__keys = parents * self.__base + self.__tokens[1:]
+
+    def generate_batch(self, count: int, limit: int = 10, seeds: list = None,
+                       degree: int = None) -> list:
+        """Generates a batch of texts
+
+        A seed that is already as long as the limit is returned as it is,
+        like GenerateService does.
+
+        Args:
+            count (int): The number of texts
+            limit (int, optional): The number of words in each text. Defaults to 10.
+            seeds (list, optional): The start sequences of the texts, one list of
+                                    words per text. Defaults to None, in which case
+                                    the texts start from scratch.
+            degree (int, optional): The degree to generate at, at most the
+                                    degree the model is built at. Defaults to
+                                    the degree of the service.
+
+        Returns:
+            list: The generated texts
+
+        Raises:
+            ValueError: If there are more seeds than texts, or the degree is not positive
+            KeyError: If a seed has a word that is not in the vocabulary
+        """
+
+        seeds = seeds or []
+        degree = degree or self.__degree
+        if degree < 1:
+            raise ValueError("degree must be positive")
+        if len(seeds) > count:
+            raise ValueError(f"{len(seeds)} seeds given for {count} texts")
+        seed_ids = [self.__encode(seed) for seed in seeds]
+        width = max([limit, 1] + [len(token_ids) for token_ids in seed_ids])
+        sequences = np.zeros((count, width), dtype=np.int64)
+        lengths = np.zeros(count, dtype=np.int64)
+        for i, token_ids in enumerate(seed_ids):
+            lengths[i] = len(token_ids)
+            sequences[i, :len(token_ids)] = token_ids
+        alive = lengths < limit
+        while alive.any():
+            chains = self.__advance(sequences, lengths, np.flatnonzero(alive), degree)
+            alive[:] = False
+            alive[chains] = lengths[chains] < limit
+        return [" ".join(self.__vocabulary.decode(sequence[:length].tolist()))
+                for sequence, length in zip(sequences, lengths)]
+
+    def __encode(self, seed: list) -> list:
+        """Turns a seed into token ids
+
+        Args:
+            seed (list): The words of the seed
+
+        Returns:
+            list: The token ids of the words
+
+        Raises:
+            KeyError: If a word is not in the vocabulary
+        """
+
+        token_ids = self.__vocabulary.lookup(seed)
+        if token_ids is None:
+            raise KeyError(next(word for word in seed
+                                if self.__vocabulary.lookup([word]) is None))
+        return token_ids
+
+    def __advance(self, sequences: np.ndarray, lengths: np.ndarray,
+                  chains: np.ndarray, degree: int) -> np.ndarray:
+        """Appends the next token to the chains, backing off at the dead ends
+
+        Args:
+            sequences (ndarray): The sequences of all the chains
+            lengths (ndarray): The lengths of the sequences
+            chains (ndarray): The indexes of the chains to advance
+            degree (int): The degree to generate at
+
+        Returns:
+            ndarray: The indexes of the chains that were advanced
+        """
+
+        nodes = self.__find_state(sequences[chains], lengths[chains], degree)
+        found = nodes >= 0
+        chains = chains[found]
+        sequences[chains, lengths[chains]] = self.__sample(
+            self.__offsets[nodes[found]], self.__offsets[nodes[found] + 1])
+        lengths[chains] += 1
+        return chains
+
+    def __find_state(self, sequences: np.ndarray, lengths: np.ndarray,
+                     degree: int) -> np.ndarray:
+        """Finds the node of the longest state of every chain that has children
+
+        The state starts as the last degree tokens of the chain, and the
+        chains whose state is not in the model or has no children back off
+        to a state one token shorter until one is found.
+
+        Args:
+            sequences (ndarray): The sequences of the chains
+            lengths (ndarray): The lengths of the sequences
+            degree (int): The degree to generate at
+
+        Returns:
+            ndarray: The node indexes, -1 if not even the empty state has children
+        """
+
+        context_lengths = np.minimum(lengths, degree)
+        nodes = np.full(len(sequences), -1, dtype=np.int64)
+        pending = np.arange(len(sequences))
+        while pending.size:
+            found = self.__find(sequences[pending], lengths[pending], context_lengths[pending])
+            usable = found >= 0
+            usable[usable] = self.__has_children(found[usable])
+            nodes[pending[usable]] = found[usable]
+            pending = pending[~usable]
+            pending = pending[context_lengths[pending] > 0]
+            context_lengths[pending] -= 1
+        return nodes
+
+    def __has_children(self, nodes: np.ndarray) -> np.ndarray:
+        """Returns whether the nodes have children that can be drawn
+
+        Args:
+            nodes (ndarray): The node indexes
+
+        Returns:
+            ndarray: Whether the children of every node have a nonzero frequency
+        """
+
+        return self.__cumulative[self.__offsets[nodes + 1] - 1] > \
+            self.__cumulative[self.__offsets[nodes] - 1]
+
+    def __find(self, sequences: np.ndarray, lengths: np.ndarray,
+               context_lengths: np.ndarray) -> np.ndarray:
+        """Finds the nodes of the states ending the sequences
+
+        Args:
+            sequences (ndarray): The sequences of the chains
+            lengths (ndarray): The lengths of the sequences
+            context_lengths (ndarray): The lengths of the states
+
+        Returns:
+            ndarray: The node indexes, -1 for the states not in the model
+        """
+
+        if self.__keys.size == 0:
+            return np.where(context_lengths > 0, -1, 0)
+        nodes = np.zeros(len(sequences), dtype=np.int64)
+        rows = np.arange(len(sequences))
+        for position in range(int(context_lengths.max(initial=0))):
+            active = (position < context_lengths) & (nodes >= 0)
+            if not active.any():
+                break
+            columns = lengths[active] - context_lengths[active] + position
+            keys = nodes[active] * self.__base + sequences[rows[active], columns]
+            indexes = np.minimum(np.searchsorted(self.__keys, keys), len(self.__keys) - 1)
+            matches = self.__keys[indexes] == keys
+            nodes[active] = np.where(matches, indexes + 1, -1)
+        return nodes
+
+    def __sample(self, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """Draws the next tokens from the children of the nodes
+
+        Args:
+            start (ndarray): The indexes of the first children
+            end (ndarray): The indexes after the last children
+
+        Returns:
+            ndarray: The drawn token ids
+        """
+
+        base = self.__cumulative[start - 1]
+        total = self.__cumulative[end - 1] - base
+        values = base + (self.__rng.random(len(start)) * total).astype(np.int64)
+        return self.__tokens[np.searchsorted(self.__cumulative, values, side="right")]
@@ -0,0 +1,198 @@
+import multiprocessing
+import os
+import signal
+from .cache_service import CacheService
+from .markov_model import MarkovModel
+
+
+class BuildCancelled(Exception):
+    """Raised in the build process when a newer build supersedes it"""
+
+
+def build_in_process(cache: tuple, path: str, degree: int, max_degree: int,
+                     done, total, cancelled) -> None:
+    """Builds a model into the cache, run in the build process
+
+    The progress is reported in bytes of the source file, so the total is
+    known from the size of the file up front. The build checks for a
+    cancellation at every progress report and between its phases: reading
+    the tokens, counting them with NumPy, and writing the model into the
+    cache. A terminated build raises BuildCancelled too, once the phase it
+    is in gives the control back to Python, so an interrupted write does
+    not leave a temporary file behind.
+
+    Args:
+        cache (tuple): The directory and the size cap of the cache
+        path (str): The path to the source file
+        degree (int): The degree the model is queried at
+        max_degree (int): The degree the model is built at
+        done (Value): The number of bytes read, shared with the parent
+        total (Value): The number of bytes in the file, shared with the parent
+        cancelled (Event): Set by the parent to stop the build
+    """
+
+    def check() -> None:
+        if cancelled.is_set():
+            raise BuildCancelled()
+
+    def progress(count: int) -> None:
+        check()
+        done.value = count
+
+    def terminate(*_) -> None:
+        raise BuildCancelled()
+
+    signal.signal(signal.SIGTERM, terminate)
+    try:
+        total.value = os.path.getsize(path)
+        cache_service = CacheService(*cache)
+        markov_model = MarkovModel.from_file(path, degree, max_degree, progress,
+                                             vectorized=True)
+        check()
+        cache_service.store(markov_model, cache_service.model_path(path, max_degree))
+    except BuildCancelled:
+        pass
+
+
+class BuildService:
+    """Builds models in a separate process
+
+    The pure Python build holds the GIL, so building in a thread would
+    freeze the UI. Instead, the model is built in a child process, which
+    reports its progress through shared values and writes the finished model
+    into the cache. The parent then memory-maps the cached file, so the
+    model is handed over without pickling it.
+
+    Only one build is current at a time: starting a new build cancels the
+    one in flight, and terminates its process rather than leaving it to
+    run in the background until its next check.
+
+    Attributes:
+        cache_service (CacheService): The cache the models are built into
+        running (bool): Whether the current build is still running
+        progress (tuple): The bytes read and the total of the current build
+    """
+
+    def __init__(self, cache_service: CacheService) -> None:
+        """Initializes the BuildService
+
+        Args:
+            cache_service (CacheService): The cache the models are built into
+        """
+
+        self.__cache_service = cache_service
+        self.__context = multiprocessing.get_context("spawn")
+        self.__process = None
+        self.__build = None
+        self.__done = None
+        self.__total = None
+        self.__cancelled = None
+        self.__superseded = []
+
+    @property
+    def cache_service(self) -> CacheService:
+        """Returns the cache the models are built into"""
+
+        return self.__cache_service
+
+    @property
+    def running(self) -> bool:
+        """Returns whether the current build is still running"""
+
+        return self.__process is not None and self.__process.is_alive()
+
+    @property
+    def progress(self) -> tuple:
+        """Returns the bytes read and the total of the current build"""
+
+        if self.__process is None:
+            return (0, 0)
+        return (self.__done.value, self.__total.value)
+
+    def start(self, path: str, degree: int, max_degree: int = None) -> None:
+        """Starts building a model, cancelling the build in flight
+
+        Args:
+            path (str): The path to the source file
+            degree (int): The degree the model is queried at
+            max_degree (int, optional): The degree the model is built at.
+                Defaults to the degree.
+        """
+
+        self.cancel()
+        max_degree = max(degree, max_degree or degree)
+        self.__build = (path, degree, max_degree)
+        self.__done = self.__context.Value("q", 0)
+        self.__total = self.__context.Value("q", 0)
+        self.__cancelled = self.__context.Event()
+        self.__process = self.__context.Process(
+            target=build_in_process,
+            args=((self.__cache_service.directory, self.__cache_service.max_bytes),
+                  path, degree, max_degree, self.__done, self.__total, self.__cancelled),
+            daemon=True)
+        self.__process.start()
+
+    def cancel(self) -> None:
+        """Cancels the build in flight
+
+        The build process is terminated, which it handles as a cancellation
+        as soon as it is back in Python, and it is reaped on a later poll.
+        """
+
+        if self.__process is not None:
+            self.__cancelled.set()
+            self.__process.terminate()
+            self.__superseded.append(self.__process)
+            self.__process = None
+            self.__build = None
+
+    def wait(self, timeout: float = None) -> MarkovModel:
+        """Waits for the current build to finish
+
+        Args:
+            timeout (float, optional): The longest time to wait in seconds.
+                Defaults to no limit.
+
+        Returns:
+            MarkovModel: The frozen model, None if the build is still running
+
+        Raises:
+            RuntimeError: If the build process failed
+        """
+
+        if self.__process is not None:
+            self.__process.join(timeout)
+        return self.poll()
+
+    def poll(self) -> MarkovModel:
+        """Returns the built model once the current build has finished
+
+        Returns:
+            MarkovModel: The frozen model, None while the build is running
+
+        Raises:
+            RuntimeError: If the build process failed
+        """
+
+        self.__superseded = [process for process in self.__superseded if process.is_alive()]
+        if self.__process is None or self.__process.is_alive():
+            return None
+        exitcode = self.__process.exitcode
+        path, degree, max_degree = self.__build
+        self.__process = None
+        self.__build = None
+        markov_model = None
+        if exitcode == 0:
+            markov_model = self.__cache_service.get_cached(path, degree, max_degree)
+        if markov_model is None:
+            raise RuntimeError(f"The build of {path} failed with exit code {exitcode}")
+        return markov_model
+
+    def close(self) -> None:
+        """Stops all the build processes"""
+
+        self.cancel()
+        for process in self.__superseded:
+            process.terminate()
+            process.join()
+        self.__superseded = []
@@ -0,0 +1,210 @@
+import hashlib
+import os
+import tempfile
+import time
+from .clean_service import CLEAN_VERSION
+from .markov_model import MarkovModel, VERSION
+from .read_service import ReadService
+
+
+class CacheService:
+    """Caches the trained models on disk
+
+    The models are content-addressed: the key of a model is derived from
+    the hash of the source file, the degree the model is built at, and the
+    versions of the cleaning rules and the model file format. On a hit the
+    saved model is memory-mapped, on a miss the model is built with NumPy
+    and written into the cache atomically. When the cache grows over its
+    size cap, the least recently used models are evicted.
+
+    Attributes:
+        directory (str): The cache directory
+        max_bytes (int): The size cap of the cache
+        hits (int): The number of requests served from the cache
+        misses (int): The number of requests that had to build the model
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = 1 << 30) -> None:
+        """Initializes the CacheService
+
+        Args:
+            directory (str, optional): The cache directory. Defaults to the
+                TEXT_GENERATOR_CACHE environment variable or ~/.cache/text_generator.
+            max_bytes (int, optional): The size cap of the cache. Defaults to 1 GiB.
+        """
+
+        self.__directory = directory or os.environ.get("TEXT_GENERATOR_CACHE") or \
+            os.path.join(os.path.expanduser("~"), ".cache", "text_generator")
+        self.__max_bytes = max_bytes
+        self.__hashes = {}
+        self.__hits = 0
+        self.__misses = 0
+        os.makedirs(self.__directory, exist_ok=True)
+
+    @property
+    def directory(self) -> str:
+        """Returns the cache directory"""
+
+        return self.__directory
+
+    @property
+    def max_bytes(self) -> int:
+        """Returns the size cap of the cache"""
+
+        return self.__max_bytes
+
+    @property
+    def hits(self) -> int:
+        """Returns the number of requests served from the cache"""
+
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        """Returns the number of requests that had to build the model"""
+
+        return self.__misses
+
+    def model_path(self, path: str, max_degree: int) -> str:
+        """Returns the cache path of the model of a source file
+
+        Args:
+            path (str): The path to the source file
+            max_degree (int): The degree the model is built at
+
+        Returns:
+            str: The path to the cached model
+        """
+
+        key = f"{self.__hash_file(path)}:{max_degree}:{CLEAN_VERSION}:{VERSION}"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.__directory, digest + ".model")
+
+    def get_cached(self, path: str, degree: int, max_degree: int = None) -> MarkovModel:
+        """Returns the model of a source file if it is in the cache
+
+        Args:
+            path (str): The path to the source file
+            degree (int): The degree the model is queried at
+            max_degree (int, optional): The degree the model is built at.
+                Defaults to the degree.
+
+        Returns:
+            MarkovModel: The frozen model, None on a miss
+        """
+
+        max_degree = max(degree, max_degree or degree)
+        markov_model = self.__load(self.model_path(path, max_degree))
+        if markov_model is not None:
+            self.__hits += 1
+            markov_model.degree = degree
+        return markov_model
+
+    def get_model(self, path: str, degree: int, max_degree: int = None,
+                  progress=None, backend: str = "trie") -> MarkovModel:
+        """Returns the model of a source file, building it on a miss
+
+        The cache holds the counts, so a model is cached once and
+        moved onto the requested backend after loading.
+
+        Args:
+            path (str): The path to the source file
+            degree (int): The degree the model is queried at
+            max_degree (int, optional): The degree the model is built at.
+                Defaults to the degree.
+            progress (function, optional): Called with the number of bytes of
+                the source file read during a build, see MarkovModel.from_file.
+                Defaults to None.
+            backend (str, optional): The backend of the returned model, "trie"
+                or "hashed", see MarkovModel.use_backend. Defaults to "trie".
+
+        Returns:
+            MarkovModel: The frozen model
+
+        Raises:
+            ValueError: If the backend is not "trie" or "hashed", as a
+                SuffixArray indexes the text instead of the counts
+        """
+
+        if backend not in ("trie", "hashed"):
+            raise ValueError(f"the cache holds counts, backend must be trie or hashed, "
+                             f"not {backend}")
+        max_degree = max(degree, max_degree or degree)
+        markov_model = self.get_cached(path, degree, max_degree)
+        if markov_model is None:
+            model_path = self.model_path(path, max_degree)
+            self.__misses += 1
+            markov_model = MarkovModel.from_file(path, degree, max_degree, progress,
+                                                 vectorized=True)
+            self.store(markov_model, model_path)
+        markov_model.use_backend(backend)
+        return markov_model
+
+    def store(self, markov_model: MarkovModel, model_path: str) -> None:
+        """Writes a model into the cache atomically
+
+        The model is first saved into a temporary file in the cache directory
+        and then renamed over the cache path, so a reader never sees a
+        partially written model.
+
+        Args:
+            markov_model (MarkovModel): The model to store
+            model_path (str): The cache path of the model
+        """
+
+        handle, temporary_path = tempfile.mkstemp(
+            dir=self.__directory, suffix=".tmp")
+        os.close(handle)
+        try:
+            markov_model.save(temporary_path)
+            os.replace(temporary_path, model_path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used models until the cache fits its size cap"""
+
+        entries = []
+        for entry in os.scandir(self.__directory):
+            if entry.name.endswith(".model"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, model_path in sorted(entries):
+            if total <= self.__max_bytes:
+                break
+            os.remove(model_path)
+            total -= size
+
+    def __load(self, model_path: str) -> MarkovModel:
+        """Loads a cached model and marks it as recently used
+
+        Args:
+            model_path (str): The cache path of the model
+
+        Returns:
+            MarkovModel: The model, None if it is not in the cache
+        """
+
+        try:
+            markov_model = MarkovModel.load(model_path)
+        except (FileNotFoundError, ValueError):
+            return None
+        now = time.time_ns()
+        os.utime(model_path, ns=(now, now))
+        return markov_model
+
+    def __hash_file(self, path: str) -> str:
+        """Returns the hash of a source file, reusing it while the file is unchanged
+
+        Args:
+            path (str): The path to the source file
+        """
+
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        if key not in self.__hashes:
+            self.__hashes[key] = ReadService.hash_file(path)
+        return self.__hashes[key]
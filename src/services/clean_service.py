@@ -1,4 +1,38 @@
 import re
+from collections import Counter
+from string import ascii_letters
+from entities import Vocabulary
+
+
+# bump when the cleaning rules change, so that cached models are rebuilt
+CLEAN_VERSION = 1
+
+# replaces the words cut off from the vocabulary
+UNKNOWN_TOKEN = "<unk>"
+
+START_PATTERN = re.compile(
+    r"\*\*\* START OF THE PROJECT GUTENBERG EBOOK .+ \*\*\*")
+END_PATTERN = re.compile(
+    r"\*\*\* END OF THE PROJECT GUTENBERG EBOOK .+ \*\*\*")
+
+
+class TranslationTable(dict):
+    """Translation table that lowercases the allowed characters
+
+    Letters and the punctuation marks . ! ? ' , are kept and converted
+    to lowercase, all the other characters are replaced with a space.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(
+            (ord(char), char.lower()) for char in ascii_letters + ".!?',")
+
+    def __missing__(self, key: int) -> str:
+        self[key] = " "
+        return " "
+
+
+TRANSLATION_TABLE = TranslationTable()
 
 
 class CleanService:
@@ -7,23 +41,38 @@ class CleanService:
     Firstly removes copyright information and other non-textual information
     from the text. Then converts all characters to lowercase and removes
     some punctuation and other disallowed characters. Finally, tokenizes 
-    the text into a list of words.
+    the text into a list of words and encodes the words into integer ids.
+
+    The cleaning is done line by line with the stream method, which can also
+    be used on its own to tokenize a text without holding it in memory.
+
+    The vocabulary can be capped, in which case the rarest words are
+    replaced with the UNKNOWN_TOKEN.
 
     Attributes:
         text (str): The text to be cleaned
         clean_text (list): The cleaned text as a list of words
+        vocabulary (Vocabulary): The vocabulary of the cleaned text
+        token_ids (array): The cleaned text as a list of token ids
+        unknown_count (int): The number of words replaced with the UNKNOWN_TOKEN
         initialize (function): Initializes the CleanService
     """
 
-    def __init__(self, text: str) -> None:
+    def __init__(self, text: str, max_vocabulary: int = None) -> None:
         """Inits CleanService with the text to be cleaned
 
         Args:
             text (str): The text to be cleaned
+            max_vocabulary (int, optional): The largest number of distinct
+                words, the UNKNOWN_TOKEN included. Defaults to no limit.
         """
 
         self.__text = text
+        self.__max_vocabulary = max_vocabulary
+        self.__unknown_count = 0
         self.__clean_text = None
+        self.__vocabulary = Vocabulary()
+        self.__token_ids = None
         self.__intialize()
 
     @property
@@ -32,40 +81,82 @@ class CleanService:
 
         return self.__clean_text
 
-    def __remove_meta_info(self) -> None:
-        """Removes meta information from the text"""
+    @property
+    def vocabulary(self) -> Vocabulary:
+        """Returns the vocabulary of the cleaned text"""
+
+        return self.__vocabulary
+
+    @property
+    def token_ids(self) -> list:
+        """Returns the cleaned text as token ids"""
+
+        return self.__token_ids
+
+    @property
+    def unknown_count(self) -> int:
+        """Returns the number of words replaced with the UNKNOWN_TOKEN"""
+
+        return self.__unknown_count
+
+    @staticmethod
+    def stream(lines):
+        """Cleans and tokenizes the text one line at a time
+
+        Only the lines between the Project Gutenberg start and end markers
+        are kept. Each line is normalized with a single translation table
+        and split into words.
+
+        Args:
+            lines (iterable): The lines of the text
+
+        Yields:
+            str: The cleaned words
+        """
 
-        text = None
         is_book_text = False
-        for line in self.__text:
-            if re.match(r"\*\*\* END OF THE PROJECT GUTENBERG EBOOK .+ \*\*\*", line):
+        for line in lines:
+            if END_PATTERN.match(line):
                 is_book_text = False
                 continue
-            if re.match(r"\*\*\* START OF THE PROJECT GUTENBERG EBOOK .+ \*\*\*", line):
+            if START_PATTERN.match(line):
                 is_book_text = True
                 continue
             if is_book_text:
-                if text is None:
-                    text = line
-                else:
-                    text += line
-        self.__text = text
+                yield from line.translate(TRANSLATION_TABLE).split()
+
+    @staticmethod
+    def limit_vocabulary(words: list, max_vocabulary: int) -> tuple:
+        """Replaces the rarest words with the UNKNOWN_TOKEN
 
-    def __clean(self) -> None:
-        """Cleans the text"""
+        The most frequent words are kept, the ties going to the words seen
+        first, so that together with the UNKNOWN_TOKEN there are at most
+        max vocabulary distinct words.
 
-        self.__text = re.sub(r"[^A-Za-z\.\!\?\'\,]", " ", self.__text)
-        self.__text = self.__text.lower()
-        self.__text = ' '.join(self.__text.split())
+        Args:
+            words (list): The cleaned words
+            max_vocabulary (int): The largest number of distinct words,
+                at least 2
 
-    def __tokenize(self) -> None:
-        """Tokenizes the text into a list of words"""
+        Returns:
+            tuple: The words with the rare ones replaced, and the number of
+                words replaced
+        """
 
-        self.__clean_text = self.__text.split()
+        if max_vocabulary < 2:
+            raise ValueError("max_vocabulary must be at least 2")
+        counts = Counter(words)
+        if len(counts) <= max_vocabulary:
+            return words, 0
+        kept = {word for word, _ in counts.most_common(max_vocabulary - 1)}
+        limited = [word if word in kept else UNKNOWN_TOKEN for word in words]
+        return limited, len(words) - sum(counts[word] for word in kept)
 
     def __intialize(self) -> None:
         """Initializes the CleanService"""
 
-        self.__remove_meta_info()
-        self.__clean()
-        self.__tokenize()
+        self.__clean_text = list(self.stream(self.__text))
+        if self.__max_vocabulary is not None:
+            self.__clean_text, self.__unknown_count = self.limit_vocabulary(
+                self.__clean_text, self.__max_vocabulary)
+        self.__token_ids = self.__vocabulary.encode(self.__clean_text)
@@ -1,37 +1,57 @@
-from random import choices
+from collections import deque
+from random import random
+from entities import ModelBackend
 
 
 class GenerateService:
     """Generates text based on the model
 
     Given a start state and a model, generates text based on the model.
+    When a vocabulary is given, the start state is encoded into token ids,
+    the generation runs on the ids, and the words are decoded back from
+    the ids only as they are output.
+
+    By default the whole text is generated on initialization. A lazy
+    GenerateService instead streams the words with iter_words, iter_chunks
+    or write, keeping only the current state of the chain in memory.
 
     Attributes:
         sequence (list): The sequence to be used as the start state
         limit (int): The number of words to be generated
-        model (object): The model to be used for generating text
+        model (ModelBackend): The model to be used for generating text
         degree (int): The degree of the model
+        vocabulary (Vocabulary): The vocabulary of the model
         generated_text (str): The generated text
         generate (function): The function that generates the text
     """
 
-    def __init__(self, sequence: list, model: object, degree: int, limit=10) -> None:
+    def __init__(self, sequence: list, model: ModelBackend, degree: int, limit=10,
+                 vocabulary=None, *, lazy=False, backoff=True) -> None:
         """Inits GenerateService with the start state, model and limit
 
         Args:
             sequence (list): The sequence to be used as the start state
-            model (object): The model to be used for generating text
+            model (ModelBackend): The model to be used for generating text
             degree (int): The degree of the model
             limit (int, optional): The limit of how many keys are
                                     picked from the model. Defaults to 10.
+            vocabulary (Vocabulary, optional): The vocabulary of the model.
+                                    Defaults to None.
+            lazy (bool, optional): Whether to leave the generation to the
+                                    iterators. Defaults to False.
+            backoff (bool, optional): Whether to back off to shorter states
+                                    at a dead end. Defaults to True.
         """
 
         self.__sequence = sequence
         self.__limit = limit
         self.__model = model
         self.__degree = degree
+        self.__vocabulary = vocabulary
+        self.__backoff = backoff
         self.__generated_text = ""
-        self.__generate()
+        if not lazy:
+            self.__generate()
 
     @property
     def generated_text(self) -> str:
@@ -39,27 +59,95 @@ class GenerateService:
 
         return self.__generated_text
 
-    def __calculate_probability(self, children: dict) -> dict:
-        """Calculates the probability of each children node.
+    def iter_words(self):
+        """Generates the text one word at a time
+
+        The start sequence is yielded first, followed by the generated words.
+        Only the last degree tokens are kept as the current state, so the
+        memory use does not grow with the limit. When the current state has
+        no children, the oldest tokens of the state are dropped until a
+        shorter state has children. Every model has such dead ends at the
+        end of its text, whose last sequences are shorter than the degree,
+        and a pruned model has many more. With backing off disabled, the
+        generation stops early at a dead end instead.
+
+        Yields:
+            str: The words of the text
+        """
+
+        sequence = self.__sequence
+        if self.__vocabulary is not None:
+            sequence = self.__vocabulary.lookup(sequence) or []
+            decode = self.__vocabulary.token_of
+        else:
+            decode = str
+        state = deque(sequence[-self.__degree:], maxlen=self.__degree)
+        count = 0
+        for token in sequence:
+            count += 1
+            yield decode(token)
+        while count < self.__limit:
+            table = self.__model.get_sampling_table(state)
+            if table is None and self.__backoff:
+                table = self.__back_off(list(state))
+            if table is None:
+                return
+            token = table.sample(random())
+            state.append(token)
+            count += 1
+            yield decode(token)
+
+    def __back_off(self, state: list):
+        """Returns the distribution of the longest shorter state with children
 
         Args:
-            children (dict): The children of the current state
+            state (list): The token ids of the current state
 
         Returns:
-            dict: The probability of each word
+            SamplingTable: The distribution, None if even the empty state has none
         """
 
-        total = sum([i.frequency for i in children.values()])
-        return {word: value.frequency / total for word, value in children.items()}
+        for start in range(1, len(state) + 1):
+            table = self.__model.get_sampling_table(state[start:])
+            if table is not None:
+                return table
+        return None
+
+    def iter_chunks(self, size: int):
+        """Generates the text in chunks of words
+
+        Args:
+            size (int): The number of words in a chunk
+
+        Yields:
+            str: The words of a chunk joined with spaces
+        """
+
+        chunk = []
+        for word in self.iter_words():
+            chunk.append(word)
+            if len(chunk) == size:
+                yield " ".join(chunk)
+                chunk = []
+        if chunk:
+            yield " ".join(chunk)
+
+    def write(self, stream, chunk_size: int = 1000) -> None:
+        """Writes the text into a stream as it is generated
+
+        Args:
+            stream (object): A writable text stream, e.g. an open file
+                                    or socket.makefile("w")
+            chunk_size (int, optional): The number of words written at a time.
+                                    Defaults to 1000.
+        """
+
+        separator = ""
+        for chunk in self.iter_chunks(chunk_size):
+            stream.write(separator + chunk)
+            separator = " "
 
     def __generate(self) -> None:
         """Generates text based on the model, degree and limit"""
 
-        sequence = self.__sequence
-        while len(sequence) < self.__limit:
-            children = self.__model.get_children(sequence[-self.__degree:])
-            probability = self.__calculate_probability(children)
-            word = choices(list(probability.keys()),
-                           list(probability.values()))[0]
-            sequence.append(word)
-        self.__generated_text = " ".join(sequence)
+        self.__generated_text = " ".join(self.iter_words())
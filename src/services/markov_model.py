@@ -1,29 +1,485 @@
-from random import choice
-from entities import Trie
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from random import shuffle
+from entities import Trie, FrozenTrie, SuffixArray, NGramTable, Vocabulary, LRUCache
+from .clean_service import CleanService, UNKNOWN_TOKEN
+from .read_service import ReadService
 
 
-class MarkovModel:
+# magic, version, degree, max degree, source hash, vocabulary bytes, node count, tail length
+HEADER = struct.Struct("<4sHHH32sQQH")
+Header = namedtuple("Header", ["magic", "version", "degree", "max_degree", "source_hash",
+                               "vocabulary_size", "node_count", "tail_length"])
+MAGIC = b"MKVM"
+VERSION = 2
+# The data structures the model can be built on
+BACKENDS = ("trie", "suffix_array", "hashed")
+# The data structures of the models by their form, a Trie model is frozen or not
+FORMS = {"trie": Trie, "frozen": FrozenTrie, "hashed": NGramTable, "suffix_array": SuffixArray}
+# The number of tokens between the progress reports of a build
+PROGRESS_INTERVAL = 10000
+
+
+def count_chunk(tokens, order: int, length: int) -> FrozenTrie:
+    """Counts the sequences starting in one chunk of the text
+
+    Used by the worker processes of MarkovModel.build_parallel. The chunk
+    runs max degree tokens past its own positions, so that the sequences
+    starting near its end are complete.
+
+    Args:
+        tokens (array): The token ids of the chunk
+        order (int): The length of the sequences, max degree + 1
+        length (int): The number of positions the chunk is responsible for
+
+    Returns:
+        FrozenTrie: The counts of the chunk
+    """
+
+    trie = Trie()
+    window = deque(maxlen=order)
+    inserted = 0
+    for token in tokens:
+        window.append(token)
+        if len(window) == order:
+            trie.insert(window)
+            inserted += 1
+    if len(window) == order:
+        window.popleft()
+    while window and inserted < length:
+        trie.insert(window)
+        window.popleft()
+        inserted += 1
+    return trie.freeze()
+
+
+def count_shard(words: list, order: int, length: int) -> tuple:
+    """Encodes one shard of the cleaned text and counts its sequences
+
+    Used by the worker processes of MarkovModel.build_parallel, when the
+    text is given as words. The shard is encoded with a vocabulary of its
+    own, whose token ids are mapped into the shared vocabulary on merge.
+
+    Args:
+        words (list): The words of the shard, see count_chunk
+        order (int): The length of the sequences, max degree + 1
+        length (int): The number of positions the shard is responsible for
+
+    Returns:
+        tuple: The words of the vocabulary of the shard in the order of
+            their token ids, and the counts of the shard
+    """
+
+    vocabulary = Vocabulary()
+    tokens = vocabulary.encode(words)
+    return vocabulary.tokens, count_chunk(tokens, order, length)
+
+
+class MarkovModel:  # pylint: disable=too-many-public-methods,too-many-instance-attributes
     """Creates the Markov chain from the cleaned text
 
+    The words are encoded into integer token ids, and the Trie
+    stores only the ids. The vocabulary is used to translate
+    between the words and the ids.
+
+    The model is built once at the max degree. As every node of the Trie
+    counts the occurrences of its prefix, the same model can be queried
+    at any degree up to the max degree without retraining.
+
+    The model is trained in a single pass over the tokens with a rolling
+    window, so the tokens can be streamed straight from the file.
+
+    A trained model can be saved into a compact binary file and loaded back
+    with mmap, in which case the nodes are read straight from the file.
+
+    The model keeps the last max degree tokens of the text it was trained
+    on, so that it can be updated with new text without a full rebuild.
+
+    Instead of the Trie, the model can be built on a SuffixArray over the
+    whole text. The suffix array answers contexts of any length from a
+    single index, so its max degree is the length of the text, and its size
+    does not depend on the degree. It cannot be saved or built in parallel,
+    and an update rebuilds it.
+
+    The model can also be built on an NGramTable, which hashes every context
+    into one flat table, so that a lookup does not walk the context one
+    token at a time. The Trie and the NGramTable hold the same counts, and
+    use_backend moves a model between them.
+
+    To bound the size of the model, the rare sequences can be pruned after
+    the build, and the vocabulary can be capped with an UNKNOWN_TOKEN in
+    place of the rarest words. The model keeps a report of what was pruned.
+    The UNKNOWN_TOKEN is never sampled nor used to form a starting sequence.
+
+    All the backends implement the ModelBackend protocol, and so does the
+    model itself, so it can be handed to GenerateService directly. It also
+    answers get_children through the node views of its backend. When the
+    cache size is set, the resolved nodes and sampling tables of the recent
+    states are memoized in an LRUCache, which is cleared whenever the model
+    changes.
+
     Attributes:
-        cleaned_text (str): The cleaned text
         degree (int): The order/degree of Markov chain.
+        max_degree (int): The highest degree the model can be queried at.
+        backend (str): The data structure the model is built on
+        pruned (dict): The number of tokens and nodes removed to bound the size
         model (dict): The Markov chain
+        vocabulary (Vocabulary): The vocabulary of the Markov chain
+        source_hash (str): The SHA-256 hash of the source text, if known
+        cache_size (int): The size of the state cache, 0 when disabled
+        context_cache (LRUCache): The state cache
+        revision (int): The number of times the model has changed
         build_model (func): Builds the Markov chain
     """
 
-    def __init__(self, cleaned_text: list, degree: int) -> None:
+    def __init__(self, cleaned_text: list, degree: int, vocabulary: Vocabulary = None,
+                 max_degree: int = None, backend: str = "trie") -> None:
         """Initializes the Markov chain
 
         Args:
-            cleaned_text (list): The cleaned text
+            cleaned_text (iterable): The cleaned text, either as words or,
+                when the vocabulary is given, as token ids.
             degree (int): The order/degree of Markov chain.
+            vocabulary (Vocabulary, optional): The vocabulary the token ids
+                belong to. Defaults to None.
+            max_degree (int, optional): The degree the model is built at.
+                Defaults to the degree.
+            backend (str, optional): The data structure to build the model on,
+                one of BACKENDS. Defaults to "trie".
+
+        Raises:
+            ValueError: If the backend is unknown or the degree is not positive
         """
 
-        self.__cleaned_text = cleaned_text
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {', '.join(BACKENDS)}")
+        if degree < 1:
+            raise ValueError("degree must be at least 1")
+        if vocabulary is None:
+            vocabulary = Vocabulary()
+            cleaned_text = map(vocabulary.add, cleaned_text)
         self.__degree = degree
-        self.__model = Trie()
-        self.__build_model()
+        self.__max_degree = max(degree, max_degree or degree)
+        self.__vocabulary = vocabulary
+        self.__source_hash = ""
+        self.__tail = []
+        self.__cache = None
+        self.__revision = 0
+        self.__pruned = {}
+        self.__model = None
+        self.__build(backend, cleaned_text)
+
+    @classmethod
+    def from_lines(cls, lines, degree: int, max_degree: int = None, progress=None, *,
+                   backend: str = "trie", vectorized: bool = False, min_count: int = 1,
+                   max_children: int = None, max_vocabulary: int = None):
+        """Trains a Markov chain straight from the lines of a text
+
+        The lines are cleaned and tokenized as a stream, so neither
+        the text nor the tokenized words are held in memory, unless the
+        vocabulary is capped, which needs the word counts first. The
+        limits are reported in the pruned attribute of the model.
+
+        Args:
+            lines (iterable): The lines of the text, e.g. ReadService.lines
+            degree (int): The order/degree of Markov chain.
+            max_degree (int, optional): The degree the model is built at.
+                Defaults to the degree.
+            progress (function, optional): Called with the number of tokens
+                processed every PROGRESS_INTERVAL tokens and once at the end.
+                Defaults to None.
+            backend (str, optional): The data structure to build the model on.
+                Defaults to "trie".
+            vectorized (bool, optional): Whether to count a Trie model with
+                build_vectorized, which holds the token ids in memory and
+                returns a frozen model. Defaults to False.
+            min_count (int, optional): The lowest frequency of a sequence kept,
+                see prune. Defaults to 1.
+            max_children (int, optional): The largest number of next tokens
+                kept per state, see prune. Defaults to no limit.
+            max_vocabulary (int, optional): The largest number of distinct
+                words, the rarest ones replaced with the UNKNOWN_TOKEN.
+                Defaults to no limit.
+
+        Returns:
+            MarkovModel: The trained model
+        """
+
+        tokens = CleanService.stream(lines)
+        unknown_count = 0
+        if max_vocabulary is not None:
+            tokens, unknown_count = CleanService.limit_vocabulary(list(tokens), max_vocabulary)
+        if progress is not None:
+            tokens = cls.__report_progress(tokens, progress)
+        if vectorized and backend == "trie":
+            markov_model = cls.build_vectorized(tokens, degree, max_degree)
+        else:
+            markov_model = cls(tokens, degree, max_degree=max_degree, backend=backend)
+        if max_vocabulary is not None:
+            markov_model.__pruned["unknown_tokens"] = unknown_count
+        if min_count > 1 or max_children is not None:
+            markov_model.prune(min_count, max_children)
+        return markov_model
+
+    @classmethod
+    def from_file(cls, path: str, degree: int, max_degree: int = None, progress=None, *,
+                  backend: str = "trie", vectorized: bool = False, min_count: int = 1,
+                  max_children: int = None, max_vocabulary: int = None):
+        """Trains a Markov chain straight from a text file
+
+        Records the hash of the file as the source hash of the model.
+
+        Args:
+            path (str): The path to the text file
+            degree (int): The order/degree of Markov chain.
+            max_degree (int, optional): The degree the model is built at.
+                Defaults to the degree.
+            progress (function, optional): Called with the number of bytes
+                of the file read, at the same points as in from_lines, so
+                that the progress can be put in proportion to the file size.
+                Defaults to None.
+            backend (str, optional): The data structure to build the model on.
+                Defaults to "trie".
+            vectorized (bool, optional): Whether to count the model with
+                build_vectorized, see from_lines. Defaults to False.
+            min_count (int, optional): The lowest frequency of a sequence kept.
+                Defaults to 1.
+            max_children (int, optional): The largest number of next tokens
+                kept per state. Defaults to no limit.
+            max_vocabulary (int, optional): The largest number of distinct
+                words. Defaults to no limit.
+
+        Returns:
+            MarkovModel: The trained model
+        """
+
+        with open(path, "r", encoding="utf-8") as file:
+            def report(_) -> None:
+                progress(file.buffer.tell())
+
+            markov_model = cls.from_lines(
+                ReadService.read_lines(file), degree, max_degree,
+                report if progress is not None else None,
+                backend=backend, vectorized=vectorized, min_count=min_count,
+                max_children=max_children, max_vocabulary=max_vocabulary)
+        # pylint: disable=unused-private-member
+        markov_model.__source_hash = ReadService.hash_file(path)
+        return markov_model
+
+    @classmethod
+    def load(cls, path: str):
+        """Loads a model saved with the save method
+
+        The file is memory-mapped, and the nodes of the FrozenTrie are read
+        straight from the mapped pages, so loading takes next to no time
+        and the pages can be shared between processes.
+
+        Args:
+            path (str): The path to the model file
+
+        Returns:
+            MarkovModel: The loaded, frozen model
+        """
+
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buffer) < HEADER.size:
+            raise ValueError(f"{path} is not a model file")
+        header = Header._make(HEADER.unpack_from(buffer))
+        if header.magic != MAGIC or header.version != VERSION:
+            raise ValueError(f"{path} is not a model file")
+        end = HEADER.size + header.vocabulary_size
+        words = bytes(buffer[HEADER.size:end]).decode("utf-8")
+        tail, offsets, tokens, frequencies = cls.__read_arrays(
+            buffer, cls.__align(end), (header.tail_length, header.node_count + 1,
+                                       header.node_count, header.node_count))
+        return cls.__restore(FrozenTrie(offsets, tokens, frequencies),
+                             Vocabulary(words.split("\n") if words else []), header.degree,
+                             header.max_degree, list(tail),
+                             header.source_hash.hex() if any(header.source_hash) else "")
+
+    @staticmethod
+    def __write_arrays(file, arrays: tuple) -> None:
+        """Writes arrays as little-endian 32-bit unsigned integers
+
+        Args:
+            file (file): The model file opened for writing
+            arrays (tuple): The arrays
+        """
+
+        for values in arrays:
+            values = array("I", values)
+            if sys.byteorder == "big":
+                values.byteswap()
+            file.write(values.tobytes())
+
+    @staticmethod
+    def __read_arrays(buffer, start: int, lengths: tuple):
+        """Reads consecutive arrays of 32-bit unsigned integers from a buffer
+
+        On a little-endian machine the arrays are views of the buffer,
+        on a big-endian machine they are byteswapped copies.
+
+        Args:
+            buffer (mmap): The contents of the model file
+            start (int): The offset of the first array
+            lengths (tuple): The lengths of the arrays
+
+        Yields:
+            memoryview: The arrays, or arrays on a big-endian machine
+        """
+
+        for length in lengths:
+            end = start + length * 4
+            values = memoryview(buffer)[start:end].cast("I")
+            if sys.byteorder == "big":
+                values = array("I", values)
+                values.byteswap()
+            yield values
+            start = end
+
+    @classmethod
+    def build_vectorized(cls, cleaned_text, degree: int, max_degree: int = None,
+                         vocabulary: Vocabulary = None):
+        """Trains a Markov chain with NumPy instead of a Trie walk per token
+
+        The sequences of the text are counted by sorting its sliding windows,
+        see FrozenTrie.from_tokens, which gives the exact same counts as a
+        sequential build. The returned model is therefore already frozen.
+
+        Args:
+            cleaned_text (iterable): The cleaned text, either as words or,
+                when the vocabulary is given, as token ids.
+            degree (int): The order/degree of Markov chain.
+            max_degree (int, optional): The degree the model is built at.
+                Defaults to the degree.
+            vocabulary (Vocabulary, optional): The vocabulary the token ids
+                belong to. Defaults to None.
+
+        Returns:
+            MarkovModel: The trained model
+        """
+
+        if vocabulary is None:
+            vocabulary = Vocabulary()
+            tokens = vocabulary.encode(cleaned_text)
+        else:
+            tokens = array("I", cleaned_text)
+        max_degree = max(degree, max_degree or degree)
+        return cls.__restore(FrozenTrie.from_tokens(tokens, max_degree + 1), vocabulary,
+                             degree, max_degree,
+                             list(tokens[max(len(tokens) - max_degree, 0):]))
+
+    @classmethod
+    def build_parallel(cls, cleaned_text, degree: int, max_degree: int = None,
+                       vocabulary: Vocabulary = None, workers: int = None):
+        """Trains a Markov chain on several CPU cores
+
+        The text is split into one chunk per worker process, each chunk
+        overlapping the next one by max degree tokens. The workers count
+        the sequences of their chunks, and the partial counts are merged
+        into a single FrozenTrie with the exact same counts as a sequential
+        build. The returned model is therefore already frozen.
+
+        A text of words is encoded by the workers too, every chunk with a
+        vocabulary of its own. Adding the words of the chunk vocabularies
+        into the shared one in the order of the chunks gives every word the
+        same token id as encoding the whole text would.
+
+        Args:
+            cleaned_text (iterable): The cleaned text, either as words or,
+                when the vocabulary is given, as token ids.
+            degree (int): The order/degree of Markov chain.
+            max_degree (int, optional): The degree the model is built at.
+                Defaults to the degree.
+            vocabulary (Vocabulary, optional): The vocabulary the token ids
+                belong to. Defaults to None.
+            workers (int, optional): The number of worker processes.
+                Defaults to the number of CPU cores.
+
+        Returns:
+            MarkovModel: The trained model
+        """
+
+        encoded = vocabulary is not None
+        text = array("I", cleaned_text) if encoded else list(cleaned_text)
+        max_degree = max(degree, max_degree or degree)
+        order = max_degree + 1
+        workers = workers or os.cpu_count()
+        chunks, lengths = cls.__split(text, order, workers)
+        with ProcessPoolExecutor(workers) as executor:
+            partials = list(executor.map(count_chunk if encoded else count_shard,
+                                         chunks, repeat(order), lengths))
+        mappings = None
+        if not encoded:
+            vocabulary = Vocabulary()
+            mappings = [[vocabulary.add(word) for word in words] for words, _ in partials]
+            partials = [partial for _, partial in partials]
+        tail = text[max(len(text) - max_degree, 0):]
+        return cls.__restore(FrozenTrie.merge(partials, mappings), vocabulary, degree,
+                             max_degree, list(tail) if encoded else vocabulary.lookup(tail))
+
+    @staticmethod
+    def __split(text, order: int, parts: int) -> tuple:
+        """Splits the text into overlapping chunks for the workers
+
+        Args:
+            text (list): The words or the token ids of the text
+            order (int): The length of the sequences, max degree + 1
+            parts (int): The number of chunks
+
+        Returns:
+            tuple: The chunks, each running order - 1 tokens into the next
+                one, and the number of positions every chunk is responsible for
+        """
+
+        length = max(-(-len(text) // parts), 1)
+        starts = range(0, len(text), length)
+        return ([text[start:start + length + order - 1] for start in starts],
+                [min(length, len(text) - start) for start in starts])
+
+    @classmethod
+    def __restore(cls, model, vocabulary: Vocabulary, degree: int, max_degree: int,
+                  tail: list, source_hash: str = ""):
+        """Creates a MarkovModel around an already built model
+
+        Args:
+            model (Trie): The Trie or FrozenTrie of the model
+            vocabulary (Vocabulary): The vocabulary of the model
+            degree (int): The order/degree of Markov chain.
+            max_degree (int): The degree the model was built at.
+            tail (list): The last max degree token ids of the text.
+            source_hash (str, optional): The hash of the source text. Defaults to "".
+
+        Returns:
+            MarkovModel: The model
+
+        Raises:
+            ValueError: If the degree is not positive
+        """
+
+        if degree < 1:
+            raise ValueError("degree must be at least 1")
+        markov_model = cls.__new__(cls)
+        # pylint: disable=unused-private-member
+        # The attributes are read through self in the other methods.
+        markov_model.__degree = degree
+        markov_model.__max_degree = max_degree
+        markov_model.__vocabulary = vocabulary
+        markov_model.__source_hash = source_hash
+        markov_model.__tail = tail
+        markov_model.__cache = None
+        markov_model.__revision = 0
+        markov_model.__pruned = {}
+        markov_model.__model = model
+        return markov_model
 
     @property
     def degree(self) -> int:
@@ -31,33 +487,510 @@ class MarkovModel:
 
         return self.__degree
 
+    @degree.setter
+    def degree(self, degree: int) -> None:
+        """Sets the degree the model is queried at
+
+        Args:
+            degree (int): The new degree, between 1 and the max degree.
+        """
+
+        if not 1 <= degree <= self.__max_degree:
+            raise ValueError(
+                f"degree must be between 1 and {self.__max_degree}")
+        self.__degree = degree
+
+    @property
+    def max_degree(self) -> int:
+        """Returns the highest degree the model can be queried at"""
+
+        return self.__max_degree
+
+    @property
+    def backend(self) -> str:
+        """Returns the data structure the model is built on"""
+
+        form = self.__form()
+        return "trie" if form == "frozen" else form
+
+    @property
+    def pruned(self) -> dict:
+        """Returns the number of tokens and nodes removed to bound the size"""
+
+        return self.__pruned
+
     @property
     def model(self) -> dict:
         """Returns the trained Markov model"""
 
         return self.__model
 
+    @property
+    def vocabulary(self) -> Vocabulary:
+        """Returns the vocabulary of the Markov chain"""
+
+        return self.__vocabulary
+
+    @property
+    def source_hash(self) -> str:
+        """Returns the SHA-256 hash of the source text, if known"""
+
+        return self.__source_hash
+
+    @property
+    def cache_size(self) -> int:
+        """Returns the size of the state cache, 0 when disabled"""
+
+        return self.__cache.size if self.__cache else 0
+
+    @cache_size.setter
+    def cache_size(self, size: int) -> None:
+        """Sets the size of the state cache
+
+        Args:
+            size (int): The maximum number of cached states, 0 to disable the cache.
+        """
+
+        self.__cache = LRUCache(size) if size > 0 else None
+
+    @property
+    def context_cache(self) -> LRUCache:
+        """Returns the state cache, None when disabled"""
+
+        return self.__cache
+
+    @property
+    def revision(self) -> int:
+        """Returns the number of times the model has changed since it was built"""
+
+        return self.__revision
+
+    def next_tokens(self, sequence: list) -> tuple:
+        """Returns the tokens that follow a state and their counts
+
+        Args:
+            sequence (list): The token ids of the state
+
+        Returns:
+            tuple: The lists of the next token ids and their counts, None if
+                the state is not in the model
+        """
+
+        return self.__model.next_tokens(sequence)
+
+    def get_children(self, sequence: list) -> dict:
+        """Returns the children of a state
+
+        Args:
+            sequence (list): The token ids of the state
+
+        Returns:
+            dict: The children nodes of the state
+        """
+
+        if self.__cache is None:
+            return self.__model.get_children(sequence)
+        node = self.__resolve(sequence)[0]
+        return node.children if node is not None else None
+
+    def get_sampling_table(self, sequence: list):
+        """Returns the next token distribution of a state
+
+        The UNKNOWN_TOKEN is left out of the distribution, so the
+        generated text only has the words of the vocabulary.
+
+        Args:
+            sequence (list): The token ids of the state
+
+        Returns:
+            SamplingTable: The distribution, None if the state has no children
+        """
+
+        if self.__cache is None:
+            table = self.__model.get_sampling_table(sequence)
+        else:
+            table = self.__resolve(sequence)[1]
+        unknown = self.__vocabulary.id_of(UNKNOWN_TOKEN)
+        if table is None or unknown is None:
+            return table
+        return table.excluding(unknown)
+
     def form_the_starting_sequence(self, sequence):
         """Adds the missing words in a sequence
 
         generates missing words in a sequence based 
-        on the degree of the model.
+        on the degree of the model. Every added word is picked
+        at random from the words that can continue the walk,
+        so it does not run into a dead end, e.g. in a pruned model.
 
         Args:
             sequence (list): The sequence to check
         """
 
+        sequence = self.__vocabulary.lookup(sequence)
+        if sequence is None:
+            return []
         while len(sequence) < self.__degree:
-            children = self.__model.get_children(sequence)
-            if not children:
+            table = self.get_sampling_table(sequence)
+            tokens = list(table.tokens) if table is not None else []
+            shuffle(tokens)
+            if len(sequence) + 1 < self.__degree:
+                tokens = (token for token in tokens
+                          if self.get_sampling_table(sequence + [token]) is not None)
+            token = next(iter(tokens), None)
+            if token is None:
                 return []
-            sequence.append(choice(list(children.keys())))
-        return sequence
+            sequence.append(token)
+        return self.__vocabulary.decode(sequence)
+
+    def stats(self) -> dict:
+        """Returns the size and the shape of the model
+
+        Used for capacity planning: the branching factors per depth show
+        how the model grows with the degree.
+
+        Returns:
+            dict: The node and edge counts, the vocabulary size, the branching
+                factor distribution per depth and the estimated size in bytes
+                of the Trie and the vocabulary.
+        """
+
+        form = self.__form()
+        stats = self.__model.stats(self.__degree + 1) if form == "suffix_array" \
+            else self.__model.stats()
+        stats["backend"] = self.backend
+        stats["frozen"] = form == "frozen"
+        stats["degree"] = self.__degree
+        stats["max_degree"] = self.__max_degree
+        stats["vocabulary_size"] = len(self.__vocabulary)
+        stats["vocabulary_bytes"] = self.__vocabulary.nbytes
+        stats["pruned"] = dict(self.__pruned)
+        stats["model_bytes"] = stats["bytes"]
+        stats["bytes"] += stats["vocabulary_bytes"]
+        return stats
+
+    def freeze(self) -> None:
+        """Packs the trained model into a read-only FrozenTrie
+
+        The frozen model answers the same queries with a fraction of the
+        memory, but can no longer be trained further. A model built on a
+        SuffixArray or an NGramTable is already array-backed and is left as is.
+        """
+
+        if self.__form() == "trie":
+            self.__model = self.__counts("frozen", "frozen")
+        self.__clear_cache()
+
+    def prune(self, min_count: int = 1, max_children: int = None) -> dict:
+        """Removes the rare sequences to bound the size of the model
+
+        The sequences seen fewer than min count times are removed, and
+        only the max children most frequent next tokens of every state are
+        kept. The model loses some of its diversity, as the generated text
+        only follows the kept sequences. A Trie is pruned in place, while
+        the arrays of a FrozenTrie or an NGramTable are rebuilt.
+
+        Args:
+            min_count (int, optional): The lowest frequency kept. Defaults to 1.
+            max_children (int, optional): The largest number of next tokens kept
+                per state. Defaults to no limit.
+
+        Returns:
+            dict: The number of nodes removed for the min count and for the
+                max children
+
+        Raises:
+            ValueError: If the model is built on a SuffixArray
+        """
+
+        in_place = self.__form() == "trie"
+        counts = self.__counts("trie" if in_place else "frozen", "pruned")
+        if in_place:
+            removed = counts.prune(min_count, max_children)
+        else:
+            counts, removed = counts.prune(min_count, max_children)
+        self.__store(counts, self.backend)
+        for reason, count in removed.items():
+            self.__pruned[reason] = self.__pruned.get(reason, 0) + count
+        return removed
+
+    def minimize(self) -> int:
+        """Merges the identical subtrees of the Trie into shared nodes
+
+        Cuts the memory of a model that is kept as a regular Trie, e.g. at
+        high degrees, while it stays queryable. A later update first copies
+        the shared nodes back apart. Other backends are left as is.
+
+        Returns:
+            int: The number of nodes removed
+        """
+
+        if self.__form() != "trie" or self.__model.minimized:
+            return 0
+        self.__clear_cache()
+        return self.__model.minimize()
+
+    def use_backend(self, backend: str) -> None:
+        """Moves the counts of the model onto another backend
+
+        The Trie and the NGramTable hold the same counts, so a model moves
+        between them without the text. Moving onto the Trie gives a frozen
+        model. A SuffixArray indexes the text itself and cannot be derived
+        from the counts, nor the other way around.
+
+        Args:
+            backend (str): The data structure to move the model onto, one of BACKENDS
+
+        Raises:
+            ValueError: If the backend is unknown, or either backend is a suffix array
+        """
+
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {', '.join(BACKENDS)}")
+        if backend == self.backend:
+            return
+        if backend == "suffix_array":
+            raise ValueError("a model cannot be moved onto a suffix array")
+        self.__store(self.__counts("frozen", "moved onto another backend"), backend)
+
+    def update(self, tokens) -> None:
+        """Trains the model further with new text
+
+        The new text is treated as a continuation of the text the model was
+        trained on: the sequences that were cut short at the end of the old
+        text are completed with the new tokens. A frozen model is turned back
+        into a regular Trie first, and so is a minimized Trie, whose shared
+        nodes cannot be changed. Only the sampling tables of the nodes whose
+        children change are invalidated. A SuffixArray is rebuilt over the
+        combined text, and an NGramTable is rebuilt from the updated Trie.
+
+        Args:
+            tokens (iterable): The new cleaned text as words
+        """
+
+        backend = self.backend
+        self.__source_hash = ""
+        self.__clear_cache()
+        if backend == "suffix_array":
+            self.__use_suffix_array(SuffixArray(
+                self.__model.tokens + self.__vocabulary.encode(tokens)))
+            return
+        self.__model = self.__counts("trie", "updated")
+        self.__build_model(map(self.__vocabulary.add, tokens))
+        if backend == "hashed":
+            self.__store(self.__model.freeze(), backend)
+
+    def update_from_file(self, path: str) -> None:
+        """Trains the model further with the text of a file
 
-    def __build_model(self) -> None:
-        """Builds the Markov chain"""
+        Args:
+            path (str): The path to the text file
+        """
+
+        with open(path, "r", encoding="utf-8") as file:
+            self.update(CleanService.stream(file))
+
+    def save(self, path: str) -> None:
+        """Saves the model into a compact binary file
+
+        The file holds a header with the degrees and the source hash,
+        the vocabulary, the last tokens of the text, and the flat node
+        arrays of the frozen model. A model built on an NGramTable is saved
+        as a FrozenTrie.
+
+        The model is written into a temporary file next to the path, which
+        is then renamed over it. A loaded model still reads its nodes from
+        the file it was loaded from, so the file must not be rewritten in
+        place, and a reader never sees a partially written model.
+
+        Args:
+            path (str): The path to the model file
+
+        Raises:
+            ValueError: If the model is built on a SuffixArray
+        """
+
+        frozen_model = self.__counts("frozen", "saved")
+        tokens = "\n".join(self.__vocabulary.tokens).encode("utf-8")
+        source_hash = bytes.fromhex(self.__source_hash) if self.__source_hash else b""
+        handle, temporary_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as file:
+                file.write(HEADER.pack(MAGIC, VERSION, self.__degree, self.__max_degree,
+                                       source_hash, len(tokens), len(frozen_model.frequencies),
+                                       len(self.__tail)))
+                file.write(tokens)
+                size = HEADER.size + len(tokens)
+                file.write(bytes(self.__align(size) - size))
+                self.__write_arrays(file, (self.__tail, frozen_model.offsets,
+                                           frozen_model.tokens, frozen_model.frequencies))
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+    def __form(self) -> str:
+        """Returns the form of the model, one of FORMS
+
+        The only place that looks at the type of the data structure. The
+        other methods dispatch on the form, and take the counts through
+        __counts and put them back through __store.
+        """
+
+        for form, model_type in FORMS.items():
+            if isinstance(self.__model, model_type):
+                return form
+        raise TypeError(f"unknown model type {type(self.__model).__name__}")
+
+    def __counts(self, form: str, action: str):
+        """Returns the counts of the model as a Trie or a FrozenTrie
+
+        Args:
+            form (str): "trie" for a Trie that can be updated in place, copied
+                unless the model is one, or "frozen" for a FrozenTrie
+            action (str): What the counts are for, used in the error message
+
+        Raises:
+            ValueError: If the model is built on a SuffixArray, which indexes
+                the text instead of counting it
+        """
+
+        current = self.__form()
+        if current == "suffix_array":
+            raise ValueError(f"a model built on a suffix array cannot be {action}")
+        model = self.__model
+        if form == "frozen":
+            return model if current == "frozen" else model.freeze()
+        if current == "trie" and not model.minimized:
+            return model
+        trie = Trie()
+        trie.merge(model.freeze() if current == "hashed" else model)
+        return trie
+
+    def __store(self, counts, backend: str) -> None:
+        """Puts counts onto a backend as the model
+
+        Args:
+            counts (Trie): A Trie or a FrozenTrie, frozen for the hashed backend
+            backend (str): "trie" or "hashed"
+        """
+
+        self.__model = NGramTable.from_frozen_trie(counts) if backend == "hashed" else counts
+        self.__clear_cache()
+
+    def __resolve(self, sequence: list) -> tuple:
+        """Returns the node and the sampling table of a state through the cache
+
+        Args:
+            sequence (list): The token ids of the state
+
+        Returns:
+            tuple: The node and the sampling table, None for the missing ones
+        """
+
+        key = tuple(sequence)
+        entry = self.__cache.get(key)
+        if entry is None:
+            entry = (self.__model.get_node(sequence),
+                     self.__model.get_sampling_table(sequence))
+            self.__cache.put(key, entry)
+        return entry
+
+    def __build(self, backend: str, tokens) -> None:
+        """Builds the model on a backend
+
+        Args:
+            backend (str): One of BACKENDS
+            tokens (iterable): The token ids of the text
+        """
+
+        if backend == "suffix_array":
+            self.__use_suffix_array(SuffixArray(tokens))
+        elif backend == "hashed":
+            tokens = array("I", tokens)
+            self.__tail = list(tokens[max(len(tokens) - self.__max_degree, 0):])
+            self.__model = NGramTable.from_tokens(tokens, self.__max_degree + 1)
+        else:
+            self.__model = Trie()
+            self.__build_model(tokens)
+
+    def __use_suffix_array(self, suffix_array: SuffixArray) -> None:
+        """Takes a SuffixArray into use as the model
+
+        Args:
+            suffix_array (SuffixArray): The index over the whole text
+        """
+
+        self.__model = suffix_array
+        self.__max_degree = max(len(suffix_array), self.__degree)
+
+    def __clear_cache(self) -> None:
+        """Clears the state cache and counts a revision after the model has changed"""
+
+        self.__revision += 1
+        if self.__cache is not None:
+            self.__cache.clear()
+
+    @staticmethod
+    def __report_progress(tokens, progress):
+        """Passes the tokens through, reporting how many have been processed
+
+        Args:
+            tokens (iterable): The tokens
+            progress (function): Called with the number of tokens processed
+
+        Yields:
+            str: The tokens
+        """
+
+        count = 0
+        for count, token in enumerate(tokens, 1):
+            if count % PROGRESS_INTERVAL == 0:
+                progress(count)
+            yield token
+        progress(count)
+
+    @staticmethod
+    def __align(size: int) -> int:
+        """Rounds a file offset up to the next multiple of 8
+
+        Args:
+            size (int): The offset
+        """
+
+        return (size + 7) & ~7
+
+    def __build_model(self, tokens) -> None:
+        """Builds the Markov chain at the max degree
+
+        A window of max degree + 1 tokens rolls over the text, and a
+        sequence is inserted from every position of the text. The sequences
+        at the end of the text are cut short, so that every prefix length
+        gets the exact count.
+
+        The window starts with the tail of the previously trained text. The
+        sequences starting in the tail were already counted up to the end of
+        the old text, so only their new part is counted.
+
+        Args:
+            tokens (iterable): The token ids of the text
+        """
 
-        order = self.__degree + 1
-        for i in range(len(self.__cleaned_text) - order):
-            state = tuple(self.__cleaned_text[i:i + order])
-            self.__model.insert(state)
+        order = self.__max_degree + 1
+        window = deque(self.__tail, maxlen=order)
+        counted = len(window)
+        for token in tokens:
+            window.append(token)
+            if len(window) == order:
+                self.__model.insert(window, counted)
+                if counted:
+                    counted -= 1
+        self.__tail = list(window)[1:] if len(window) == order else list(window)
+        if len(window) == order:
+            window.popleft()
+        while window:
+            self.__model.insert(window, counted)
+            window.popleft()
+            if counted:
+                counted -= 1
@@ -0,0 +1,134 @@
+from threading import Lock
+from .batch_generate_service import BatchGenerateService
+from .cache_service import CacheService
+from .markov_model import MarkovModel
+from .read_service import ReadService
+
+
+# The generators of the models loaded in this process, keyed by the model path
+RESIDENT = {}
+
+
+def generate_texts(model_path: str, degree: int, count: int, limit: int, starts: list) -> list:
+    """Generates a batch of texts with a resident model
+
+    Runs in the worker processes of the generation server. The model file is
+    memory-mapped on first use, and the BatchGenerateService built on it stays
+    resident in the process, so only the first batch of a model pays for
+    loading it. The degree is passed per batch, so one service
+    serves every degree of the model, and a worker holds the arrays derived
+    from a model only once.
+
+    Args:
+        model_path (str): The path to the saved model
+        degree (int): The degree to generate at
+        count (int): The number of texts
+        limit (int): The number of words in each text
+        starts (list): The start sequences of the texts, one list of words per text
+
+    Returns:
+        list: The generated texts
+    """
+
+    batch_generate_service = RESIDENT.get(model_path)
+    if batch_generate_service is None:
+        markov_model = MarkovModel.load(model_path)
+        batch_generate_service = RESIDENT[model_path] = BatchGenerateService(
+            markov_model.model, markov_model.max_degree, markov_model.vocabulary)
+    return batch_generate_service.generate_batch(count, limit, starts, degree)
+
+
+class ModelPoolService:
+    """Keeps the models of the stories resident in memory
+
+    The models are built at the max degree, so one model per story serves
+    every degree up to it. They are taken from the CacheService, and the
+    frozen models stay memory-mapped for the lifetime of the pool, which
+    can be shared between threads. The path of a model file can be handed
+    to generate_texts in another process, which loads the saved model
+    instead of building it again.
+
+    Attributes:
+        max_degree (int): The degree the models are built at
+        stories (list): The titles of the stories
+        models (dict): The resident models keyed by the story
+    """
+
+    def __init__(self, cache_service: CacheService = None, max_degree: int = 5) -> None:
+        """Initializes the ModelPoolService
+
+        Args:
+            cache_service (CacheService, optional): The cache to take the models
+                from. Defaults to a CacheService in the default directory.
+            max_degree (int, optional): The degree the models are built at.
+                Defaults to 5.
+        """
+
+        self.__cache_service = cache_service or CacheService()
+        self.__max_degree = max_degree
+        self.__read_service = ReadService()
+        self.__models = {}
+        self.__paths = {}
+        self.__lock = Lock()
+
+    @property
+    def max_degree(self) -> int:
+        """Returns the degree the models are built at"""
+
+        return self.__max_degree
+
+    @property
+    def stories(self) -> list:
+        """Returns the titles of the stories"""
+
+        return list(self.__read_service.available_stories.values())
+
+    @property
+    def models(self) -> dict:
+        """Returns the resident models keyed by the story"""
+
+        return self.__models
+
+    def get_model(self, story: str) -> MarkovModel:
+        """Returns the resident model of a story, loading it on first use
+
+        Args:
+            story (str): The title of the story
+
+        Returns:
+            MarkovModel: The frozen model
+
+        Raises:
+            ValueError: If the story is unknown
+        """
+
+        with self.__lock:
+            markov_model = self.__models.get(story)
+            if markov_model is None:
+                if story not in self.stories:
+                    raise ValueError(f"unknown story '{story}'")
+                path = self.__read_service.file_path(story)
+                markov_model = self.__cache_service.get_model(
+                    path, self.__max_degree, self.__max_degree)
+                self.__models[story] = markov_model
+                self.__paths[story] = self.__cache_service.model_path(path, self.__max_degree)
+            return markov_model
+
+    def model_path(self, story: str, degree: int) -> str:
+        """Returns the path of the model file of a story
+
+        Args:
+            story (str): The title of the story
+            degree (int): The degree to generate at
+
+        Returns:
+            str: The path to the model file
+
+        Raises:
+            ValueError: If the story is unknown or the degree is out of range
+        """
+
+        if not 1 <= degree <= self.__max_degree:
+            raise ValueError(f"degree must be between 1 and {self.__max_degree}")
+        self.get_model(story)
+        return self.__paths[story]
@@ -0,0 +1,333 @@
+import atexit
+import cProfile
+import inspect
+import os
+import sys
+from functools import wraps
+from time import perf_counter
+from entities import Trie, FrozenTrie, NGramTable, SuffixArray
+from .read_service import ReadService
+from .clean_service import CleanService
+from .markov_model import MarkovModel
+from .generate_service import GenerateService
+
+
+ENVIRONMENT_VARIABLE = "TEXT_GENERATOR_PROFILE"
+
+# owner, attribute, stage, how the tokens are counted
+STAGES = (
+    (ReadService, "text", "read", None),
+    (ReadService, "read_lines", "read", None),
+    (CleanService, "stream", "clean", "yields"),
+    (MarkovModel, "__init__", "build", "model"),
+    (MarkovModel, "build_vectorized", "build", "model"),
+    (MarkovModel, "build_parallel", "build", "model"),
+    (MarkovModel, "update", "build", "Trie.insert"),
+    (MarkovModel, "load", "load", None),
+    (GenerateService, "iter_words", "generate", "yields"),
+)
+
+# owner, attribute
+COUNTED = (
+    (Trie, "insert"),
+    (Trie, "get_children"),
+    (Trie, "get_sampling_table"),
+    (FrozenTrie, "get_children"),
+    (FrozenTrie, "get_sampling_table"),
+    (NGramTable, "get_children"),
+    (NGramTable, "get_sampling_table"),
+    (SuffixArray, "get_children"),
+    (SuffixArray, "get_sampling_table"),
+    (MarkovModel, "next_tokens"),
+    (MarkovModel, "get_children"),
+    (MarkovModel, "get_sampling_table"),
+)
+
+
+class ProfileService:
+    """Opt-in instrumentation of the hot paths of the services
+
+    While the profiler runs, the stage methods of the services and the
+    counted methods of the models are replaced with instrumented wrappers,
+    and the originals are put back when it stops. When the profiler is not
+    running, nothing is patched, so the instrumentation costs nothing.
+
+    The stages are read, clean, build, load and generate. The build stage
+    covers every way of building a model, including the builds of the
+    CacheService on a miss, and the load stage its hits. The timings include
+    the nested stages, e.g. a model built from a file streams the clean
+    stage inside the build stage. The generators are timed only while
+    they produce items, not while the caller consumes them. The tokens of
+    a build are the tokens of the built model, so every backend and build
+    method counts them alike.
+
+    The profiler is switched on with the TEXT_GENERATOR_PROFILE environment
+    variable or used as a context manager. Given a dump path, it also runs
+    cProfile in the current thread and writes a pstats file on stop.
+
+    Attributes:
+        dump_path (str): The path of the pstats file, None for no cProfile
+        stages (dict): The calls, seconds and tokens of every stage
+        counts (dict): The number of calls of every counted method
+        running (bool): Whether the profiler is running
+    """
+
+    def __init__(self, dump_path: str = None) -> None:
+        """Initializes the profiler
+
+        Args:
+            dump_path (str, optional): The path of the pstats file.
+                Defaults to None.
+        """
+
+        self.__dump_path = dump_path
+        self.__stages = {}
+        self.__counts = {}
+        self.__patched = []
+        self.__profile = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @classmethod
+    def from_environment(cls):
+        """Starts a profiler if the environment variable asks for one
+
+        The value 1 turns on the instrumentation, and any other value is also
+        used as the dump path of a cProfile run. The report is printed into
+        the standard error when the program exits.
+
+        Returns:
+            ProfileService: The running profiler, None if profiling is off
+        """
+
+        value = os.environ.get(ENVIRONMENT_VARIABLE, "")
+        if value in ("", "0"):
+            return None
+        profile_service = cls(None if value == "1" else value)
+        profile_service.start()
+        atexit.register(profile_service.print_report)
+        return profile_service
+
+    @property
+    def dump_path(self) -> str:
+        """Returns the path of the pstats file"""
+
+        return self.__dump_path
+
+    @property
+    def stages(self) -> dict:
+        """Returns the calls, seconds and tokens of every stage"""
+
+        return self.__stages
+
+    @property
+    def counts(self) -> dict:
+        """Returns the number of calls of every counted method"""
+
+        return self.__counts
+
+    @property
+    def running(self) -> bool:
+        """Returns whether the profiler is running"""
+
+        return bool(self.__patched)
+
+    def tokens_per_second(self, stage: str) -> float:
+        """Returns the throughput of a stage
+
+        Args:
+            stage (str): The name of the stage
+
+        Returns:
+            float: The tokens per second, None if the stage counts no tokens
+        """
+
+        record = self.__stages.get(stage)
+        if not record or not record["tokens"] or not record["seconds"]:
+            return None
+        return record["tokens"] / record["seconds"]
+
+    def start(self) -> None:
+        """Patches the instrumented methods and starts cProfile"""
+
+        if self.running:
+            return
+        for owner, attribute in COUNTED:
+            self.__patch(owner, attribute, self.__counter)
+        for owner, attribute, stage, tokens in STAGES:
+            self.__patch(owner, attribute, lambda func, stage=stage, tokens=tokens:
+                         self.__timer(func, stage, tokens))
+        if self.__dump_path is not None:
+            self.__profile = cProfile.Profile()
+            self.__profile.enable()
+
+    def stop(self) -> None:
+        """Puts back the original methods and writes the pstats file"""
+
+        if self.__profile is not None:
+            self.__profile.disable()
+            self.__profile.dump_stats(self.__dump_path)
+            self.__profile = None
+        while self.__patched:
+            owner, attribute, original = self.__patched.pop()
+            setattr(owner, attribute, original)
+
+    def report(self) -> str:
+        """Returns the stage timings and the call counts as a table"""
+
+        lines = [f"{'stage':<10}{'calls':>8}{'seconds':>12}{'tokens':>12}{'tokens/s':>14}"]
+        for stage, record in self.__stages.items():
+            throughput = self.tokens_per_second(stage)
+            lines.append(f"{stage:<10}{record['calls']:>8}{record['seconds']:>12.4f}"
+                         f"{record['tokens']:>12}"
+                         f"{f'{throughput:.0f}' if throughput else '-':>14}")
+        lines.append("")
+        lines.append(f"{'method':<30}{'calls':>12}")
+        for name, count in self.__counts.items():
+            lines.append(f"{name:<30}{count:>12}")
+        return "\n".join(lines)
+
+    def print_report(self) -> None:
+        """Stops the profiler and prints the report into the standard error"""
+
+        self.stop()
+        print(self.report(), file=sys.stderr)
+
+    def __patch(self, owner, attribute: str, wrapper) -> None:
+        """Replaces a method of a class with a wrapper of it
+
+        Properties have their setter wrapped, and static and class methods
+        their function.
+
+        Args:
+            owner (type): The class
+            attribute (str): The name of the method in the class
+            wrapper (function): Returns the wrapper of a function
+        """
+
+        original = owner.__dict__[attribute]
+        if isinstance(original, property):
+            patched = original.setter(wrapper(original.fset))
+        elif isinstance(original, staticmethod):
+            patched = staticmethod(wrapper(original.__func__))
+        elif isinstance(original, classmethod):
+            patched = classmethod(wrapper(original.__func__))
+        else:
+            patched = wrapper(original)
+        self.__patched.append((owner, attribute, original))
+        setattr(owner, attribute, patched)
+
+    def __counter(self, func):
+        """Wraps a function to count its calls
+
+        Args:
+            func (function): The function
+
+        Returns:
+            function: The wrapper
+        """
+
+        name = func.__qualname__
+        counts = self.__counts
+        counts.setdefault(name, 0)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    @staticmethod
+    def __generator_timer(func, record: dict, count_yields: bool):
+        """Wraps a generator function to time its calls
+
+        Only the time spent inside the generator is counted, not the time
+        the consumer spends between the items.
+
+        Args:
+            func (function): The generator function
+            record (dict): The record of the stage
+            count_yields (bool): Whether to count the items as the tokens
+
+        Returns:
+            function: The wrapper
+        """
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            elapsed = 0.0
+            produced = 0
+            start = perf_counter()
+            try:
+                for item in func(*args, **kwargs):
+                    elapsed += perf_counter() - start
+                    produced += 1
+                    yield item
+                    start = perf_counter()
+                elapsed += perf_counter() - start
+            finally:
+                record["calls"] += 1
+                record["seconds"] += elapsed
+                if count_yields:
+                    record["tokens"] += produced
+        return wrapper
+
+    def __timer(self, func, stage: str, tokens: str):
+        """Wraps a function to time its calls as a stage
+
+        Args:
+            func (function): The function
+            stage (str): The name of the stage
+            tokens (str): "yields" to count the items of a generator as the
+                tokens, "model" to count the tokens of the built model, the
+                name of a counted method to count its calls, or None for
+                no tokens
+
+        Returns:
+            function: The wrapper
+        """
+
+        record = self.__stages.setdefault(stage, {"calls": 0, "seconds": 0.0, "tokens": 0})
+        counts = self.__counts
+
+        if inspect.isgeneratorfunction(func):
+            return self.__generator_timer(func, record, tokens == "yields")
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            before = counts.get(tokens, 0)
+            start = perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                record["calls"] += 1
+                record["seconds"] += perf_counter() - start
+                if tokens in counts:
+                    record["tokens"] += counts[tokens] - before
+            if tokens == "model":
+                record["tokens"] += ProfileService.__token_count(
+                    args[0] if result is None else result)
+            return result
+        return wrapper
+
+    @staticmethod
+    def __token_count(markov_model: MarkovModel) -> int:
+        """Returns the number of tokens a model was built from
+
+        Every token of the text starts one sequence, so the counts of the
+        first tokens of the sequences add up to the length of the text.
+
+        Args:
+            markov_model (MarkovModel): The built model
+
+        Returns:
+            int: The number of tokens
+        """
+
+        next_tokens = markov_model.model.next_tokens([])
+        return sum(next_tokens[1]) if next_tokens else 0
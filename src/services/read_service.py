@@ -1,3 +1,4 @@
+import hashlib
 import os
 
 
@@ -38,6 +39,17 @@ class ReadService:
 
         return self.__title
 
+    @title.setter
+    def title(self, story: str) -> None:
+        """Sets the title without reading the file
+
+        Args:
+            story (str): The name of the story
+        """
+
+        self.file_path(story)
+        self.__title = story
+
     @property
     def text(self) -> list:
         """Returns the text from the file"""
@@ -53,6 +65,68 @@ class ReadService:
         """
 
         self.__title = story
-        story_file = self.__files[story]
-        with open(self.__path + story_file, "r", encoding="utf-8") as file:
+        with open(self.file_path(story), "r", encoding="utf-8") as file:
             self.__text = file.readlines()
+
+    def file_path(self, story: str) -> str:
+        """Returns the path to the file of a story
+
+        Args:
+            story (str): The name of the story
+        """
+
+        return self.__path + self.__files[story]
+
+    def lines(self, story: str):
+        """Streams the text of a story one line at a time
+
+        Unlike the text setter, the file is not read into memory.
+        The title is updated to the story.
+
+        Args:
+            story (str): The name of the story
+
+        Returns:
+            generator: The lines of the file
+        """
+
+        path = self.file_path(story)
+        self.__title = story
+        return self.__read_lines(path)
+
+    def __read_lines(self, path: str):
+        """Yields the lines of a file
+
+        Args:
+            path (str): The path to the file
+        """
+
+        with open(path, "r", encoding="utf-8") as file:
+            yield from self.read_lines(file)
+
+    @staticmethod
+    def read_lines(file):
+        """Yields the lines of an open text file
+
+        Args:
+            file (TextIO): The file
+        """
+
+        yield from file
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        """Returns the SHA-256 hash of a file
+
+        Args:
+            path (str): The path to the file
+
+        Returns:
+            str: The hash as a hex string
+        """
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
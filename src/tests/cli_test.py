@@ -0,0 +1,109 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from cli import build_parser, is_pruned, main
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.directory.name, "alice.model")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_main(self, *argv):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            status = main(list(argv))
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def test_parse_generate(self):
+        args = build_parser().parse_args(
+            ["generate", "--story", "Alice in Wonderland", "--degree", "2", "--count", "3"])
+        self.assertEqual(args.story, "Alice in Wonderland")
+        self.assertEqual(args.degree, 2)
+        self.assertEqual(args.count, 3)
+        self.assertEqual(args.limit, 100)
+        self.assertEqual(args.backend, "trie")
+        self.assertFalse(is_pruned(args))
+
+    def test_parse_pruning(self):
+        args = build_parser().parse_args(
+            ["train", "--file", "x.txt", "--degree", "2", "--output", "x", "--min-count", "2"])
+        self.assertEqual(args.backend, "trie")
+        self.assertTrue(is_pruned(args))
+
+    def test_sources_are_exclusive(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            build_parser().parse_args(
+                ["generate", "--story", "Alice in Wonderland", "--file", "x.txt"])
+
+    def test_train_requires_degree(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as error:
+            main(["train", "--story", "Alice in Wonderland", "--output", self.model_path])
+        self.assertEqual(error.exception.code, 2)
+
+    def test_arguments_out_of_range(self):
+        for arguments in (["--degree", "0"], ["--degree", "2", "--limit", "-1"],
+                          ["--degree", "2", "--count", "-1"]):
+            with contextlib.redirect_stderr(io.StringIO()), \
+                    self.assertRaises(SystemExit) as error:
+                main(["generate", "--story", "Alice in Wonderland"] + arguments)
+            self.assertEqual(error.exception.code, 2)
+
+    def test_stories(self):
+        status, stdout, _ = self.run_main("stories")
+        self.assertEqual(status, 0)
+        self.assertIn("Alice in Wonderland", stdout.splitlines())
+
+    def test_unknown_story(self):
+        status, _, stderr = self.run_main(
+            "generate", "--story", "Nope", "--degree", "2", "--no-cache")
+        self.assertEqual(status, 1)
+        self.assertIn("unknown story", stderr)
+
+    def test_missing_file(self):
+        status, _, stderr = self.run_main(
+            "generate", "--model", os.path.join(self.directory.name, "nope.model"))
+        self.assertEqual(status, 1)
+        self.assertIn("Error", stderr)
+
+    def test_train_and_generate(self):
+        status, _, _ = self.run_main("train", "--story", "Alice in Wonderland",
+                                     "--degree", "2", "--output", self.model_path)
+        self.assertEqual(status, 0)
+        status, stdout, _ = self.run_main("generate", "--model", self.model_path, "--count", "2",
+                                          "--limit", "8", "--seed", "1", "--start", "alice was")
+        self.assertEqual(status, 0)
+        texts = stdout.splitlines()
+        self.assertEqual(len(texts), 2)
+        self.assertTrue(all(text.startswith("alice was") for text in texts))
+        self.assertTrue(all(len(text.split()) <= 8 for text in texts))
+
+    def test_generate_into_files(self):
+        output_dir = os.path.join(self.directory.name, "texts")
+        status, stdout, _ = self.run_main(
+            "generate", "--story", "Alice in Wonderland", "--degree", "2", "--no-cache",
+            "--count", "2", "--limit", "5", "--output-dir", output_dir)
+        self.assertEqual(status, 0)
+        self.assertEqual(stdout, "")
+        self.assertEqual(sorted(os.listdir(output_dir)), ["text_1.txt", "text_2.txt"])
+
+    def test_unknown_start(self):
+        self.run_main("train", "--story", "Alice in Wonderland",
+                      "--degree", "2", "--output", self.model_path)
+        status, _, stderr = self.run_main("generate", "--model", self.model_path,
+                                          "--start", "xyzzy")
+        self.assertEqual(status, 1)
+        self.assertIn("not in the model", stderr)
+
+    def test_saved_model_cannot_be_pruned(self):
+        self.run_main("train", "--story", "Alice in Wonderland",
+                      "--degree", "2", "--output", self.model_path)
+        status, _, stderr = self.run_main("generate", "--model", self.model_path,
+                                          "--min-count", "2")
+        self.assertEqual(status, 1)
+        self.assertIn("cannot be pruned", stderr)
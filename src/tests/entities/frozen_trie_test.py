@@ -0,0 +1,143 @@
+import unittest
+from unittest import mock
+from entities import Trie, FrozenTrie
+
+
+class TestFrozenTrie(unittest.TestCase):
+    def setUp(self):
+        self.trie = Trie()
+        self.trie.insert((0, 1, 2))
+        self.trie.insert((0, 1, 2))
+        self.trie.insert((0, 1, 3))
+        self.trie.insert((1, 2, 0))
+        self.frozen_trie = self.trie.freeze()
+
+    def test_freeze_type(self):
+        self.assertEqual(type(self.frozen_trie), FrozenTrie)
+
+    def test_node_count(self):
+        self.assertEqual(self.frozen_trie.node_count, 8)
+
+    def test_get_root_children(self):
+        self.assertEqual(
+            set(self.frozen_trie.get_children([]).keys()), {0, 1})
+
+    def test_get_children(self):
+        children = self.frozen_trie.get_children((0, 1))
+        self.assertEqual(children[2].frequency, 2)
+        self.assertEqual(children[3].frequency, 1)
+
+    def test_next_tokens(self):
+        self.assertEqual(self.frozen_trie.next_tokens((0, 1)), ([2, 3], [2, 1]))
+        self.assertEqual(self.frozen_trie.next_tokens((0, 1)), self.trie.next_tokens((0, 1)))
+        self.assertIsNone(self.frozen_trie.next_tokens((2, 2)))
+
+    def test_prune(self):
+        frozen_trie, removed = self.frozen_trie.prune(min_count=2)
+        self.assertEqual(removed, {"min_count": 3, "max_children": 0})
+        self.assertEqual(frozen_trie.next_tokens((0, 1)), ([2], [2]))
+        self.assertEqual(frozen_trie.next_tokens(()), ([0, 1], [3, 1]))
+        self.assertEqual(frozen_trie.next_tokens((1,)), ([], []))
+        self.assertEqual(frozen_trie.node_count, self.frozen_trie.node_count - 3)
+
+    def test_prune_max_children(self):
+        frozen_trie, removed = self.frozen_trie.prune(max_children=1)
+        self.assertEqual(removed, {"min_count": 0, "max_children": 1})
+        self.assertEqual(frozen_trie.next_tokens(()), self.frozen_trie.next_tokens(()))
+        self.assertEqual(frozen_trie.next_tokens((0, 1)), ([2], [2]))
+
+    def test_get_children_matches_trie(self):
+        for sequence in ((0,), (0, 1), (1, 2)):
+            expected = {token: node.frequency
+                        for token, node in self.trie.get_children(sequence).items()}
+            children = {token: node.frequency
+                        for token, node in self.frozen_trie.get_children(sequence).items()}
+            self.assertEqual(children, expected)
+
+    def test_get_invalid_children(self):
+        self.assertEqual(self.frozen_trie.get_children((0, 3)), None)
+
+    def test_get_unknown_word_children(self):
+        self.assertEqual(self.frozen_trie.get_children((9,)), None)
+
+    def test_node_children(self):
+        node = self.frozen_trie.root.children[0].children[1]
+        self.assertEqual(set(node.children.keys()), {2, 3})
+
+    def test_get_sampling_table(self):
+        table = self.frozen_trie.get_sampling_table((0, 1))
+        self.assertEqual(table.tokens, (2, 3))
+        self.assertEqual(table.cumulative, [2, 3])
+
+    def test_sampling_tables_are_bounded(self):
+        with mock.patch("entities.frozen_trie.SAMPLING_TABLE_CACHE_SIZE", 1):
+            frozen_trie = FrozenTrie(self.frozen_trie.offsets, self.frozen_trie.tokens,
+                                     self.frozen_trie.frequencies)
+        table = frozen_trie.get_sampling_table((0,))
+        self.assertIs(frozen_trie.get_sampling_table((0,)), table)
+        frozen_trie.get_sampling_table((0, 1))
+        self.assertIsNot(frozen_trie.get_sampling_table((0,)), table)
+
+    def test_get_invalid_sampling_table(self):
+        self.assertEqual(self.frozen_trie.get_sampling_table((0, 1, 2)), None)
+        self.assertEqual(self.frozen_trie.get_sampling_table((3,)), None)
+
+    def test_merge(self):
+        other = Trie()
+        other.insert((0, 1, 3))
+        other.insert((2, 0, 1))
+        merged = FrozenTrie.merge([self.frozen_trie, other.freeze()])
+        self.trie.merge(other)
+        expected = self.trie.freeze()
+        self.assertEqual(list(merged.offsets), list(expected.offsets))
+        self.assertEqual(list(merged.tokens), list(expected.tokens))
+        self.assertEqual(list(merged.frequencies), list(expected.frequencies))
+
+    def test_merge_nothing(self):
+        merged = FrozenTrie.merge([])
+        self.assertEqual(merged.node_count, 1)
+        self.assertEqual(merged.next_tokens(()), ([], []))
+
+    def test_merge_mappings(self):
+        other = Trie()
+        other.insert((1, 0, 2))
+        other.insert((1, 0, 3))
+        merged = FrozenTrie.merge([self.frozen_trie, other.freeze()],
+                                  [[0, 1, 2, 3], [1, 0, 3, 2]])
+        self.trie.insert((0, 1, 3))
+        self.trie.insert((0, 1, 2))
+        expected = self.trie.freeze()
+        self.assertEqual(list(merged.offsets), list(expected.offsets))
+        self.assertEqual(list(merged.tokens), list(expected.tokens))
+        self.assertEqual(list(merged.frequencies), list(expected.frequencies))
+
+    def test_stats(self):
+        stats = self.frozen_trie.stats()
+        self.assertEqual(stats["nodes"], 8)
+        self.assertEqual(stats["edges"], 7)
+        self.assertEqual([level["nodes"] for level in stats["depths"]], [1, 2, 2, 3])
+        self.assertEqual(stats["depths"][1]["max_branching"], 1)
+        self.assertEqual(stats["depths"][3]["leaves"], 3)
+
+    def test_stats_match_trie(self):
+        self.assertEqual(self.frozen_trie.stats()["depths"], self.trie.stats()["depths"])
+        self.assertLess(self.frozen_trie.stats()["bytes"], self.trie.stats()["bytes"])
+
+    def test_from_tokens_matches_freeze(self):
+        tokens = [0, 1, 2, 0, 1, 3, 1, 2, 0, 1, 2, 2]
+        trie = Trie()
+        for start in range(len(tokens)):
+            trie.insert(tokens[start:start + 4])
+        frozen_trie = trie.freeze()
+        counted = FrozenTrie.from_tokens(tokens, 4)
+        self.assertEqual(list(counted.offsets), list(frozen_trie.offsets))
+        self.assertEqual(list(counted.tokens), list(frozen_trie.tokens))
+        self.assertEqual(list(counted.frequencies), list(frozen_trie.frequencies))
+
+    def test_from_tokens_short_text(self):
+        counted = FrozenTrie.from_tokens([7], 3)
+        self.assertEqual(counted.node_count, 2)
+        self.assertEqual(counted.get_children([7]), {})
+
+    def test_from_tokens_empty(self):
+        self.assertEqual(FrozenTrie.from_tokens([], 3).get_children([]), {})
@@ -0,0 +1,31 @@
+import unittest
+from entities import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self.lru_cache = LRUCache(2)
+        self.lru_cache.put("a", 1)
+        self.lru_cache.put("b", 2)
+
+    def test_get(self):
+        self.assertEqual(self.lru_cache.get("a"), 1)
+        self.assertEqual(self.lru_cache.get("c"), None)
+
+    def test_counters(self):
+        self.lru_cache.get("a")
+        self.lru_cache.get("a")
+        self.lru_cache.get("c")
+        self.assertEqual(self.lru_cache.hits, 2)
+        self.assertEqual(self.lru_cache.misses, 1)
+
+    def test_evicts_least_recently_used(self):
+        self.lru_cache.get("a")
+        self.lru_cache.put("c", 3)
+        self.assertEqual(len(self.lru_cache), 2)
+        self.assertEqual(self.lru_cache.get("b"), None)
+        self.assertEqual(self.lru_cache.get("a"), 1)
+
+    def test_clear(self):
+        self.lru_cache.clear()
+        self.assertEqual(len(self.lru_cache), 0)
@@ -0,0 +1,76 @@
+import unittest
+from unittest import mock
+from entities import Trie, FrozenTrie, NGramTable, SuffixArray, ModelBackend
+
+
+class TestNGramTable(unittest.TestCase):
+    def setUp(self):
+        self.tokens = [0, 1, 2, 0, 1, 3, 1, 2, 0, 1, 2]
+        self.table = NGramTable.from_tokens(self.tokens, 3)
+        self.trie = Trie()
+        for start in range(len(self.tokens)):
+            self.trie.insert(self.tokens[start:start + 3])
+
+    def test_next_tokens(self):
+        self.assertEqual(self.table.next_tokens([0, 1]), ([2, 3], [2, 1]))
+        self.assertEqual(self.table.next_tokens([]), ([0, 1, 2, 3], [3, 4, 3, 1]))
+
+    def test_next_tokens_matches_trie(self):
+        for sequence in ([], [0], [1], [0, 1], [1, 2], [2, 0], [1, 2, 0], [3, 3]):
+            self.assertEqual(self.table.next_tokens(sequence), self.trie.next_tokens(sequence))
+
+    def test_next_tokens_of_leaf(self):
+        self.assertEqual(self.table.next_tokens([0, 1, 2]), ([], []))
+
+    def test_next_tokens_missing(self):
+        self.assertIsNone(self.table.next_tokens([3, 3]))
+
+    def test_get_children_matches_trie(self):
+        for sequence in ([], [0], [1, 2], [0, 1, 3]):
+            expected = {token: child.frequency
+                        for token, child in self.trie.get_children(sequence).items()}
+            children = self.table.get_children(sequence)
+            self.assertEqual({token: child.frequency for token, child in children.items()},
+                             expected)
+
+    def test_get_node(self):
+        self.assertEqual(self.table.get_node([1, 2]).frequency, 3)
+        self.assertEqual(self.table.get_node([1, 2, 0]).frequency, 2)
+        self.assertIsNone(self.table.get_node([2, 2]))
+
+    def test_get_sampling_table(self):
+        table = self.table.get_sampling_table([0, 1])
+        self.assertEqual(table.total, 3)
+        self.assertIs(self.table.get_sampling_table([0, 1]), table)
+        self.assertIsNone(self.table.get_sampling_table([0, 1, 2]))
+
+    def test_sampling_tables_are_bounded(self):
+        with mock.patch("entities.ngram_table.SAMPLING_TABLE_CACHE_SIZE", 1):
+            table = NGramTable.from_tokens(self.tokens, 3)
+        first = table.get_sampling_table([0, 1])
+        table.get_sampling_table([1, 2])
+        self.assertIsNot(table.get_sampling_table([0, 1]), first)
+        self.assertEqual(table.get_sampling_table([0, 1]).total, 3)
+
+    def test_freeze_matches_frozen_trie(self):
+        frozen_trie = self.trie.freeze()
+        thawed = self.table.freeze()
+        self.assertEqual(list(thawed.offsets), list(frozen_trie.offsets))
+        self.assertEqual(list(thawed.tokens), list(frozen_trie.tokens))
+        self.assertEqual(list(thawed.frequencies), list(frozen_trie.frequencies))
+
+    def test_stats(self):
+        stats = self.table.stats()
+        self.assertEqual(stats["nodes"], self.trie.stats()["nodes"])
+        self.assertEqual(stats["rows"], self.table.row_count)
+        self.assertGreater(stats["bytes"], 0)
+
+    def test_empty_text(self):
+        table = NGramTable.from_tokens([], 3)
+        self.assertEqual(table.next_tokens([]), ([], []))
+        self.assertEqual(table.row_count, 0)
+
+    def test_backends_implement_protocol(self):
+        for backend in (self.trie, FrozenTrie.from_tokens(self.tokens, 3), self.table,
+                        SuffixArray(self.tokens)):
+            self.assertIsInstance(backend, ModelBackend)
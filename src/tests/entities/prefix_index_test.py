@@ -0,0 +1,35 @@
+import unittest
+from entities import PrefixIndex
+
+
+class TestPrefixIndex(unittest.TestCase):
+    def setUp(self):
+        self.prefix_index = PrefixIndex(
+            ["that", "the", "alice", "then", "a"], [4, 10, 7, 2, 5])
+
+    def test_words_are_sorted(self):
+        self.assertEqual(self.prefix_index.words,
+                         ["a", "alice", "that", "the", "then"])
+
+    def test_complete_empty_prefix(self):
+        self.assertEqual(self.prefix_index.complete("", 3),
+                         ["the", "alice", "a"])
+
+    def test_complete_prefix(self):
+        self.assertEqual(self.prefix_index.complete("th"),
+                         ["the", "that", "then"])
+
+    def test_complete_prefix_limit(self):
+        self.assertEqual(self.prefix_index.complete("th", 1), ["the"])
+
+    def test_complete_unknown_prefix(self):
+        self.assertEqual(self.prefix_index.complete("z"), [])
+
+    def test_buckets_match_ranges(self):
+        words = [f"{first}{second}{third}" for first in "abc" for second in "xyz"
+                 for third in "pq"]
+        prefix_index = PrefixIndex(words, [len(words) - i for i in range(len(words))])
+        self.assertEqual(len(prefix_index.buckets["a"]), 6)
+        for prefix in ("a", "bx", "cz", "azq"):
+            ranked = prefix_index.complete(prefix, 20)
+            self.assertEqual(prefix_index.complete(prefix, 3), ranked[:3])
@@ -0,0 +1,35 @@
+import unittest
+from entities import SamplingTable
+
+
+class TestSamplingTable(unittest.TestCase):
+    def setUp(self):
+        self.sampling_table = SamplingTable(["a", "b", "c"], [3, 2, 5])
+
+    def test_total(self):
+        self.assertEqual(self.sampling_table.total, 10)
+
+    def test_cumulative(self):
+        self.assertEqual(self.sampling_table.cumulative, [3, 5, 10])
+
+    def test_sample(self):
+        self.assertEqual(self.sampling_table.sample(0.0), "a")
+        self.assertEqual(self.sampling_table.sample(0.29), "a")
+        self.assertEqual(self.sampling_table.sample(0.3), "b")
+        self.assertEqual(self.sampling_table.sample(0.49), "b")
+        self.assertEqual(self.sampling_table.sample(0.5), "c")
+
+    def test_sample_upper_bound(self):
+        self.assertEqual(self.sampling_table.sample(0.9999999999999999), "c")
+
+    def test_excluding(self):
+        table = self.sampling_table.excluding("b")
+        self.assertEqual(table.tokens, ("a", "c"))
+        self.assertEqual(table.cumulative, [3, 8])
+        self.assertIs(self.sampling_table.excluding("b"), table)
+
+    def test_excluding_missing_token(self):
+        self.assertIs(self.sampling_table.excluding("d"), self.sampling_table)
+
+    def test_excluding_only_token(self):
+        self.assertIsNone(SamplingTable(["a"], [1]).excluding("a"))
@@ -0,0 +1,72 @@
+import unittest
+from entities import Trie, SuffixArray
+
+
+class TestSuffixArray(unittest.TestCase):
+    def setUp(self):
+        self.tokens = [0, 1, 2, 0, 1, 3, 1, 2, 0, 1, 2]
+        self.suffix_array = SuffixArray(self.tokens)
+        self.trie = Trie()
+        for start in range(len(self.tokens)):
+            self.trie.insert(self.tokens[start:start + 4])
+
+    def test_suffixes_are_sorted(self):
+        suffixes = [self.tokens[position:] for position in self.suffix_array.suffixes]
+        self.assertEqual(suffixes, sorted(suffixes))
+
+    def test_lcp(self):
+        suffixes = [self.tokens[position:] for position in self.suffix_array.suffixes]
+        for index in range(1, len(suffixes)):
+            common = 0
+            while common < min(len(suffixes[index]), len(suffixes[index - 1])) and \
+                    suffixes[index][common] == suffixes[index - 1][common]:
+                common += 1
+            self.assertEqual(self.suffix_array.lcp[index], common)
+
+    def test_find(self):
+        start, end = self.suffix_array.find([0, 1])
+        self.assertEqual(end - start, 3)
+        self.assertIsNone(self.suffix_array.find([3, 3]))
+
+    def test_get_children_matches_trie(self):
+        for sequence in ([], [0], [1], [0, 1], [1, 2], [0, 1, 2], [2, 0, 1]):
+            expected = {token: child.frequency
+                        for token, child in self.trie.get_children(sequence).items()}
+            children = self.suffix_array.get_children(sequence)
+            self.assertEqual({token: child.frequency for token, child in children.items()},
+                             expected)
+
+    def test_next_tokens_matches_trie(self):
+        for sequence in ([], [0, 1], [1, 2, 0]):
+            self.assertEqual(self.suffix_array.next_tokens(sequence),
+                             self.trie.next_tokens(sequence))
+        self.assertIsNone(self.suffix_array.next_tokens([3, 3]))
+
+    def test_get_children_of_text_end(self):
+        self.assertEqual(self.suffix_array.get_children([0, 1, 2, 0, 1, 3, 1, 2, 0, 1, 2]), {})
+
+    def test_get_children_any_length(self):
+        children = self.suffix_array.get_children([1, 2, 0, 1, 3, 1, 2, 0])
+        self.assertEqual(list(children), [1])
+
+    def test_get_invalid_children(self):
+        self.assertIsNone(self.suffix_array.get_children([4]))
+
+    def test_nested_children(self):
+        child = self.suffix_array.get_children([0])[1]
+        self.assertEqual({token: node.frequency for token, node in child.children.items()},
+                         {2: 2, 3: 1})
+
+    def test_get_sampling_table(self):
+        table = self.suffix_array.get_sampling_table([0, 1])
+        self.assertEqual(dict(zip(table.tokens, table.cumulative)), {2: 2, 3: 3})
+        self.assertIsNone(self.suffix_array.get_sampling_table([0, 1, 2, 0, 1, 3, 1, 2, 0, 1, 2]))
+
+    def test_stats_match_trie(self):
+        expected = self.trie.stats()["depths"][:3]
+        self.assertEqual(self.suffix_array.stats(2)["depths"], expected)
+
+    def test_empty(self):
+        suffix_array = SuffixArray([])
+        self.assertEqual(suffix_array.get_children([]), {})
+        self.assertIsNone(suffix_array.get_sampling_table([]))
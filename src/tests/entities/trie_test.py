@@ -24,3 +24,130 @@ class TestTrieNode(unittest.TestCase):
     def test_get_invalid_children(self):
         self.trie.insert(("a", "b", "c"))
         self.assertEqual(self.trie.get_children(("a", "d")), None)
+
+    def test_get_sampling_table(self):
+        self.trie.insert(("a", "b"))
+        self.trie.insert(("a", "b"))
+        self.trie.insert(("a", "c"))
+        table = self.trie.get_sampling_table(("a",))
+        self.assertEqual(table.tokens, ("b", "c"))
+        self.assertEqual(table.total, 3)
+
+    def test_sampling_table_is_reused(self):
+        self.trie.insert(("a", "b"))
+        self.assertIs(self.trie.get_sampling_table(("a",)),
+                      self.trie.get_sampling_table(("a",)))
+
+    def test_get_invalid_sampling_table(self):
+        self.trie.insert(("a", "b"))
+        self.assertEqual(self.trie.get_sampling_table(("a", "b")), None)
+        self.assertEqual(self.trie.get_sampling_table(("c",)), None)
+
+    def test_insert_counts_prefixes(self):
+        self.trie.insert(("a", "b", "c"))
+        self.trie.insert(("a", "b", "d"))
+        self.trie.insert(("a", "c", "d"))
+        self.assertEqual(self.trie.get_children([])["a"].frequency, 3)
+        self.assertEqual(self.trie.get_children(("a",))["b"].frequency, 2)
+        self.assertEqual(self.trie.get_children(("a", "b"))["c"].frequency, 1)
+
+    def test_merge(self):
+        self.trie.insert(("a", "b"))
+        other = Trie()
+        other.insert(("a", "b"))
+        other.insert(("a", "c"))
+        self.trie.merge(other)
+        self.assertEqual(self.trie.get_children([])["a"].frequency, 3)
+        self.assertEqual(self.trie.get_children(("a",))["b"].frequency, 2)
+        self.assertEqual(self.trie.get_children(("a",))["c"].frequency, 1)
+
+    def test_merge_frozen(self):
+        other = Trie()
+        other.insert((0, 1))
+        self.trie.merge(other.freeze())
+        self.assertEqual(self.trie.get_children((0,))[1].frequency, 1)
+
+    def test_insert_with_counted_prefix(self):
+        self.trie.insert(("a", "b"))
+        self.trie.insert(("a", "b", "c"), 2)
+        self.assertEqual(self.trie.get_children([])["a"].frequency, 1)
+        self.assertEqual(self.trie.get_children(("a",))["b"].frequency, 1)
+        self.assertEqual(self.trie.get_children(("a", "b"))["c"].frequency, 1)
+
+    def test_insert_invalidates_changed_sampling_tables(self):
+        self.trie.insert(("a", "b"))
+        self.trie.insert(("c", "d"))
+        table_a = self.trie.get_sampling_table(("a",))
+        table_c = self.trie.get_sampling_table(("c",))
+        self.trie.insert(("a", "e"))
+        self.assertIsNot(self.trie.get_sampling_table(("a",)), table_a)
+        self.assertIs(self.trie.get_sampling_table(("c",)), table_c)
+
+    def test_stats(self):
+        self.trie.insert(("a", "b", "c"))
+        self.trie.insert(("a", "d", "c"))
+        stats = self.trie.stats()
+        self.assertEqual(stats["nodes"], 6)
+        self.assertEqual(stats["edges"], 5)
+        self.assertEqual(stats["depths"][1]["max_branching"], 2)
+        self.assertEqual(stats["depths"][2]["mean_branching"], 1)
+        self.assertGreater(stats["bytes"], 0)
+
+    def test_minimize_shares_identical_subtrees(self):
+        tokens = [0, 1, 2, 3, 1, 2, 3, 0]
+        for start in range(len(tokens)):
+            self.trie.insert(tokens[start:start + 3])
+        nodes = self.trie.stats()["nodes"]
+        removed = self.trie.minimize()
+        stats = self.trie.stats()
+        self.assertTrue(stats["minimized"])
+        self.assertGreater(removed, 0)
+        self.assertEqual(stats["nodes"], nodes - removed)
+        self.assertIs(self.trie.get_node([2, 3, 1]), self.trie.get_node([2, 3, 0]))
+
+    def test_minimize_keeps_queries(self):
+        tokens = [0, 1, 2, 3, 1, 2, 3, 0, 2, 3, 1]
+        for start in range(len(tokens)):
+            self.trie.insert(tokens[start:start + 4])
+        frozen_trie = self.trie.freeze()
+        self.trie.minimize()
+        for sequence in ([], [1], [2, 3], [1, 2, 3], [3, 0]):
+            self.assertEqual(self.trie.next_tokens(sequence), frozen_trie.next_tokens(sequence))
+        minimized = self.trie.freeze()
+        self.assertEqual(minimized.offsets, frozen_trie.offsets)
+        self.assertEqual(minimized.frequencies, frozen_trie.frequencies)
+
+    def test_minimized_trie_cannot_be_changed(self):
+        self.trie.insert((0, 1))
+        self.trie.minimize()
+        with self.assertRaises(ValueError):
+            self.trie.insert((0, 2))
+        with self.assertRaises(ValueError):
+            self.trie.merge(Trie())
+
+    def test_prune(self):
+        tokens = [0, 1, 2, 0, 1, 3, 0, 1, 2, 4, 0]
+        for start in range(len(tokens)):
+            self.trie.insert(tokens[start:start + 3])
+        nodes = self.trie.stats()["nodes"]
+        removed = self.trie.prune(max_children=1)
+        self.assertEqual(self.trie.next_tokens([]), ([0, 1, 2, 3, 4], [4, 3, 2, 1, 1]))
+        self.assertEqual(self.trie.next_tokens([0, 1]), ([2], [2]))
+        self.assertGreater(removed["max_children"], 0)
+        removed_rare = self.trie.prune(min_count=2)
+        self.assertEqual(self.trie.next_tokens([]), ([0, 1, 2, 3, 4], [4, 3, 2, 1, 1]))
+        self.assertEqual(self.trie.next_tokens([3]), ([], []))
+        self.assertEqual(self.trie.stats()["nodes"],
+                         nodes - removed["max_children"] - removed_rare["min_count"])
+
+    def test_prune_matches_frozen_trie(self):
+        tokens = [0, 1, 2, 0, 1, 3, 0, 1, 2, 4, 0, 2, 2, 1]
+        for start in range(len(tokens)):
+            self.trie.insert(tokens[start:start + 4])
+        frozen_trie, frozen_removed = self.trie.freeze().prune(2, 2)
+        removed = self.trie.prune(2, 2)
+        self.assertEqual(removed, frozen_removed)
+        pruned = self.trie.freeze()
+        self.assertEqual(pruned.offsets, frozen_trie.offsets)
+        self.assertEqual(pruned.tokens, frozen_trie.tokens)
+        self.assertEqual(pruned.frequencies, frozen_trie.frequencies)
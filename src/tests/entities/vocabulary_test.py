@@ -0,0 +1,38 @@
+import unittest
+from entities import Vocabulary
+
+
+class TestVocabulary(unittest.TestCase):
+    def setUp(self):
+        self.vocabulary = Vocabulary(["a", "b", "a", "c"])
+
+    def test_length(self):
+        self.assertEqual(len(self.vocabulary), 3)
+
+    def test_ids_are_dense(self):
+        self.assertEqual([self.vocabulary.id_of(token)
+                         for token in ("a", "b", "c")], [0, 1, 2])
+
+    def test_add_existing(self):
+        self.assertEqual(self.vocabulary.add("b"), 1)
+        self.assertEqual(len(self.vocabulary), 3)
+
+    def test_token_of(self):
+        self.assertEqual(self.vocabulary.token_of(2), "c")
+
+    def test_encode_decode(self):
+        ids = self.vocabulary.encode(["c", "d", "a"])
+        self.assertEqual(list(ids), [2, 3, 0])
+        self.assertEqual(self.vocabulary.decode(ids), ["c", "d", "a"])
+
+    def test_lookup(self):
+        self.assertEqual(self.vocabulary.lookup(["b", "a"]), [1, 0])
+
+    def test_lookup_unknown(self):
+        self.assertEqual(self.vocabulary.lookup(["b", "z"]), None)
+        self.assertFalse("z" in self.vocabulary)
+
+    def test_nbytes_grows(self):
+        size = self.vocabulary.nbytes
+        self.vocabulary.add("a much longer token than the others")
+        self.assertGreater(self.vocabulary.nbytes, size)
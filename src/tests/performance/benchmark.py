@@ -0,0 +1,376 @@
+import argparse
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from time import perf_counter
+from services import ReadService, CleanService, MarkovModel, GenerateService, ProfileService
+from services.markov_model import BACKENDS
+
+
+class Benchmark:
+    """Headless benchmark of the text generation pipeline
+
+    Times each stage separately: reading, cleaning, building the model,
+    looking up the children of a state and generating text. Every
+    measurement is warmed up and repeated, and reported as the median
+    and the 95th percentile of the runs. One extra run of every measurement
+    is traced with tracemalloc to record its peak memory, and the stats of
+    every model built are recorded for capacity planning. The build, lookup
+    and generate stages are measured on every backend, so the fastest
+    backend can be chosen for each story and degree.
+
+    Attributes:
+        stories (list): The titles of the stories to benchmark
+        degrees (list): The degrees to benchmark
+        backends (list): The backends to benchmark
+        repeats (int): The number of timed runs per measurement
+        warmup (int): The number of untimed runs per measurement
+        results (list): The measurements
+        models (list): The stats of the models built
+    """
+
+    def __init__(self, stories: list, degrees: list, repeats: int = 5, warmup: int = 1,
+                 lookups: int = 10000, limit: int = 10000, backends: list = None) -> None:
+        """Initializes the benchmark
+
+        Args:
+            stories (list): The titles of the stories to benchmark
+            degrees (list): The degrees to benchmark
+            repeats (int, optional): The number of timed runs. Defaults to 5.
+            warmup (int, optional): The number of untimed runs. Defaults to 1.
+            lookups (int, optional): The number of states looked up per run.
+                Defaults to 10000.
+            limit (int, optional): The number of words generated per run.
+                Defaults to 10000.
+            backends (list, optional): The backends to benchmark.
+                Defaults to the Trie only.
+        """
+
+        self.__stories = stories
+        self.__degrees = degrees
+        self.__repeats = repeats
+        self.__warmup = warmup
+        self.__lookups = lookups
+        self.__limit = limit
+        self.__backends = backends or ["trie"]
+        self.__results = []
+        self.__models = []
+
+    @property
+    def results(self) -> list:
+        """Returns the measurements"""
+
+        return self.__results
+
+    @property
+    def models(self) -> list:
+        """Returns the stats of the models built"""
+
+        return self.__models
+
+    def run(self) -> None:
+        """Runs every stage for every story and degree"""
+
+        read_service = ReadService()
+        for story in self.__stories:
+            self.__measure("read", story, None, lambda: self.__read(read_service, story))
+            read_service.text = story
+            text = read_service.text
+            self.__measure("clean", story, None, lambda: CleanService(text))
+            clean_service = CleanService(text)
+            for degree in self.__degrees:
+                states = self.__sample_states(clean_service.token_ids, degree)
+                for backend in self.__backends:
+                    self.__run_backend(story, degree, backend, clean_service, states)
+
+    def __run_backend(self, story: str, degree: int, backend: str,
+                      clean_service: CleanService, states: list) -> None:
+        """Runs the build, lookup and generate stages on one backend
+
+        Args:
+            story (str): The title of the story
+            degree (int): The degree of the model
+            backend (str): The backend of the model
+            clean_service (CleanService): The cleaned text
+            states (list): The states to look up
+        """
+
+        self.__measure("build", story, degree, lambda: MarkovModel(
+            clean_service.token_ids, degree, clean_service.vocabulary, backend=backend),
+            backend=backend)
+        if backend == "trie":
+            self.__measure("vectorize", story, degree, lambda: MarkovModel.build_vectorized(
+                clean_service.token_ids, degree, vocabulary=clean_service.vocabulary))
+        markov_model = MarkovModel(
+            clean_service.token_ids, degree, clean_service.vocabulary, backend=backend)
+        if backend == "trie":
+            self.__record_stats(story, markov_model)
+            markov_model.freeze()
+        self.__record_stats(story, markov_model)
+        self.__measure("lookup", story, degree,
+                       lambda: self.__lookup(markov_model, states), len(states), backend)
+        self.__measure("generate", story, degree,
+                       lambda: self.__generate(markov_model, degree), self.__limit, backend)
+
+    def write(self, path: str) -> None:
+        """Writes the results into a JSON file
+
+        Args:
+            path (str): The path to the results file
+        """
+
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "created": datetime.now(timezone.utc).isoformat(),
+                "repeats": self.__repeats,
+                "warmup": self.__warmup,
+            },
+            "results": self.__results,
+            "models": self.__models,
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    def __measure(self, stage: str, story: str, degree: int, func, operations: int = 0,
+                  backend: str = "trie") -> None:
+        """Times a function and records the median, the 95th percentile and the peak memory
+
+        Args:
+            stage (str): The name of the stage
+            story (str): The title of the story
+            degree (int): The degree of the model, None if not applicable
+            func (function): The function to time
+            operations (int, optional): The number of operations per run,
+                used to report the throughput. Defaults to 0.
+            backend (str, optional): The backend of the model. Defaults to "trie".
+        """
+
+        for _ in range(self.__warmup):
+            func()
+        times = []
+        for _ in range(self.__repeats):
+            start = perf_counter()
+            func()
+            times.append(perf_counter() - start)
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        median = statistics.median(times)
+        result = {
+            "stage": stage,
+            "story": story,
+            "degree": degree,
+            "backend": backend,
+            "median": median,
+            "p95": percentile(times, 95),
+            "runs": len(times),
+            "peak_bytes": peak,
+        }
+        if operations:
+            result["per_second"] = operations / median
+        self.__results.append(result)
+        print(f"{stage:<10}{story:<22}{str(degree or '-'):>4}  {backend:<13}"
+              f"{median * 1000:>12.2f} ms{result['p95'] * 1000:>12.2f} ms"
+              f"{peak / 2 ** 20:>10.1f} MiB")
+
+    def __record_stats(self, story: str, markov_model: MarkovModel) -> None:
+        """Records the stats of a model
+
+        Args:
+            story (str): The title of the story
+            markov_model (MarkovModel): The model
+        """
+
+        stats = markov_model.stats()
+        stats["story"] = story
+        self.__models.append(stats)
+        print_stats(stats)
+
+    def __read(self, read_service: ReadService, story: str) -> None:
+        read_service.text = story
+
+    def __sample_states(self, token_ids, degree: int) -> list:
+        """Picks random states of the text to look up
+
+        Args:
+            token_ids (array): The token ids of the text
+            degree (int): The degree of the model
+        """
+
+        randomizer = random.Random(0)
+        last = len(token_ids) - degree
+        return [token_ids[i:i + degree].tolist()
+                for i in (randomizer.randrange(last) for _ in range(self.__lookups))]
+
+    def __lookup(self, markov_model: MarkovModel, states: list) -> None:
+        for state in states:
+            markov_model.model.next_tokens(state)
+
+    def __generate(self, markov_model: MarkovModel, degree: int) -> None:
+        GenerateService(markov_model.form_the_starting_sequence([]), markov_model.model,
+                        degree, self.__limit, markov_model.vocabulary)
+
+
+def print_stats(stats: dict) -> None:
+    """Prints the stats of a model
+
+    Args:
+        stats (dict): The stats, as returned by MarkovModel.stats
+    """
+
+    kind = stats["backend"] if stats["backend"] != "trie" else \
+        "frozen" if stats["frozen"] else "minimized" if stats.get("minimized") else "trie"
+    print(f"{'model':<10}{stats['story']:<22}{stats['degree']:>4}  {kind:<13}"
+          f"{stats['nodes']:>10} nodes{stats['vocabulary_size']:>8} words"
+          f"{stats['bytes'] / 2 ** 20:>10.1f} MiB")
+    for level in stats["depths"]:
+        print(f"{'':<44}depth {level['depth']:>2}{level['nodes']:>10} nodes"
+              f"  branching mean {level['mean_branching']:>7.2f}"
+              f"  median {level['median_branching']:>5.1f}  max {level['max_branching']:>6}")
+
+
+def profile(story: str, degree: int, limit: int, dump_path: str) -> ProfileService:
+    """Profiles a full read, clean, build and generate run
+
+    Args:
+        story (str): The title of the story
+        degree (int): The degree of the model
+        limit (int): The number of words generated
+        dump_path (str): The path of the pstats file
+
+    Returns:
+        ProfileService: The stopped profiler
+    """
+
+    with ProfileService(dump_path) as profile_service:
+        read_service = ReadService()
+        read_service.text = story
+        clean_service = CleanService(read_service.text)
+        markov_model = MarkovModel(clean_service.token_ids, degree, clean_service.vocabulary)
+        GenerateService(markov_model.form_the_starting_sequence([]), markov_model,
+                        degree, limit, markov_model.vocabulary)
+    return profile_service
+
+
+def percentile(values: list, rank: int) -> float:
+    """Returns the nearest-rank percentile of the values
+
+    Args:
+        values (list): The values
+        rank (int): The percentile, between 0 and 100
+    """
+
+    ordered = sorted(values)
+    return ordered[max(math.ceil(rank / 100 * len(ordered)) - 1, 0)]
+
+
+def compare(baseline_path: str, current_path: str, threshold: float) -> list:
+    """Compares the results with a baseline
+
+    Args:
+        baseline_path (str): The path to the baseline results
+        current_path (str): The path to the current results
+        threshold (float): The allowed relative slowdown of the median
+
+    Returns:
+        list: The regressions as (stage, story, degree, backend, baseline, current) tuples
+    """
+
+    def key_of(result: dict) -> tuple:
+        return (result["stage"], result["story"], result["degree"],
+                result.get("backend", "trie"))
+
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline = {key_of(result): result for result in json.load(file)["results"]}
+    with open(current_path, "r", encoding="utf-8") as file:
+        current = json.load(file)["results"]
+    regressions = []
+    for result in current:
+        key = key_of(result)
+        if key not in baseline:
+            continue
+        before = baseline[key]["median"]
+        after = result["median"]
+        change = (after - before) / before if before else 0
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"{key[0]:<10}{key[1]:<22}{str(key[2] or '-'):>4}  {key[3]:<13}"
+              f"{before * 1000:>12.2f} ms{after * 1000:>12.2f} ms{change:>+9.1%}  {flag}")
+        if flag:
+            regressions.append((*key, before, after))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the text generator.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmark")
+    run_parser.add_argument("--stories", nargs="+",
+                            default=list(ReadService().available_stories.values()))
+    run_parser.add_argument("--degrees", nargs="+", type=int, default=[1, 2, 3, 4, 5])
+    run_parser.add_argument("--repeats", type=int, default=5)
+    run_parser.add_argument("--warmup", type=int, default=1)
+    run_parser.add_argument("--lookups", type=int, default=10000)
+    run_parser.add_argument("--limit", type=int, default=10000)
+    run_parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["trie"])
+    run_parser.add_argument("--output", default="benchmark.json")
+
+    stats_parser = commands.add_parser("stats", help="print the stats of the models")
+    stats_parser.add_argument("--stories", nargs="+",
+                              default=list(ReadService().available_stories.values()))
+    stats_parser.add_argument("--degrees", nargs="+", type=int, default=[1, 2, 3, 4, 5])
+
+    profile_parser = commands.add_parser("profile", help="profile a full run")
+    profile_parser.add_argument("--story", default="Alice in Wonderland")
+    profile_parser.add_argument("--degree", type=int, default=3)
+    profile_parser.add_argument("--limit", type=int, default=100000)
+    profile_parser.add_argument("--output", default="profile.pstats")
+
+    compare_parser = commands.add_parser("compare", help="compare results with a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        benchmark = Benchmark(args.stories, args.degrees, args.repeats, args.warmup,
+                              args.lookups, args.limit, args.backends)
+        benchmark.run()
+        benchmark.write(args.output)
+        return 0
+    if args.command == "profile":
+        print(profile(args.story, args.degree, args.limit, args.output).report())
+        print(f"\npstats written into {args.output}")
+        return 0
+    if args.command == "stats":
+        read_service = ReadService()
+        for story in args.stories:
+            for degree in args.degrees:
+                markov_model = MarkovModel.from_file(read_service.file_path(story), degree)
+                stats = markov_model.stats()
+                stats["story"] = story
+                print_stats(stats)
+                markov_model.minimize()
+                stats = markov_model.stats()
+                stats["story"] = story
+                print_stats(stats)
+                markov_model.freeze()
+                stats = markov_model.stats()
+                stats["story"] = story
+                print_stats(stats)
+        return 0
+    regressions = compare(args.baseline, args.current, args.threshold)
+    print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from services import CacheService, ModelPoolService
+from server import GenerateServer
+
+
+class BrokenExecutor(Executor):
+    def submit(self, fn, /, *args, **kwargs):
+        raise BrokenProcessPool("a worker died")
+
+
+class FlakyModelPool:
+    def __init__(self, model_pool):
+        self.model_pool = model_pool
+        self.failures = 1
+
+    def model_path(self, story, degree):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("cache unavailable")
+        return self.model_pool.model_path(story, degree)
+
+
+class TestGenerateServer(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.model_pool = ModelPoolService(CacheService(cls.directory.name), max_degree=2)
+        cls.model_pool.get_model("Alice in Wonderland")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    async def asyncSetUp(self):
+        await self.start(GenerateServer(self.model_pool, batch_window=0.001))
+
+    async def asyncTearDown(self):
+        self.tcp_server.close()
+        await self.tcp_server.wait_closed()
+
+    async def start(self, server):
+        if hasattr(self, "tcp_server"):
+            await self.asyncTearDown()
+        self.server = server
+        self.tcp_server = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        self.port = self.tcp_server.sockets[0].getsockname()[1]
+
+    async def request(self, target, method="GET"):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(f"{method} {target} HTTP/1.1\r\nConnection: close\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(body)
+
+    async def test_generate(self):
+        status, body = await self.request(
+            "/generate?story=Alice+in+Wonderland&degree=2&limit=7&start=alice+was")
+        self.assertEqual(status, 200)
+        self.assertEqual(body["degree"], 2)
+        self.assertTrue(body["text"].startswith("alice was"))
+        self.assertLessEqual(len(body["text"].split()), 7)
+
+    async def test_stories(self):
+        status, body = await self.request("/stories")
+        self.assertEqual(status, 200)
+        self.assertIn("Alice in Wonderland", body["stories"])
+
+    async def test_missing_parameter(self):
+        status, body = await self.request("/generate?degree=2")
+        self.assertEqual(status, 400)
+        self.assertIn("story", body["error"])
+
+    async def test_invalid_parameters(self):
+        for query in ("story=Alice+in+Wonderland&limit=x",
+                      "story=Alice+in+Wonderland&limit=0",
+                      "story=Alice+in+Wonderland&limit=10001",
+                      "story=Alice+in+Wonderland&degree=3",
+                      "story=Nope"):
+            status, _ = await self.request(f"/generate?{query}")
+            self.assertEqual(status, 400)
+
+    async def test_unknown_start_word(self):
+        status, body = await self.request("/generate?story=Alice+in+Wonderland&start=xyzzy")
+        self.assertEqual(status, 400)
+        self.assertIn("xyzzy", body["error"])
+
+    async def test_unknown_path(self):
+        status, _ = await self.request("/nope")
+        self.assertEqual(status, 404)
+
+    async def test_unsupported_method(self):
+        status, _ = await self.request("/generate", method="POST")
+        self.assertEqual(status, 405)
+
+    async def test_broken_executor(self):
+        await self.start(GenerateServer(self.model_pool, BrokenExecutor(), batch_window=0.001))
+        status, body = await self.request("/generate?story=Alice+in+Wonderland")
+        self.assertEqual(status, 500)
+        self.assertIn("BrokenProcessPool", body["error"])
+
+    async def test_failed_model_lookup_is_retried(self):
+        await self.start(GenerateServer(FlakyModelPool(self.model_pool), batch_window=0.001))
+        status, body = await self.request("/generate?story=Alice+in+Wonderland")
+        self.assertEqual(status, 500)
+        self.assertIn("OSError", body["error"])
+        status, _ = await self.request("/generate?story=Alice+in+Wonderland")
+        self.assertEqual(status, 200)
+
+    async def test_full_batch_is_flushed_without_waiting(self):
+        await self.start(GenerateServer(self.model_pool, batch_size=2, batch_window=60))
+        responses = await asyncio.wait_for(asyncio.gather(
+            self.request("/generate?story=Alice+in+Wonderland&limit=5"),
+            self.request("/generate?story=Alice+in+Wonderland&limit=5")), 10)
+        self.assertEqual([status for status, _ in responses], [200, 200])
+        self.assertEqual(self.server.batches, 1)
+        self.assertEqual(self.server.requests, 2)
@@ -0,0 +1,58 @@
+import unittest
+from services import MarkovModel, AutocompleteService
+
+
+class TestAutocompleteService(unittest.TestCase):
+    def setUp(self):
+        text = "the cat sat on the mat and the cat ate the rat".split()
+        self.markov_model = MarkovModel(text, 1)
+        self.autocomplete_service = AutocompleteService(self.markov_model)
+
+    def test_complete_empty_sequence(self):
+        self.assertEqual(self.autocomplete_service.complete([], "", 2),
+                         ["the", "cat"])
+
+    def test_complete_sequence(self):
+        self.assertEqual(self.autocomplete_service.complete(["the"]),
+                         ["the cat", "the mat", "the rat"])
+
+    def test_complete_partial_word(self):
+        self.assertEqual(self.autocomplete_service.complete(["the"], "m"),
+                         ["the mat"])
+
+    def test_complete_uses_degree(self):
+        self.assertEqual(self.autocomplete_service.complete(["on", "the"], "c"),
+                         ["on the cat"])
+
+    def test_complete_unknown_word(self):
+        self.assertEqual(self.autocomplete_service.complete(["dog"]), [])
+
+    def test_complete_frozen_model(self):
+        self.markov_model.freeze()
+        autocomplete_service = AutocompleteService(self.markov_model)
+        self.assertEqual(autocomplete_service.complete(["the"], "", 1),
+                         ["the cat"])
+
+    def test_complete_hashed_model(self):
+        self.markov_model.use_backend("hashed")
+        autocomplete_service = AutocompleteService(self.markov_model)
+        self.assertEqual(autocomplete_service.complete(["the"]),
+                         ["the cat", "the mat", "the rat"])
+
+    def test_unknown_token_is_not_suggested(self):
+        markov_model = MarkovModel(["a", "<unk>", "a", "b", "a", "<unk>"], 1)
+        autocomplete_service = AutocompleteService(markov_model)
+        self.assertEqual(autocomplete_service.complete(["a"]), ["a b"])
+        self.assertEqual(autocomplete_service.complete(["b"]), ["b a"])
+
+    def test_complete_after_update(self):
+        self.assertEqual(self.autocomplete_service.complete(["the"], "d"), [])
+        self.markov_model.update(["the", "dog"])
+        self.assertEqual(self.autocomplete_service.complete(["the"], "d"),
+                         ["the dog"])
+
+    def test_complete_after_prune(self):
+        self.assertEqual(self.autocomplete_service.complete(["cat"]),
+                         ["cat ate", "cat sat"])
+        self.markov_model.prune(2)
+        self.assertEqual(self.autocomplete_service.complete(["cat"]), [])
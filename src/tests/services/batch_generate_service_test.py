@@ -0,0 +1,87 @@
+import unittest
+from services import ReadService, CleanService, MarkovModel, BatchGenerateService
+
+
+class TestBatchGenerateService(unittest.TestCase):
+    def setUp(self):
+        read_service = ReadService()
+        read_service.text = "Alice in Wonderland"
+        clean_service = CleanService(read_service.text)
+        self.markov_model = MarkovModel(clean_service.clean_text, 2)
+        self.batch_generate_service = BatchGenerateService(
+            self.markov_model.model, 2, self.markov_model.vocabulary, seed=1)
+
+    def test_object_exists(self):
+        self.assertIsNotNone(self.batch_generate_service)
+
+    def test_generate_batch(self):
+        texts = self.batch_generate_service.generate_batch(20, 15)
+        self.assertEqual(len(texts), 20)
+        self.assertTrue(all(len(text.split()) == 15 for text in texts))
+
+    def test_generated_sequences_are_in_model(self):
+        vocabulary = self.markov_model.vocabulary
+        for text in self.batch_generate_service.generate_batch(10, 20):
+            token_ids = vocabulary.lookup(text.split())
+            for i in range(2, len(token_ids)):
+                self.assertIn(token_ids[i], self.markov_model.model.get_children(
+                    token_ids[i - 2:i]))
+
+    def test_seeds(self):
+        texts = self.batch_generate_service.generate_batch(
+            2, 5, seeds=[["the", "white"], ["alice"]])
+        self.assertEqual(texts[0].split()[:2], ["the", "white"])
+        self.assertEqual(texts[1].split()[0], "alice")
+
+    def test_seed_is_reproducible(self):
+        other = BatchGenerateService(
+            self.markov_model.model, 2, self.markov_model.vocabulary, seed=1)
+        self.assertEqual(self.batch_generate_service.generate_batch(5, 10),
+                         other.generate_batch(5, 10))
+
+    def test_backs_off_at_dead_end(self):
+        markov_model = MarkovModel("a b c a b d e f".split(), 2)
+        batch_generate_service = BatchGenerateService(
+            markov_model.model, 2, markov_model.vocabulary, seed=1)
+        texts = batch_generate_service.generate_batch(50, 12)
+        self.assertTrue(all(len(text.split()) == 12 for text in texts))
+
+    def test_backs_off_from_unseen_seed(self):
+        markov_model = MarkovModel("a b c a b d e f".split(), 2)
+        batch_generate_service = BatchGenerateService(
+            markov_model.model, 2, markov_model.vocabulary, seed=1)
+        text = batch_generate_service.generate_batch(1, 6, seeds=[["f", "a"]])[0]
+        self.assertEqual(text.split()[:3], ["f", "a", "b"])
+        self.assertEqual(len(text.split()), 6)
+
+    def test_empty_model_stops_chain(self):
+        markov_model = MarkovModel([], 1)
+        batch_generate_service = BatchGenerateService(
+            markov_model.model, 1, markov_model.vocabulary)
+        self.assertEqual(batch_generate_service.generate_batch(2, 5), ["", ""])
+
+    def test_seed_longer_than_limit(self):
+        texts = self.batch_generate_service.generate_batch(
+            2, 2, seeds=[["the", "white", "rabbit"]])
+        self.assertEqual(texts[0], "the white rabbit")
+        self.assertEqual(len(texts[1].split()), 2)
+
+    def test_too_many_seeds(self):
+        with self.assertRaises(ValueError):
+            self.batch_generate_service.generate_batch(1, 5, seeds=[["alice"], ["the"]])
+
+    def test_unknown_seed_word(self):
+        with self.assertRaises(KeyError):
+            self.batch_generate_service.generate_batch(1, 5, seeds=[["alice", "xyzzy"]])
+
+    def test_unknown_token_is_not_sampled(self):
+        markov_model = MarkovModel(["a", "<unk>", "a", "b", "a", "<unk>"], 1)
+        batch_generate_service = BatchGenerateService(
+            markov_model.model, 1, markov_model.vocabulary, seed=1)
+        for text in batch_generate_service.generate_batch(20, 6, seeds=[["a"]] * 20):
+            self.assertEqual(text, "a b a b a b")
+
+    def test_suffix_array_is_rejected(self):
+        markov_model = MarkovModel(["a", "b", "c"], 1, backend="suffix_array")
+        with self.assertRaises(ValueError):
+            BatchGenerateService(markov_model.model, 1, markov_model.vocabulary)
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import time
+import unittest
+from services import ReadService, CacheService, BuildService
+
+
+class TestBuildService(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_service = CacheService(self.directory.name)
+        self.build_service = BuildService(self.cache_service)
+        self.path = ReadService().file_path("Alice in Wonderland")
+
+    def tearDown(self):
+        self.build_service.close()
+        self.directory.cleanup()
+
+    def wait(self):
+        markov_model = self.build_service.wait(60)
+        if markov_model is None:
+            self.fail("the build did not finish")
+        return markov_model
+
+    def test_build(self):
+        self.build_service.start(self.path, 2, 3)
+        self.assertTrue(self.build_service.running)
+        markov_model = self.wait()
+        self.assertEqual(markov_model.degree, 2)
+        self.assertEqual(markov_model.max_degree, 3)
+        self.assertTrue(os.path.exists(self.cache_service.model_path(self.path, 3)))
+        self.assertFalse(self.build_service.running)
+
+    def test_build_keeps_size_cap(self):
+        stale_path = os.path.join(self.directory.name, "stale.model")
+        with open(stale_path, "wb") as file:
+            file.write(bytes(1 << 21))
+        os.utime(stale_path, (0, 0))
+        build_service = BuildService(CacheService(self.directory.name, 1 << 21))
+        build_service.start(self.path, 1)
+        markov_model = build_service.wait(60)
+        build_service.close()
+        self.assertIsNotNone(markov_model)
+        self.assertFalse(os.path.exists(stale_path))
+
+    def test_progress_reaches_total(self):
+        self.build_service.start(self.path, 1)
+        while self.build_service.running:
+            done, total = self.build_service.progress
+            time.sleep(0.01)
+        self.assertEqual(total, os.path.getsize(self.path))
+        self.assertEqual(done, total)
+        self.wait()
+
+    def test_newer_build_supersedes(self):
+        self.build_service.start(self.path, 1, 4)
+        self.build_service.start(self.path, 2)
+        markov_model = self.wait()
+        self.assertEqual(markov_model.max_degree, 2)
+        self.build_service.close()
+        self.assertIsNone(self.cache_service.get_cached(self.path, 1, 4))
+        self.assertEqual([name for name in os.listdir(self.directory.name)
+                          if not name.endswith(".model")], [])
+
+    def test_cancel(self):
+        self.build_service.start(self.path, 1)
+        self.build_service.cancel()
+        self.assertFalse(self.build_service.running)
+        self.assertIsNone(self.build_service.poll())
+
+    def test_failed_build(self):
+        self.build_service.start(os.path.join(self.directory.name, "missing.txt"), 1)
+        with self.assertRaises(RuntimeError):
+            self.wait()
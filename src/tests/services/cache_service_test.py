@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from services import ReadService, CacheService
+
+
+class TestCacheService(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_service = CacheService(self.directory.name)
+        self.path = ReadService().file_path("Alice in Wonderland")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_miss_builds_model(self):
+        markov_model = self.cache_service.get_model(self.path, 1)
+        self.assertEqual(self.cache_service.misses, 1)
+        self.assertEqual(len(markov_model.form_the_starting_sequence([])), 1)
+        self.assertTrue(os.path.exists(self.cache_service.model_path(self.path, 1)))
+
+    def test_hit_loads_model(self):
+        built = self.cache_service.get_model(self.path, 1, 2)
+        loaded = self.cache_service.get_model(self.path, 2, 2)
+        self.assertEqual(self.cache_service.hits, 1)
+        self.assertEqual(loaded.degree, 2)
+        self.assertEqual(loaded.vocabulary.tokens, built.vocabulary.tokens)
+        self.assertEqual(loaded.source_hash, ReadService.hash_file(self.path))
+
+    def test_get_model_backend(self):
+        markov_model = self.cache_service.get_model(self.path, 2, backend="hashed")
+        self.assertEqual(markov_model.backend, "hashed")
+        self.assertEqual(self.cache_service.get_model(self.path, 2).backend, "trie")
+        self.assertEqual(len(markov_model.form_the_starting_sequence([])), 2)
+
+    def test_get_model_suffix_array(self):
+        with self.assertRaises(ValueError):
+            self.cache_service.get_model(self.path, 2, backend="suffix_array")
+        self.assertEqual(self.cache_service.misses, 0)
+
+    def test_key_depends_on_degree(self):
+        self.assertNotEqual(self.cache_service.model_path(self.path, 1),
+                            self.cache_service.model_path(self.path, 2))
+
+    def test_no_temporary_files_left(self):
+        self.cache_service.get_model(self.path, 1)
+        self.assertEqual([name for name in os.listdir(self.directory.name)
+                          if not name.endswith(".model")], [])
+
+    def test_evicts_least_recently_used(self):
+        self.cache_service.get_model(self.path, 1)
+        self.cache_service.get_model(self.path, 2)
+        self.cache_service.get_model(self.path, 1)
+        first = self.cache_service.model_path(self.path, 1)
+        second = self.cache_service.model_path(self.path, 2)
+        size = os.path.getsize(first) + os.path.getsize(second)
+        CacheService(self.directory.name, size - 1).evict()
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
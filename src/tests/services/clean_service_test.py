@@ -16,3 +16,51 @@ class TestCleanService(unittest.TestCase):
 
     def test_clean_text_type(self):
         self.assertEqual(type(self.clean_service.clean_text), list)
+
+    def test_token_ids(self):
+        self.assertEqual(len(self.clean_service.token_ids),
+                         len(self.clean_service.clean_text))
+
+    def test_token_ids_decode(self):
+        vocabulary = self.clean_service.vocabulary
+        self.assertEqual(vocabulary.decode(self.clean_service.token_ids[:10]),
+                         self.clean_service.clean_text[:10])
+
+    def test_stream(self):
+        lines = [
+            "Header line\n",
+            "*** START OF THE PROJECT GUTENBERG EBOOK TEST ***\n",
+            "Hello, World! It's 1 test_line.\n",
+            "Naïve café?\n",
+            "*** END OF THE PROJECT GUTENBERG EBOOK TEST ***\n",
+            "Footer line\n",
+        ]
+        self.assertEqual(list(CleanService.stream(lines)),
+                         ["hello,", "world!", "it's", "test", "line.", "na", "ve", "caf", "?"])
+
+    def test_stream_is_lazy(self):
+        def lines():
+            yield "*** START OF THE PROJECT GUTENBERG EBOOK TEST ***\n"
+            yield "first words\n"
+            raise AssertionError("read too far")
+
+        tokens = CleanService.stream(lines())
+        self.assertEqual([next(tokens), next(tokens)], ["first", "words"])
+
+    def test_limit_vocabulary(self):
+        words, replaced = CleanService.limit_vocabulary(
+            ["a", "b", "a", "c", "d", "a", "b"], 3)
+        self.assertEqual(words, ["a", "b", "a", "<unk>", "<unk>", "a", "b"])
+        self.assertEqual(replaced, 2)
+
+    def test_limit_vocabulary_within_limit(self):
+        words = ["a", "b", "a"]
+        self.assertEqual(CleanService.limit_vocabulary(words, 2), (words, 0))
+
+    def test_max_vocabulary(self):
+        read_service = ReadService()
+        read_service.text = "Alice in Wonderland"
+        clean_service = CleanService(read_service.text, 100)
+        self.assertEqual(len(clean_service.vocabulary), 100)
+        self.assertIn("<unk>", clean_service.vocabulary)
+        self.assertEqual(clean_service.clean_text.count("<unk>"), clean_service.unknown_count)
@@ -1,6 +1,7 @@
+import io
 import unittest
 from services import ReadService, CleanService, MarkovModel, GenerateService
-from entities import TrieNode
+from entities import Trie, Vocabulary
 
 
 class TestGenerateService(unittest.TestCase):
@@ -9,24 +10,70 @@ class TestGenerateService(unittest.TestCase):
         read_service.text = "Alice in Wonderland"
         clean_service = CleanService(read_service.text)
         markov_model = MarkovModel(clean_service.clean_text, 2)
+        self.markov_model = markov_model
         starting_word = markov_model.form_the_starting_sequence([])
         self.generate_service = GenerateService(
-            starting_word, markov_model.model, 2)
+            starting_word, markov_model.model, 2,
+            vocabulary=markov_model.vocabulary)
 
     def test_object_exists(self):
         self.assertIsNotNone(self.generate_service)
 
-    def test_calculate_probability(self):
-        a = TrieNode()
-        b = TrieNode()
-        a.frequency = 3
-        b.frequency = 2
-        probability = self.generate_service._GenerateService__calculate_probability(
-            {"a": a, "b": b})
-        self.assertEqual(probability, {"a": 0.6, "b": 0.4})
+    def test_generation_stops_at_dead_end(self):
+        trie = Trie()
+        trie.insert((0, 1))
+        generate_service = GenerateService(["a"], trie, 1, 10, Vocabulary(["a", "b"]),
+                                           backoff=False)
+        self.assertEqual(generate_service.generated_text.split(), ["a", "b"])
+
+    def test_generation_continues_past_end_of_text(self):
+        markov_model = MarkovModel(["a", "b", "c", "a", "b", "d"], 2)
+        for _ in range(10):
+            generate_service = GenerateService(["a", "b"], markov_model, 2, 20,
+                                               markov_model.vocabulary)
+            self.assertEqual(len(generate_service.generated_text.split()), 20)
+
+    def test_generation_backs_off_at_dead_end(self):
+        trie = Trie()
+        trie.insert((0, 1))
+        trie.insert((1,))
+        generate_service = GenerateService(["a"], trie, 1, 4, Vocabulary(["a", "b"]))
+        self.assertEqual(len(generate_service.generated_text.split()), 4)
 
     def test_generated_text(self):
         self.assertEqual(len(self.generate_service.generated_text.split()), 10)
 
     def test_generated_text_type(self):
         self.assertEqual(type(self.generate_service.generated_text), str)
+
+    def test_generated_text_is_words(self):
+        self.assertTrue(all(word.isascii() and not word.isdigit()
+                            for word in self.generate_service.generated_text.split()))
+
+    def test_iter_words(self):
+        markov_model = MarkovModel(["a", "b", "c", "a", "b", "c"], 1)
+        generate_service = GenerateService(
+            ["a"], markov_model.model, 1, 7, markov_model.vocabulary, lazy=True)
+        self.assertEqual(generate_service.generated_text, "")
+        self.assertEqual(list(generate_service.iter_words()),
+                         ["a", "b", "c", "a", "b", "c", "a"])
+
+    def test_iter_words_is_lazy(self):
+        generate_service = GenerateService(
+            [], self.markov_model.model, 2, 10 ** 9,
+            self.markov_model.vocabulary, lazy=True)
+        words = generate_service.iter_words()
+        self.assertEqual(len([next(words) for _ in range(1000)]), 1000)
+
+    def test_iter_chunks(self):
+        generate_service = GenerateService(
+            [], self.markov_model.model, 2, 25, self.markov_model.vocabulary, lazy=True)
+        chunks = list(generate_service.iter_chunks(10))
+        self.assertEqual([len(chunk.split()) for chunk in chunks], [10, 10, 5])
+
+    def test_write(self):
+        generate_service = GenerateService(
+            [], self.markov_model.model, 2, 25, self.markov_model.vocabulary, lazy=True)
+        stream = io.StringIO()
+        generate_service.write(stream, 10)
+        self.assertEqual(len(stream.getvalue().split(" ")), 25)
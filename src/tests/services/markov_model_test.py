@@ -1,5 +1,8 @@
+import os
+import tempfile
 import unittest
-from services import ReadService, CleanService, MarkovModel
+from entities import ModelBackend
+from services import ReadService, CleanService, MarkovModel, GenerateService
 
 
 class TestMarkovModel(unittest.TestCase):
@@ -12,9 +15,139 @@ class TestMarkovModel(unittest.TestCase):
     def test_object_exists(self):
         self.assertIsNotNone(self.markov_model)
 
+    def test_implements_protocol(self):
+        self.assertIsInstance(self.markov_model, ModelBackend)
+
     def test_get_degree(self):
         self.assertEqual(self.markov_model.degree, 2)
 
+    def test_stats(self):
+        stats = self.markov_model.stats()
+        self.assertEqual(stats["vocabulary_size"], len(self.markov_model.vocabulary))
+        self.assertEqual(len(stats["depths"]), 4)
+        self.assertEqual(stats["depths"][0]["edges"], stats["vocabulary_size"])
+        self.assertEqual(stats["bytes"], stats["model_bytes"] + stats["vocabulary_bytes"])
+        self.assertFalse(stats["frozen"])
+
+    def test_stats_frozen(self):
+        stats = self.markov_model.stats()
+        self.markov_model.freeze()
+        frozen_stats = self.markov_model.stats()
+        self.assertTrue(frozen_stats["frozen"])
+        self.assertEqual(frozen_stats["nodes"], stats["nodes"])
+        self.assertLess(frozen_stats["model_bytes"], stats["model_bytes"])
+
+    def test_build_vectorized_matches_sequential(self):
+        markov_model = MarkovModel.build_vectorized(self.clean_service.clean_text, 2, 3)
+        sequential = MarkovModel(self.clean_service.clean_text, 2, max_degree=3)
+        sequential.freeze()
+        self.assertEqual(markov_model.model.frequencies, sequential.model.frequencies)
+        self.assertEqual(markov_model.model.tokens, sequential.model.tokens)
+        self.assertEqual(markov_model.max_degree, 3)
+
+    def test_build_vectorized_update(self):
+        markov_model = MarkovModel.build_vectorized(["a", "b", "c"], 2)
+        markov_model.update(["a", "b", "d"])
+        expected = MarkovModel(["a", "b", "c", "a", "b", "d"], 2)
+        token_ids = markov_model.vocabulary.lookup(["a", "b"])
+        self.assertEqual(
+            {token: child.frequency
+             for token, child in markov_model.get_children(token_ids).items()},
+            {token: child.frequency
+             for token, child in expected.get_children(token_ids).items()})
+
+    def test_suffix_array_matches_trie(self):
+        markov_model = MarkovModel(self.clean_service.clean_text, 2, backend="suffix_array")
+        self.assertEqual(markov_model.backend, "suffix_array")
+        for sequence in (["alice", "was"], ["the", "queen"], ["said"]):
+            token_ids = self.markov_model.vocabulary.lookup(sequence)
+            self.assertEqual(
+                {token: child.frequency
+                 for token, child in markov_model.get_children(token_ids).items()},
+                {token: child.frequency
+                 for token, child in self.markov_model.get_children(token_ids).items()})
+
+    def test_suffix_array_any_degree(self):
+        markov_model = MarkovModel(self.clean_service.clean_text, 2, backend="suffix_array")
+        markov_model.degree = 12
+        generate_service = GenerateService(
+            markov_model.form_the_starting_sequence([]), markov_model, 12, 30,
+            markov_model.vocabulary)
+        self.assertGreaterEqual(len(generate_service.generated_text.split()), 12)
+        self.assertLessEqual(len(generate_service.generated_text.split()), 30)
+
+    def test_suffix_array_update(self):
+        markov_model = MarkovModel(["a", "b", "c"], 1, backend="suffix_array")
+        markov_model.update(["a", "b", "d"])
+        children = markov_model.get_children(markov_model.vocabulary.lookup(["a", "b"]))
+        self.assertEqual(len(children), 2)
+        self.assertEqual(markov_model.max_degree, 6)
+
+    def test_suffix_array_cannot_be_saved(self):
+        markov_model = MarkovModel(["a", "b", "c"], 1, backend="suffix_array")
+        markov_model.freeze()
+        with self.assertRaises(ValueError):
+            markov_model.save(os.path.join(tempfile.gettempdir(), "model.bin"))
+
+    def test_hashed_matches_trie(self):
+        markov_model = MarkovModel(self.clean_service.clean_text, 2, backend="hashed")
+        self.assertEqual(markov_model.backend, "hashed")
+        for sequence in (["alice", "was"], ["the", "queen"], ["said"], []):
+            token_ids = self.markov_model.vocabulary.lookup(sequence)
+            self.assertEqual(markov_model.next_tokens(token_ids),
+                             self.markov_model.next_tokens(token_ids))
+
+    def test_hashed_update(self):
+        markov_model = MarkovModel(["a", "b", "c"], 1, backend="hashed")
+        markov_model.update(["a", "b", "d"])
+        self.assertEqual(markov_model.backend, "hashed")
+        tokens, counts = markov_model.next_tokens(markov_model.vocabulary.lookup(["b"]))
+        self.assertEqual(markov_model.vocabulary.decode(tokens), ["c", "d"])
+        self.assertEqual(counts, [1, 1])
+
+    def test_hashed_save_and_load(self):
+        markov_model = MarkovModel(self.clean_service.clean_text, 2, backend="hashed")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model.bin")
+            markov_model.save(path)
+            loaded = MarkovModel.load(path)
+            token_ids = markov_model.vocabulary.lookup(["alice", "was"])
+            self.assertEqual(loaded.next_tokens(token_ids), markov_model.next_tokens(token_ids))
+
+    def test_use_backend(self):
+        token_ids = self.markov_model.vocabulary.lookup(["the", "queen"])
+        expected = self.markov_model.next_tokens(token_ids)
+        self.markov_model.use_backend("hashed")
+        self.assertEqual(self.markov_model.backend, "hashed")
+        self.assertEqual(self.markov_model.next_tokens(token_ids), expected)
+        self.markov_model.use_backend("trie")
+        self.assertTrue(self.markov_model.stats()["frozen"])
+        self.assertEqual(self.markov_model.next_tokens(token_ids), expected)
+        with self.assertRaises(ValueError):
+            self.markov_model.use_backend("suffix_array")
+
+    def test_minimize(self):
+        token_ids = self.markov_model.vocabulary.lookup(["the", "queen"])
+        expected = self.markov_model.next_tokens(token_ids)
+        nodes = self.markov_model.stats()["nodes"]
+        removed = self.markov_model.minimize()
+        self.assertEqual(self.markov_model.stats()["nodes"], nodes - removed)
+        self.assertEqual(self.markov_model.next_tokens(token_ids), expected)
+        self.assertEqual(self.markov_model.minimize(), 0)
+
+    def test_minimized_update(self):
+        markov_model = MarkovModel(["a", "b", "c", "a", "b", "c"], 1)
+        markov_model.minimize()
+        markov_model.update(["a", "b", "d"])
+        expected = MarkovModel(["a", "b", "c", "a", "b", "c", "a", "b", "d"], 1)
+        token_ids = markov_model.vocabulary.lookup(["b"])
+        self.assertEqual(markov_model.next_tokens(token_ids), expected.next_tokens(token_ids))
+        self.assertFalse(markov_model.model.minimized)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            MarkovModel(["a", "b"], 1, backend="nope")
+
     def test_form_the_starting_sequence(self):
         self.assertEqual(
             len(self.markov_model.form_the_starting_sequence([])), 2)
@@ -26,3 +159,292 @@ class TestMarkovModel(unittest.TestCase):
     def test_get_random_starting_word_type(self):
         self.assertEqual(
             type(self.markov_model.form_the_starting_sequence([])), list)
+
+    def test_vocabulary(self):
+        self.assertEqual(len(self.markov_model.vocabulary),
+                         len(set(self.clean_service.clean_text)))
+
+    def test_model_is_keyed_by_token_ids(self):
+        self.assertTrue(all(type(token) == int
+                            for token in self.markov_model.model.get_children([])))
+
+    def test_model_from_token_ids(self):
+        markov_model = MarkovModel(
+            self.clean_service.token_ids, 2, self.clean_service.vocabulary)
+        self.assertEqual(len(markov_model.form_the_starting_sequence([])), 2)
+
+    def test_freeze(self):
+        context = self.markov_model.vocabulary.lookup(["the"])
+        children = self.markov_model.model.get_children(context)
+        self.markov_model.freeze()
+        frozen_children = self.markov_model.model.get_children(context)
+        self.assertEqual(
+            {word: node.frequency for word, node in frozen_children.items()},
+            {word: node.frequency for word, node in children.items()})
+
+    def test_form_the_starting_sequence_frozen(self):
+        self.markov_model.freeze()
+        self.assertEqual(
+            len(self.markov_model.form_the_starting_sequence([])), 2)
+
+    def test_max_degree_defaults_to_degree(self):
+        self.assertEqual(self.markov_model.max_degree, 2)
+
+    def test_lower_degree_matches_retrained_model(self):
+        markov_model = MarkovModel(
+            self.clean_service.clean_text, 1, max_degree=3)
+        vocabulary = markov_model.vocabulary
+        context = vocabulary.lookup(["the", "white"])
+        expected = {vocabulary.token_of(token): node.frequency
+                    for token, node in self.markov_model.model.get_children(
+                        self.markov_model.vocabulary.lookup(["the", "white"])).items()}
+        children = {vocabulary.token_of(token): node.frequency
+                    for token, node in markov_model.model.get_children(context).items()}
+        self.assertEqual(children, expected)
+
+    def test_change_degree(self):
+        markov_model = MarkovModel(
+            self.clean_service.clean_text, 1, max_degree=3)
+        markov_model.degree = 3
+        self.assertEqual(
+            len(markov_model.form_the_starting_sequence([])), 3)
+
+    def test_change_degree_above_max_degree(self):
+        with self.assertRaises(ValueError):
+            self.markov_model.degree = 3
+
+    def test_from_lines(self):
+        markov_model = MarkovModel.from_lines(
+            ReadService().lines("Alice in Wonderland"), 2)
+        self.assertEqual(len(markov_model.vocabulary),
+                         len(self.markov_model.vocabulary))
+        self.assertEqual(markov_model.model.root.children.keys(),
+                         self.markov_model.model.root.children.keys())
+
+    def test_from_lines_pruned(self):
+        markov_model = MarkovModel.from_lines(
+            ReadService().lines("Alice in Wonderland"), 2, min_count=2, max_children=10,
+            max_vocabulary=500)
+        self.assertEqual(len(markov_model.vocabulary), 500)
+        self.assertGreater(markov_model.pruned["unknown_tokens"], 0)
+        self.assertGreater(markov_model.pruned["min_count"], 0)
+        self.assertGreater(markov_model.pruned["max_children"], 0)
+        self.assertEqual(markov_model.stats()["pruned"], markov_model.pruned)
+        self.assertLess(markov_model.stats()["nodes"], self.markov_model.stats()["nodes"])
+        token_ids = markov_model.vocabulary.lookup(["the"])
+        self.assertLessEqual(len(markov_model.next_tokens(token_ids)[0]), 10)
+
+    def test_prune_backends_agree(self):
+        hashed = MarkovModel(self.clean_service.clean_text, 2, backend="hashed")
+        removed = self.markov_model.prune(3, 5)
+        self.assertEqual(hashed.prune(3, 5), removed)
+        token_ids = self.markov_model.vocabulary.lookup(["the", "queen"])
+        self.assertEqual(hashed.next_tokens(token_ids), self.markov_model.next_tokens(token_ids))
+
+    def test_pruned_starting_sequence(self):
+        self.markov_model.prune(min_count=5)
+        for _ in range(20):
+            self.assertEqual(len(self.markov_model.form_the_starting_sequence([])), 2)
+
+    def test_prune_keeps_first_words(self):
+        words = len(self.markov_model.next_tokens([])[0])
+        self.markov_model.prune(min_count=5, max_children=2)
+        self.assertEqual(len(self.markov_model.next_tokens([])[0]), words)
+
+    def test_unknown_token_is_not_generated(self):
+        markov_model = MarkovModel.from_lines(
+            ReadService().lines("Alice in Wonderland"), 2, max_vocabulary=50)
+        markov_model.freeze()
+        unknown = markov_model.vocabulary.id_of("<unk>")
+        self.assertIn(unknown, markov_model.next_tokens([])[0])
+        self.assertNotIn(unknown, markov_model.get_sampling_table([]).tokens)
+        for _ in range(10):
+            start = markov_model.form_the_starting_sequence([])
+            self.assertEqual(len(start), 2)
+            self.assertNotIn("<unk>", start)
+            generate_service = GenerateService(start, markov_model, 2, 50,
+                                               markov_model.vocabulary, backoff=True)
+            self.assertNotIn("<unk>", generate_service.generated_text.split())
+
+    def test_suffix_array_cannot_be_pruned(self):
+        markov_model = MarkovModel(["a", "b", "c"], 1, backend="suffix_array")
+        with self.assertRaises(ValueError):
+            markov_model.prune(2)
+
+    def test_includes_final_sequence(self):
+        markov_model = MarkovModel(["a", "b", "c", "a", "b", "d"], 2)
+        context = markov_model.vocabulary.lookup(["a", "b"])
+        children = markov_model.vocabulary.decode(
+            markov_model.model.get_children(context).keys())
+        self.assertEqual(sorted(children), ["c", "d"])
+
+    def test_short_text(self):
+        markov_model = MarkovModel(["a", "b"], 3)
+        self.assertEqual(markov_model.model.get_children([])[0].frequency, 1)
+        self.assertEqual(markov_model.model.get_children([0])[1].frequency, 1)
+
+    def test_degree_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            MarkovModel(["a", "b"], 0)
+        with self.assertRaises(ValueError):
+            MarkovModel.build_vectorized(["a", "b"], 0)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "alice.model")
+            self.markov_model.save(path)
+            markov_model = MarkovModel.load(path)
+            self.assertEqual(markov_model.degree, 2)
+            self.assertEqual(markov_model.max_degree, 2)
+            self.assertEqual(markov_model.vocabulary.tokens,
+                             self.markov_model.vocabulary.tokens)
+            context = markov_model.vocabulary.lookup(["the", "white"])
+            self.assertEqual(
+                {token: node.frequency
+                 for token, node in markov_model.model.get_children(context).items()},
+                {token: node.frequency
+                 for token, node in self.markov_model.model.get_children(context).items()})
+            self.assertEqual(
+                len(markov_model.form_the_starting_sequence([])), 2)
+
+    def test_save_and_load_source_hash(self):
+        read_service = ReadService()
+        path = read_service.file_path("Alice in Wonderland")
+        markov_model = MarkovModel.from_file(path, 1)
+        self.assertEqual(markov_model.source_hash, ReadService.hash_file(path))
+        with tempfile.TemporaryDirectory() as directory:
+            model_path = os.path.join(directory, "alice.model")
+            markov_model.save(model_path)
+            self.assertEqual(MarkovModel.load(model_path).source_hash,
+                             markov_model.source_hash)
+
+    def test_save_loaded_model_over_its_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "alice.model")
+            self.markov_model.save(path)
+            markov_model = MarkovModel.load(path)
+            markov_model.save(path)
+            loaded = MarkovModel.load(path)
+            self.assertEqual(list(loaded.model.frequencies),
+                             list(markov_model.model.frequencies))
+            self.assertEqual(os.listdir(directory), ["alice.model"])
+
+    def test_load_invalid_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "invalid.model")
+            with open(path, "wb") as file:
+                file.write(bytes(100))
+            with self.assertRaises(ValueError):
+                MarkovModel.load(path)
+
+    def test_build_parallel(self):
+        expected = MarkovModel(self.clean_service.clean_text, 1, max_degree=3)
+        expected.freeze()
+        for workers in (1, 3):
+            markov_model = MarkovModel.build_parallel(
+                self.clean_service.clean_text, 1, max_degree=3, workers=workers)
+            self.assertEqual(markov_model.vocabulary.tokens,
+                             expected.vocabulary.tokens)
+            self.assertEqual(list(markov_model.model.frequencies),
+                             list(expected.model.frequencies))
+            self.assertEqual(list(markov_model.model.tokens),
+                             list(expected.model.tokens))
+
+    def test_build_parallel_encoded_text(self):
+        vocabulary = self.markov_model.vocabulary
+        token_ids = vocabulary.lookup(self.clean_service.clean_text)
+        markov_model = MarkovModel.build_parallel(token_ids, 2, vocabulary=vocabulary, workers=3)
+        self.markov_model.freeze()
+        self.assertEqual(list(markov_model.model.frequencies),
+                         list(self.markov_model.model.frequencies))
+
+    def test_build_parallel_empty_text(self):
+        markov_model = MarkovModel.build_parallel([], 2, workers=2)
+        self.assertEqual(markov_model.model.node_count, 1)
+        self.assertEqual(len(markov_model.vocabulary), 0)
+        self.assertEqual(markov_model.form_the_starting_sequence([]), [])
+
+    def test_build_parallel_short_text(self):
+        markov_model = MarkovModel.build_parallel(["a", "b", "c"], 3, workers=4)
+        self.assertEqual(markov_model.model.get_children([0, 1])[2].frequency, 1)
+        self.assertEqual(markov_model.model.get_children([])[2].frequency, 1)
+
+    def test_update_matches_full_build(self):
+        text = self.clean_service.clean_text[:2000]
+        expected = MarkovModel(text, 3)
+        expected.freeze()
+        for split in (0, 1, 2, 1000, 1999, 2000):
+            markov_model = MarkovModel(text[:split], 3)
+            markov_model.update(text[split:])
+            markov_model.freeze()
+            self.assertEqual(markov_model.vocabulary.tokens,
+                             expected.vocabulary.tokens)
+            self.assertEqual(list(markov_model.model.frequencies),
+                             list(expected.model.frequencies))
+
+    def test_update_in_pieces(self):
+        expected = MarkovModel(["a", "b", "c", "d", "a", "b"], 2)
+        markov_model = MarkovModel(["a"], 2)
+        for token in ["b", "c", "d", "a", "b"]:
+            markov_model.update([token])
+        expected.freeze()
+        markov_model.freeze()
+        self.assertEqual(list(markov_model.model.frequencies),
+                         list(expected.model.frequencies))
+
+    def test_update_frozen_model(self):
+        self.markov_model.freeze()
+        self.markov_model.update(["the", "zebra"])
+        context = self.markov_model.vocabulary.lookup(["the"])
+        self.assertIn(self.markov_model.vocabulary.id_of("zebra"),
+                      self.markov_model.model.get_children(context))
+
+    def test_update_loaded_model(self):
+        text = self.clean_service.clean_text[:500]
+        expected = MarkovModel(text, 2)
+        expected.freeze()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "alice.model")
+            MarkovModel(text[:300], 2).save(path)
+            markov_model = MarkovModel.load(path)
+            markov_model.update(text[300:])
+        markov_model.freeze()
+        self.assertEqual(list(markov_model.model.frequencies),
+                         list(expected.model.frequencies))
+
+    def test_update_from_file(self):
+        markov_model = MarkovModel([], 2)
+        markov_model.update_from_file(
+            ReadService().file_path("Alice in Wonderland"))
+        self.assertEqual(len(markov_model.vocabulary),
+                         len(self.markov_model.vocabulary))
+
+    def test_cache_disabled_by_default(self):
+        self.assertEqual(self.markov_model.cache_size, 0)
+        self.assertEqual(self.markov_model.context_cache, None)
+
+    def test_cached_lookups(self):
+        self.markov_model.cache_size = 2
+        context = self.markov_model.vocabulary.lookup(["the", "white"])
+        table = self.markov_model.get_sampling_table(context)
+        self.assertIs(self.markov_model.get_sampling_table(context), table)
+        self.assertEqual(self.markov_model.get_children(context).keys(),
+                         self.markov_model.model.get_children(context).keys())
+        self.assertEqual(self.markov_model.context_cache.hits, 2)
+        self.assertEqual(self.markov_model.context_cache.misses, 1)
+
+    def test_cache_is_cleared_on_update(self):
+        self.markov_model.cache_size = 16
+        context = self.markov_model.vocabulary.lookup(["the", "white"])
+        self.markov_model.get_sampling_table(context)
+        self.markov_model.update(["the", "white", "zebra"])
+        table = self.markov_model.get_sampling_table(context)
+        self.assertIn(self.markov_model.vocabulary.id_of("zebra"), table.tokens)
+
+    def test_generate_with_cached_model(self):
+        self.markov_model.cache_size = 64
+        self.markov_model.freeze()
+        generate_service = GenerateService(
+            [], self.markov_model, 2, 50, self.markov_model.vocabulary)
+        self.assertEqual(len(generate_service.generated_text.split()), 50)
+        self.assertGreater(self.markov_model.context_cache.misses, 0)
@@ -0,0 +1,51 @@
+import tempfile
+import unittest
+from services import CacheService, ModelPoolService
+from services.model_pool_service import generate_texts, RESIDENT
+
+
+class TestModelPoolService(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_service = CacheService(self.directory.name)
+        self.model_pool = ModelPoolService(self.cache_service, max_degree=3)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_model_is_resident(self):
+        markov_model = self.model_pool.get_model("Alice in Wonderland")
+        self.assertIs(self.model_pool.get_model("Alice in Wonderland"), markov_model)
+        self.assertEqual(markov_model.max_degree, 3)
+        self.assertEqual(self.cache_service.misses, 1)
+
+    def test_one_model_per_story(self):
+        first = self.model_pool.model_path("Alice in Wonderland", 1)
+        second = self.model_pool.model_path("Alice in Wonderland", 3)
+        self.assertEqual(first, second)
+        self.assertEqual(list(self.model_pool.models), ["Alice in Wonderland"])
+
+    def test_unknown_story(self):
+        with self.assertRaises(ValueError):
+            self.model_pool.get_model("Nope")
+
+    def test_degree_out_of_range(self):
+        with self.assertRaises(ValueError):
+            self.model_pool.model_path("Alice in Wonderland", 4)
+
+    def test_generate_texts(self):
+        model_path = self.model_pool.model_path("Alice in Wonderland", 2)
+        texts = generate_texts(model_path, 2, 3, 8, [["alice", "was"], [], []])
+        self.assertEqual(len(texts), 3)
+        self.assertTrue(texts[0].startswith("alice was"))
+        self.assertTrue(all(len(text.split()) <= 8 for text in texts))
+
+    def test_one_resident_service_per_model(self):
+        model_path = self.model_pool.model_path("Alice in Wonderland", 1)
+        RESIDENT.pop(model_path, None)
+        generate_texts(model_path, 1, 2, 5, [])
+        batch_generate_service = RESIDENT[model_path]
+        texts = generate_texts(model_path, 3, 2, 5, [])
+        self.assertIs(RESIDENT[model_path], batch_generate_service)
+        self.assertTrue(all(len(text.split()) == 5 for text in texts))
+        RESIDENT.pop(model_path)
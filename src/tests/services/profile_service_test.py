@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from entities import Trie
+from services import ReadService, CleanService, MarkovModel, GenerateService, ProfileService, \
+    CacheService
+
+
+class TestProfileService(unittest.TestCase):
+    def setUp(self):
+        self.profile_service = ProfileService()
+
+    def tearDown(self):
+        self.profile_service.stop()
+
+    def run_pipeline(self):
+        read_service = ReadService()
+        read_service.text = "Alice in Wonderland"
+        clean_service = CleanService(read_service.text)
+        markov_model = MarkovModel(clean_service.token_ids, 2, clean_service.vocabulary)
+        return GenerateService(["alice", "was"], markov_model, 2, 50, markov_model.vocabulary)
+
+    def test_restores_methods(self):
+        insert = Trie.__dict__["insert"]
+        text = ReadService.__dict__["text"]
+        with self.profile_service:
+            self.assertIsNot(Trie.__dict__["insert"], insert)
+            self.assertTrue(self.profile_service.running)
+        self.assertIs(Trie.__dict__["insert"], insert)
+        self.assertIs(ReadService.__dict__["text"], text)
+        self.assertIsInstance(CleanService.__dict__["stream"], staticmethod)
+        self.assertFalse(self.profile_service.running)
+
+    def test_stages(self):
+        with self.profile_service:
+            self.run_pipeline()
+        stages = self.profile_service.stages
+        self.assertEqual(stages["read"]["calls"], 1)
+        self.assertEqual(stages["clean"]["tokens"], stages["build"]["tokens"])
+        self.assertEqual(stages["generate"]["tokens"], 50)
+        self.assertGreater(self.profile_service.tokens_per_second("build"), 0)
+        self.assertIsNone(self.profile_service.tokens_per_second("read"))
+
+    def test_counts(self):
+        with self.profile_service:
+            generate_service = self.run_pipeline()
+        counts = self.profile_service.counts
+        self.assertEqual(counts["Trie.insert"], self.profile_service.stages["build"]["tokens"])
+        self.assertEqual(counts["MarkovModel.get_sampling_table"], 48)
+        self.assertEqual(len(generate_service.generated_text.split()), 50)
+
+    def test_cached_build(self):
+        path = ReadService().file_path("Alice in Wonderland")
+        stages = self.profile_service.stages
+        with tempfile.TemporaryDirectory() as directory, self.profile_service:
+            cache_service = CacheService(directory)
+            cache_service.get_model(path, 2)
+            loads = stages["load"]["calls"]
+            cache_service.get_model(path, 2)
+        self.assertEqual(stages["build"]["calls"], 1)
+        self.assertEqual(stages["load"]["calls"], loads + 1)
+        self.assertGreater(stages["clean"]["tokens"], 0)
+        self.assertIn("build", self.profile_service.report())
+        self.assertIsInstance(MarkovModel.__dict__["build_vectorized"], classmethod)
+
+    def test_file_build(self):
+        path = ReadService().file_path("Alice in Wonderland")
+        with self.profile_service:
+            MarkovModel.from_file(path, 2, vectorized=True)
+            MarkovModel.from_file(path, 2, backend="suffix_array")
+        stages = self.profile_service.stages
+        self.assertEqual(stages["read"]["calls"], 2)
+        self.assertEqual(stages["build"]["calls"], 2)
+        self.assertGreater(stages["build"]["tokens"], 0)
+        self.assertEqual(stages["build"]["tokens"], stages["clean"]["tokens"])
+        self.assertIsInstance(ReadService.__dict__["read_lines"], staticmethod)
+
+    def test_no_counts_after_stop(self):
+        with self.profile_service:
+            pass
+        self.run_pipeline()
+        self.assertEqual(self.profile_service.counts["Trie.insert"], 0)
+
+    def test_report(self):
+        with self.profile_service:
+            self.run_pipeline()
+        report = self.profile_service.report()
+        self.assertIn("generate", report)
+        self.assertIn("Trie.insert", report)
+
+    def test_dump(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.pstats")
+            with ProfileService(path):
+                self.run_pipeline()
+            self.assertTrue(os.path.getsize(path))
+
+    def test_from_environment_off(self):
+        with mock.patch.dict(os.environ, {"TEXT_GENERATOR_PROFILE": "0"}):
+            self.assertIsNone(ProfileService.from_environment())
+
+    def test_from_environment(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.pstats")
+            with mock.patch.dict(os.environ, {"TEXT_GENERATOR_PROFILE": path}), \
+                    mock.patch("atexit.register") as register:
+                self.profile_service = ProfileService.from_environment()
+            register.assert_called_once_with(self.profile_service.print_report)
+            self.assertTrue(self.profile_service.running)
+            self.assertEqual(self.profile_service.dump_path, path)
+            self.profile_service.stop()
+            self.assertTrue(os.path.exists(path))
@@ -27,3 +27,12 @@ class TestReadService(unittest.TestCase):
     def test_text_invalid_type(self):
         with self.assertRaises(Exception) as context:
             self.text_service.text = 1
+
+    def test_lines(self):
+        lines = self.text_service.lines("Alice in Wonderland")
+        self.assertEqual(self.text_service.title, "Alice in Wonderland")
+        self.assertEqual(sum(1 for _ in lines), 3759)
+
+    def test_lines_invalid(self):
+        with self.assertRaises(KeyError):
+            self.text_service.lines("Invalid")
@@ -12,11 +12,11 @@ class InputFrame:
     to create the sequence and passed on to the handle_generate_text function.
 
     The input field uses the AutocompleteCombobox from the ttkwidgets package and 
-    the autocomplete values are updated every time the user types a space. The
+    the autocomplete values are updated every time the user types. The
     autocomplete values are retrieved from the handle_retrieve_children function which
-    in turn calls the retrieve_children function from the MarkovChain class. The
-    children retrieved from the MarkovChain class are all the possible words that 
-    follow the current sequence.
+    in turn calls the retrieve_children function from the MainView. The
+    values are the most frequent words that follow the current sequence
+    and start with the partially typed word.
 
     Attributes:
         root (object): The root window
@@ -63,7 +63,9 @@ class InputFrame:
     def __callback(self, *args) -> None:
         """Callback function for the entry field.
 
-        Updates the autocomplete values every time the user types a space.
+        Updates the autocomplete values every time the user types.
+        The last word is treated as partially typed unless
+        the content ends with a space.
 
         Args:
             *args: The arguments
@@ -72,10 +74,13 @@ class InputFrame:
         content = self.__current_sequence.get()
         if not content:
             self.__complete_values = self.__handle_retrieve_children()
-        elif content.endswith(" "):
-            sequence = list(filter(None, content.split()))
-            self.__complete_values = self.__handle_retrieve_children(sequence)
-            self.__entry.configure(completevalues=self.__complete_values)
+            return
+        sequence = content.split()
+        partial = ""
+        if not content.endswith(" "):
+            partial = sequence.pop()
+        self.__complete_values = self.__handle_retrieve_children(sequence, partial)
+        self.__entry.configure(completevalues=self.__complete_values)
 
     def __handle_generate_event(self, event=None) -> None:
         """Handles the generate event.
@@ -5,23 +5,30 @@ class LoadingFrame:
     """Frame for the loading screen.
 
     The loading screen is shown every time the user changes the underlying model.
+    When the progress is known, the progressbar fills up as the model is built.
 
     Attributes:
         root (object): The root window
         frame (object): The frame
+        determinate (bool): Whether the progress is known
         configure (func): Configures the frame
         run (func): Runs the frame
     """
 
-    def __init__(self, root) -> None:
+    def __init__(self, root, determinate: bool = False) -> None:
         """Initializes the frame.
 
         Args:
             root (object): The root window
+            determinate (bool, optional): Whether the progress is known.
+                Defaults to False.
         """
 
         self.root = root
         self.__frame = ttk.Frame(self.root)
+        self.__determinate = determinate
+        self.__label = None
+        self.__progressbar = None
         self.__configure()
         self.__run()
 
@@ -30,6 +37,19 @@ class LoadingFrame:
 
         self.__frame.pack(fill=constants.X)
 
+    def set_progress(self, done: int, total: int) -> None:
+        """Shows the progress of the build.
+
+        Args:
+            done (int): The number of tokens processed
+            total (int): The number of tokens in the text
+        """
+
+        if total:
+            percentage = min(100 * done // total, 100)
+            self.__progressbar["value"] = percentage
+            self.__label["text"] = f"Building the model... {percentage} %"
+
     def destroy(self) -> None:
         """Destroy the frame."""
 
@@ -44,11 +64,14 @@ class LoadingFrame:
     def __run(self) -> None:
         """Creates the progressbar."""
 
-        pl = ttk.Label(
+        self.__label = ttk.Label(
             self.__frame, text="Loading...", font=("Helvetica", 16))
-        pb = ttk.Progressbar(
-            self.__frame, orient=constants.HORIZONTAL, mode='indeterminate', length=400)
-        pl.grid(row=0, column=0, columnspan=7, sticky=constants.NSEW)
-        pb.grid(row=1, column=0, columnspan=7,
-                sticky=constants.EW, padx=10, pady=10)
-        pb.start(10)
+        self.__progressbar = ttk.Progressbar(
+            self.__frame, orient=constants.HORIZONTAL,
+            mode='determinate' if self.__determinate else 'indeterminate',
+            length=400, maximum=100)
+        self.__label.grid(row=0, column=0, columnspan=7, sticky=constants.NSEW)
+        self.__progressbar.grid(row=1, column=0, columnspan=7,
+                                sticky=constants.EW, padx=10, pady=10)
+        if not self.__determinate:
+            self.__progressbar.start(10)
@@ -5,11 +5,12 @@ class ValueFrame:
     """Frame for selecting the degree of the model
     and the limit of the generated text.
 
-    On degree change, the model is retrained.
+    On degree change, the model is queried at the new degree.
     On limit change, the limit of the generated text is changed.
 
-    The Degree change initiates the model change immediately, 
-    which can take a while depending on the size of the corpus and the degree.
+    The Degree change takes effect immediately. Only a degree higher than
+    the one the model was built at retrains the model, which can take a while
+    depending on the size of the corpus and the degree.
     Limit change only affects the next generated text.
 
     Attributes:
@@ -1,6 +1,6 @@
 from threading import Thread
 from tkinter import messagebox
-from services import ReadService, CleanService, MarkovModel, GenerateService
+from services import ReadService, CacheService, BuildService, GenerateService, AutocompleteService
 from ..frames import InputFrame, SelectFrame, ValueFrame, TextFrame, LoadingFrame
 
 
@@ -9,20 +9,29 @@ class MainView:
 
     Handles the user input and updates the view.
 
-    On events that change the model, the view will show a loading screen
-    while a new model is created on a separate thread. The view will
-    monitor the thread and update the frames when the thread is finished.
-    Updated values will be passed on to the new frames.
+    On events that change the model, a cached model is loaded right away.
+    Otherwise the view shows the progress of the build while the model is
+    built in a separate process, keeping the select frame available so that
+    choosing another story supersedes the build in flight. The text is
+    generated on a separate thread behind a loading screen. Updated values
+    will be passed on to the new frames.
 
     Attributes:
         root (object): The root window, Tk() instance.
         markov_model (MarkovModel): The markov model instance.
         read_service (ReadService): The read service instance.
+        cache_service (CacheService): The cache of the trained models.
+        build_service (BuildService): Builds the models in a separate process.
+        autocomplete_service (AutocompleteService): The completions of the current model.
+        completions (int): The number of autocomplete values shown.
+        cache_size (int): The size of the state cache of the model.
         available_stories (dict): The list of available stories.
         frames (dict): The dictionary of frames.
         data (str): The generated text.
         degree (int): The degree of the markov model.
+        max_degree (int): The lowest degree the models are built at.
         limit (int): The limit of the generated text.
+        build (int): The number of the latest model change, to stop superseded monitors.
         initialize (method): The method to initialize the view.
     """
 
@@ -35,23 +44,31 @@ class MainView:
 
         self.__root = root
         self.__markov_model = None
+        self.__autocomplete_service = None
+        self.__completions = 50
+        self.__cache_size = 4096
         self.__read_service = ReadService()
+        self.__cache_service = CacheService()
+        self.__build_service = BuildService(self.__cache_service)
         self.__available_stories = None
         self.__current_sequence = ""
         self.__frames = {}
         self.__data = ""
         self.__degree = 3
+        self.__max_degree = 5
         self.__limit = 100
+        self.__build = 0
         self.__initialize()
 
-    def __handle_retrieve_children(self, sequence=None) -> None:
+    def __handle_retrieve_children(self, sequence=None, partial="") -> None:
         """Pass on function for the retrieve_children method.
 
         Args:
             sequence (list): The sequence of the generated text.
+            partial (str): The partially typed word.
         """
 
-        return self.__retrieve_children(sequence)
+        return self.__retrieve_children(sequence, partial)
 
     def __handle_generate_text(self, original="", sequence=None) -> None:
         """Pass on function for the generate_text method."""
@@ -73,14 +90,20 @@ class MainView:
     def __handle_change_degree(self, degree: int) -> None:
         """Pass on function for the value frames degree field.
 
-        Initializes a new model with the new degree.
+        The current model is queried at the new degree if it was built
+        at a high enough degree. Otherwise, a new model is initialized
+        with the new degree.
 
         Args:
             degree (int): New degree of the markov model.
         """
 
         self.__degree = degree
-        self.__change_model(self.__read_service.title)
+        if degree <= self.__markov_model.max_degree:
+            self.__markov_model.degree = degree
+            self.__update_frames()
+        else:
+            self.__change_model(self.__read_service.title)
 
     def __handle_change_limit(self, limit: int) -> None:
         """Pass on function for the value frames limit field.
@@ -138,7 +161,7 @@ class MainView:
     def __show_loading_screen(self) -> None:
         """Shows the loading screen 
 
-        Appears while the model is being created in a parallel thread.
+        Appears while the text is being generated in a parallel thread.
         After the thread is finished, the loading screen will be destroyed
         and the new frames will be shown.
         """
@@ -148,6 +171,19 @@ class MainView:
         self.__frames["loading"] = LoadingFrame(self.__root)
         self.__frames["loading"].pack()
 
+    def __show_build_screen(self) -> None:
+        """Shows the progress of the build
+
+        The select frame stays available, so another story can be chosen
+        while the model is being built.
+        """
+
+        for frame in self.__frames.values():
+            frame.destroy()
+        self.__show_select_frame()
+        self.__frames["loading"] = LoadingFrame(self.__root, determinate=True)
+        self.__frames["loading"].pack()
+
     def __show_error_message(self, message: str) -> None:
         """Shows an error message.
 
@@ -180,6 +216,33 @@ class MainView:
             self.__current_sequence = ""
             self.__update_frames()
 
+    def __monitor_build(self, build: int) -> None:
+        """Monitors the build process.
+
+        Updates the progress every 100ms. Once the build is finished, the
+        model is taken into use and the new frames will be shown. A monitor
+        of a superseded build stops.
+
+        Args:
+            build (int): The number of the build being monitored.
+        """
+
+        if build != self.__build:
+            return
+        try:
+            markov_model = self.__build_service.poll()
+        except RuntimeError as error:
+            self.__show_error_message(str(error))
+            self.__update_frames()
+            return
+        if markov_model is None:
+            self.__frames["loading"].set_progress(*self.__build_service.progress)
+            self.__root.after(100, lambda: self.__monitor_build(build))
+            return
+        self.__current_sequence = ""
+        self.__use_model(markov_model)
+        self.__update_frames()
+
     def __loading_screen(func):
         """Decorator to show the loading screen while creating the model.
 
@@ -196,32 +259,21 @@ class MainView:
             self.__monitor_thread(thread)
         return wrapper
 
-    def __retrieve_children(self, sequence) -> list:
-        """Retrieves the children of the sequence.
+    def __retrieve_children(self, sequence, partial="") -> list:
+        """Retrieves the most frequent completions of the sequence.
 
         Used for the autocomplete feature in the input frame.
 
         Args:
             sequence (list): The sequence of the generated text.
+            partial (str): The partially typed word.
 
         Returns:
             list: The updated autocomplete list.
         """
 
-        if not sequence:
-            return list(self.__markov_model.model.get_children(sequence).keys())
-
-        children = None
-        if len(sequence) > self.__degree:
-            children = self.__markov_model.model.get_children(
-                sequence[-self.__degree:])
-        else:
-            children = self.__markov_model.model.get_children(sequence)
-
-        if children:
-            sequence_str = " ".join(sequence)
-            return [sequence_str + " " + i for i in list(children.keys())]
-        return []
+        return self.__autocomplete_service.complete(
+            sequence or [], partial, self.__completions)
 
     @__loading_screen
     def __generate_text(self, sequence) -> None:
@@ -243,26 +295,49 @@ class MainView:
                 "Could not generate sequence.\nGenerating a random sequence.")
             sequence = self.__markov_model.form_the_starting_sequence([])
         generate = GenerateService(
-            sequence, self.__markov_model.model, self.__degree, self.__limit)
+            sequence, self.__markov_model, self.__degree, self.__limit,
+            self.__markov_model.vocabulary, backoff=True)
         self.__data = generate.generated_text
         if not self.__data:
             self.__show_error_message("Could not generate text.")
 
-    @__loading_screen
     def __change_model(self, title: str) -> None:
         """Retrains the model with a new story.
 
-        Given a title, the method will retrieve the story from the file.
-        Then, after cleaning the text, the model will be retrained with the new story.
+        Given a title, the model of the story is loaded from the cache. If the
+        story has not been trained at the degree before, the model is built in
+        a separate process, cancelling any build still in flight, and the view
+        monitors the build until the model is ready.
 
         Args:
             title (str): The title of the new story.
         """
 
-        self.__read_service.text = title
-        clean_service = CleanService(self.__read_service.text)
-        self.__markov_model = MarkovModel(
-            clean_service.clean_text, self.__degree)
+        self.__read_service.title = title
+        path = self.__read_service.file_path(title)
+        max_degree = max(self.__degree, self.__max_degree)
+        self.__build += 1
+        markov_model = self.__cache_service.get_cached(path, self.__degree, max_degree)
+        if markov_model is not None:
+            self.__build_service.cancel()
+            self.__current_sequence = ""
+            self.__use_model(markov_model)
+            self.__update_frames()
+            return
+        self.__build_service.start(path, self.__degree, max_degree)
+        self.__show_build_screen()
+        self.__monitor_build(self.__build)
+
+    def __use_model(self, markov_model) -> None:
+        """Takes a model into use.
+
+        Args:
+            markov_model (MarkovModel): The new model.
+        """
+
+        self.__markov_model = markov_model
+        self.__markov_model.cache_size = self.__cache_size
+        self.__autocomplete_service = AutocompleteService(self.__markov_model)
 
     def __update_frames(self) -> None:
         """Updates the frames."""
@@ -278,7 +353,8 @@ class MainView:
         """Initializes the view."""
 
         self.__available_stories = self.__read_service.available_stories
-        self.__read_service.text = self.__available_stories[0]
-        clean_service = CleanService(self.__read_service.text)
-        self.__markov_model = MarkovModel(clean_service.clean_text, 3)
+        self.__read_service.title = self.__available_stories[0]
+        self.__use_model(self.__cache_service.get_model(
+            self.__read_service.file_path(self.__read_service.title),
+            self.__degree, self.__max_degree))
         self.__update_frames()
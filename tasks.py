@@ -6,14 +6,44 @@ from invoke import task
 def start(ctx):
     ctx.run("python3 src/index.py", pty=True)
 
+@task
+def cli(ctx, args="--help"):
+    ctx.run(f"python3 src/cli.py {args}", pty=True)
+
+@task
+def serve(ctx, port=8765, workers=2):
+    ctx.run(f"python3 src/server.py serve --port {port} --workers {workers}", pty=True)
+
+@task
+def serve_bench(ctx, port=8765, requests=2000, concurrency=50):
+    ctx.run(f"python3 src/server.py bench --port {port} --requests {requests} "
+            f"--concurrency {concurrency}", pty=True)
+
 @task
 def test(ctx):
     ctx.run("pytest src", pty=True)
 
 @task
-def performance(ctx):
+def performance(ctx, output="benchmark.json"):
+    os.chdir('src/')
+    ctx.run(f"python3 -m tests.performance.benchmark run --output ../{output}", pty=True)
+
+@task
+def performance_compare(ctx, baseline, current="benchmark.json", threshold=0.1):
+    os.chdir('src/')
+    ctx.run(f"python3 -m tests.performance.benchmark compare ../{baseline} ../{current} "
+            f"--threshold {threshold}", pty=True)
+
+@task
+def model_stats(ctx, degrees="1 2 3 4 5"):
+    os.chdir('src/')
+    ctx.run(f"python3 -m tests.performance.benchmark stats --degrees {degrees}", pty=True)
+
+@task
+def profile(ctx, degree=3, output="profile.pstats"):
     os.chdir('src/')
-    ctx.run("python3 -m tests.performance.performance_test", pty=True)
+    ctx.run(f"python3 -m tests.performance.benchmark profile --degree {degree} "
+            f"--output ../{output}", pty=True)
 
 @task
 def lint(ctx):